@@ -36,6 +36,12 @@ if config.config_file_name is not None:
 target_metadata = SQLModel.metadata
 # --- END IMPORTANT PART ---
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Keeps autogenerate away from the hand-managed forum search index (app/search.py)."""
+    if type_ == "table" and name.startswith("forum_search"):
+        return False
+    return True
+
 def get_url():
     """Returns the database URL from the environment variable."""
     # Alembic reads sqlalchemy.url from alembic.ini, which has %(DB_URL)s
@@ -51,6 +57,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -79,7 +86,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
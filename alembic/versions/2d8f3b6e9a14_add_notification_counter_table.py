@@ -0,0 +1,44 @@
+"""Add notification counter table
+
+Revision ID: 2d8f3b6e9a14
+Revises: 9e4c7a1d2b60
+Create Date: 2026-10-16 15:48:30.274116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8f3b6e9a14'
+down_revision: Union[str, Sequence[str], None] = '9e4c7a1d2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases built by the old create_all() on boot may already have the table
+    if not sa.inspect(op.get_bind()).has_table('notificationcounter'):
+        op.create_table('notificationcounter',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+
+    # Seed counters from the existing unread notifications
+    op.execute(sa.text("DELETE FROM notificationcounter"))
+    op.execute(sa.text("""
+        INSERT INTO notificationcounter (user_id, unread_count)
+        SELECT user_id, COUNT(id) FROM notification
+        WHERE is_read = :is_read
+        GROUP BY user_id
+    """).bindparams(is_read=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notificationcounter')
@@ -0,0 +1,40 @@
+"""Add keyset pagination indexes
+
+Revision ID: 5b2e9d41a7c3
+Revises: c665b303cbab
+Create Date: 2026-10-16 11:02:17.540931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9d41a7c3'
+down_revision: Union[str, Sequence[str], None] = 'c665b303cbab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_forumthread_created_at_id', 'forumthread', ['created_at', 'id']),
+    ('ix_notification_user_id_is_read_created_at_id', 'notification', ['user_id', 'is_read', 'created_at', 'id']),
+    ('ix_farmactivity_farm_id_date_id', 'farmactivity', ['farm_id', 'date', 'id']),
+    ('ix_soilreport_farm_id_date_id', 'soilreport', ['farm_id', 'date', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction; build without locking writes on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
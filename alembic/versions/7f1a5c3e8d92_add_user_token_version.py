@@ -0,0 +1,32 @@
+"""Add user token_version
+
+Revision ID: 7f1a5c3e8d92
+Revises: 2d8f3b6e9a14
+Create Date: 2026-10-16 17:05:12.660347
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f1a5c3e8d92'
+down_revision: Union[str, Sequence[str], None] = '2d8f3b6e9a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')]
+    if 'token_version' in columns:
+        return
+    op.add_column('user', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,64 @@
+"""Add forum full-text search index
+
+Revision ID: 9e4c7a1d2b60
+Revises: 5b2e9d41a7c3
+Create Date: 2026-10-16 13:27:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c7a1d2b60'
+down_revision: Union[str, Sequence[str], None] = '5b2e9d41a7c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            CREATE TABLE IF NOT EXISTS forum_search (
+                kind VARCHAR(8) NOT NULL,
+                source_id INTEGER NOT NULL,
+                thread_id INTEGER NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                document TSVECTOR GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', title), 'A') ||
+                    setweight(to_tsvector('english', body), 'D')
+                ) STORED,
+                PRIMARY KEY (kind, source_id)
+            )
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_forum_search_document ON forum_search USING GIN (document)")
+        op.execute("""
+            INSERT INTO forum_search (kind, source_id, thread_id, title, body)
+            SELECT 'thread', id, id, title, content FROM forumthread
+            UNION ALL
+            SELECT 'post', id, thread_id, '', content FROM forumpost
+            ON CONFLICT (kind, source_id) DO NOTHING
+        """)
+    elif bind.dialect.name == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS forum_search USING fts5(
+                kind UNINDEXED, source_id UNINDEXED, thread_id UNINDEXED, title, body,
+                tokenize = 'porter unicode61'
+            )
+        """)
+        op.execute("""
+            INSERT OR REPLACE INTO forum_search (rowid, kind, source_id, thread_id, title, body)
+            SELECT id * 2, 'thread', id, id, title, content FROM forumthread
+            UNION ALL
+            SELECT id * 2 + 1, 'post', id, thread_id, '', content FROM forumpost
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS forum_search")
@@ -0,0 +1,47 @@
+"""Seed default badges
+
+Revision ID: b3c9e2f4a1d7
+Revises: 7f1a5c3e8d92
+Create Date: 2026-10-16 19:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c9e2f4a1d7'
+down_revision: Union[str, Sequence[str], None] = '7f1a5c3e8d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.badge_service.DEFAULT_BADGES; seeding used to run on every boot
+BADGES = [
+    {"name": "First Farm", "description": "Awarded for adding your first farm.", "icon_name": "FiMapPin"},
+    {"name": "Soil Analyst", "description": "Awarded for submitting your first soil analysis report.", "icon_name": "FiDroplet"},
+    {"name": "Community Member", "description": "Awarded for creating your first forum thread.", "icon_name": "FiUsers"},
+    {"name": "Climate Watcher", "description": "Awarded for viewing a climate action report.", "icon_name": "FiCloudDrizzle"},
+]
+
+badge = sa.table(
+    'badge',
+    sa.column('name', sa.String),
+    sa.column('description', sa.String),
+    sa.column('icon_name', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(op.get_bind().execute(sa.select(badge.c.name)).scalars())
+    missing = [row for row in BADGES if row['name'] not in existing]
+    if missing:
+        op.bulk_insert(badge, missing)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Badges may have been awarded since; leave them in place
+    pass
@@ -0,0 +1,43 @@
+"""Add geocode cache table
+
+Revision ID: c665b303cbab
+Revises: f078b8a06b59
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c665b303cbab'
+down_revision: Union[str, Sequence[str], None] = 'f078b8a06b59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases built by the old create_all() on boot may already have the table
+    if sa.inspect(op.get_bind()).has_table('geocodecache'):
+        return
+    op.create_table('geocodecache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('query', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_geocodecache_query'), 'geocodecache', ['query'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_geocodecache_query'), table_name='geocodecache')
+    op.drop_table('geocodecache')
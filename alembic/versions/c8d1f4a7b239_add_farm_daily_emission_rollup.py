@@ -0,0 +1,48 @@
+"""Add farm daily emission rollup
+
+Revision ID: c8d1f4a7b239
+Revises: e6a2d7c41f58
+Create Date: 2026-10-16 21:12:44.508126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d1f4a7b239'
+down_revision: Union[str, Sequence[str], None] = 'e6a2d7c41f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('farmdailyemission'):
+        op.create_table('farmdailyemission',
+        sa.Column('farm_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False),
+        sa.Column('total_kg', sa.Float(), nullable=False),
+        sa.Column('activity_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['farm_id'], ['farm.id'], ),
+        sa.PrimaryKeyConstraint('farm_id', 'day', 'activity_type')
+        )
+
+    # Backfill from the existing activities (same as `python -m app.emission_rollup`)
+    day = 'date(date)' if bind.dialect.name == 'sqlite' else 'CAST(date AS DATE)'
+    op.execute(sa.text("DELETE FROM farmdailyemission"))
+    op.execute(sa.text(f"""
+        INSERT INTO farmdailyemission (farm_id, day, activity_type, total_kg, activity_count)
+        SELECT farm_id, {day}, activity_type, COALESCE(SUM(carbon_footprint_kg), 0), COUNT(id)
+        FROM farmactivity
+        GROUP BY farm_id, {day}, activity_type
+    """))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('farmdailyemission')
@@ -0,0 +1,40 @@
+"""Add hot query indexes
+
+Revision ID: e6a2d7c41f58
+Revises: b3c9e2f4a1d7
+Create Date: 2026-10-16 20:26:08.913457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2d7c41f58'
+down_revision: Union[str, Sequence[str], None] = 'b3c9e2f4a1d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The (farm_id, date), forum thread and notification indexes came with 5b2e9d41a7c3
+INDEXES = [
+    ('ix_farm_owner_id', 'farm', ['owner_id']),
+    ('ix_forumpost_thread_id_created_at', 'forumpost', ['thread_id', 'created_at']),
+    ('ix_soilreport_farm_id_id', 'soilreport', ['farm_id', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction; build without locking writes on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,175 @@
+"""
+Shared async OpenAI client.
+
+A single `AsyncOpenAI` client (with its own pooled HTTP connections) is
+created on the first AI call; the `openai` package takes most of a second
+to import, so it is kept out of process startup. All chat completions go
+through `create_chat_completion`, which applies a per-call timeout and a
+global concurrency limit so slow LLM round trips never block the event
+loop or pile up unbounded.
+"""
+import asyncio
+import os
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+
+from fastapi import HTTPException
+from dotenv import load_dotenv
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. a local fake server
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", 30.0))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 1))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+# How long a call may wait for a free concurrency slot before we give up
+OPENAI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("OPENAI_QUEUE_TIMEOUT_SECONDS", 10.0))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
+
+_client: Optional["AsyncOpenAI"] = None
+# Semaphores are bound to an event loop, so keep the loop they were made for
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class AIServiceError(Exception):
+    """Raised when a completion fails; carries the HTTP status to surface."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _build_client() -> "AsyncOpenAI":
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key is not configured.")
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL,
+        timeout=OPENAI_TIMEOUT_SECONDS,
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            ),
+        ),
+    )
+
+
+async def start_openai_client():
+    """Called from the lifespan hook. The client itself is built on first use."""
+    _get_semaphore()
+
+
+async def close_openai_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Returns the shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        try:
+            _client = _build_client()
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Unexpected error during OpenAI client creation: {e}")
+            raise HTTPException(status_code=500, detail="Unexpected error initializing OpenAI client.")
+    return _client
+
+
+def set_openai_client(client: Optional["AsyncOpenAI"]):
+    """Replaces the shared client (used by tests to point at a fake server)."""
+    global _client
+    _client = client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+async def create_chat_completion(timeout: Optional[float] = None, **kwargs: Any):
+    """
+    Runs `chat.completions.create` on the shared client under the global
+    concurrency limit. OpenAI errors are re-raised as `AIServiceError`.
+    """
+    client = get_openai_client()
+    from openai import APIError, APITimeoutError
+
+    kwargs.setdefault("model", DEFAULT_CHAT_MODEL)
+    semaphore = _get_semaphore()
+
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=OPENAI_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise AIServiceError("AI service is busy, please try again shortly.", status_code=503)
+
+    try:
+        return await client.chat.completions.create(
+            timeout=timeout or OPENAI_TIMEOUT_SECONDS, **kwargs
+        )
+    except APITimeoutError as e:
+        raise AIServiceError(f"AI request timed out: {e}", status_code=504)
+    except APIError as e:
+        raise AIServiceError(getattr(e, "message", str(e)), status_code=getattr(e, "status_code", None))
+    finally:
+        semaphore.release()
+
+
+async def stream_chat_completion(timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[str]:
+    """
+    Streams the text deltas of a chat completion. Closing the generator
+    (e.g. when the client disconnects) closes the upstream HTTP stream, so
+    abandoned answers stop being generated and billed.
+    """
+    client = get_openai_client()
+    from openai import APIError, APITimeoutError
+
+    kwargs.setdefault("model", DEFAULT_CHAT_MODEL)
+    semaphore = _get_semaphore()
+
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=OPENAI_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise AIServiceError("AI service is busy, please try again shortly.", status_code=503)
+
+    try:
+        try:
+            stream = await client.chat.completions.create(
+                stream=True, timeout=timeout or OPENAI_TIMEOUT_SECONDS, **kwargs
+            )
+        except APITimeoutError as e:
+            raise AIServiceError(f"AI request timed out: {e}", status_code=504)
+        except APIError as e:
+            raise AIServiceError(getattr(e, "message", str(e)), status_code=getattr(e, "status_code", None))
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except APIError as e:
+            raise AIServiceError(getattr(e, "message", str(e)), status_code=getattr(e, "status_code", None))
+        finally:
+            await stream.close()
+    finally:
+        semaphore.release()
+
@@ -1,45 +1,188 @@
-# app/badge_service.py (New File)
+"""
+Badge engine.
 
+Routers emit a domain event (`emit_badge_event`) and return; the rules for
+that event are evaluated after the response in a background task with its
+own session, so badge work never adds to request latency.
+
+* BADGE_RULES is the declarative rule table: which badge an event can
+  earn and, for "N of something" badges, the count that must be reached.
+* `badge_catalog` maps badge names to ids in memory. It is loaded on
+  first use and reloaded when a rule names a badge it doesn't know; the
+  miss is remembered for BADGE_CATALOG_MISS_TTL_SECONDS so an unseeded
+  badge doesn't cost a reload on every event.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Union
+
+from fastapi import BackgroundTasks
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlmodel import Session, select
-from app.models import User, Badge, UserBadge, Farm
-from datetime import datetime
-
-def award_badge(db: Session, user_id: int, badge_name: str):
-    """Awards a badge to a user if they don't already have it."""
-    
-    # 1. Find the badge (e.g., "First Farm Added")
-    badge = db.exec(select(Badge).where(Badge.name == badge_name)).first()
-    if not badge:
-        # Note: In a real app, you might log an error here
-        print(f"Badge '{badge_name}' not found in database.")
-        return None
-
-    # 2. Check if user already has this specific badge
-    existing_link = db.get(UserBadge, (user_id, badge.id))
-    if existing_link:
-        return existing_link # Already awarded
-
-    # 3. Award the badge
-    new_badge_link = UserBadge(user_id=user_id, badge_id=badge.id, earned_at=datetime.utcnow())
-    db.add(new_badge_link)
-    db.commit()
-    db.refresh(new_badge_link)
-    print(f"Successfully awarded badge: {badge_name} to user {user_id}")
-    return new_badge_link
-
-def check_and_award_new_farm_badges(db: Session, user_id: int):
-    """Checks farm count and awards related badges."""
-    
-    # Check Farm Count
-    farm_count_statement = select(Farm).where(Farm.owner_id == user_id)
-    farm_count = len(db.exec(farm_count_statement).all())
-
-    if farm_count >= 1:
-        # Example: Award 'First Farm' badge
-        award_badge(db, user_id, "First Farm Pioneer")
-    
-    if farm_count >= 5:
-        # Example: Award 'Farm Tycoon' badge
-        award_badge(db, user_id, "Farm Tycoon")
-        
-    # Add more badge rules here...
\ No newline at end of file
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Badge, UserBadge
+
+
+BADGE_CATALOG_MISS_TTL_SECONDS = float(os.getenv("BADGE_CATALOG_MISS_TTL_SECONDS", 300))
+
+
+class BadgeEvent(str, Enum):
+    FARM_CREATED = "farm_created"
+    SOIL_REPORT_CREATED = "soil_report_created"
+    THREAD_CREATED = "thread_created"
+    CLIMATE_ALERTS_VIEWED = "climate_alerts_viewed"
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    badge_name: str
+    event: BadgeEvent
+    # For "N of something" badges: award once counter(db, user_id) >= threshold.
+    # The triggering event already counts as one, so threshold 1 needs no query
+    threshold: int = 1
+    counter: Optional[Callable[[Session, int], int]] = None
+
+
+BADGE_RULES: List[BadgeRule] = [
+    BadgeRule("First Farm", BadgeEvent.FARM_CREATED),
+    BadgeRule("Soil Analyst", BadgeEvent.SOIL_REPORT_CREATED),
+    BadgeRule("Community Member", BadgeEvent.THREAD_CREATED),
+    BadgeRule("Climate Watcher", BadgeEvent.CLIMATE_ALERTS_VIEWED),
+]
+
+RULES_BY_EVENT: Dict[BadgeEvent, List[BadgeRule]] = {}
+for _rule in BADGE_RULES:
+    RULES_BY_EVENT.setdefault(_rule.event, []).append(_rule)
+
+# Existing databases get these from the seed_default_badges migration
+DEFAULT_BADGES = [
+    {"name": "First Farm", "description": "Awarded for adding your first farm.", "icon_name": "FiMapPin"},
+    {"name": "Soil Analyst", "description": "Awarded for submitting your first soil analysis report.", "icon_name": "FiDroplet"},
+    {"name": "Community Member", "description": "Awarded for creating your first forum thread.", "icon_name": "FiUsers"},
+    {"name": "Climate Watcher", "description": "Awarded for viewing a climate action report.", "icon_name": "FiCloudDrizzle"},
+]
+
+
+def seed_default_badges(session: Session):
+    """Adds any missing DEFAULT_BADGES. Safe to run repeatedly."""
+    existing = set(session.exec(select(Badge.name)).all())
+    for badge_data in DEFAULT_BADGES:
+        if badge_data["name"] not in existing:
+            session.add(Badge(**badge_data))
+            print(f"  Added badge: {badge_data['name']}")
+    session.commit()
+
+
+class BadgeCatalog:
+    def __init__(self, miss_ttl: float = BADGE_CATALOG_MISS_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._ids: Dict[str, int] = {}
+        # name -> when a reload last failed to find it
+        self._misses: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        ids = {badge.name: badge.id for badge in db.exec(select(Badge)).all()}
+        with self._lock:
+            self._ids = ids
+            self._misses = {}
+        print(f"Loaded {len(ids)} badges into the badge catalog.")
+
+    def badge_id(self, db: Session, name: str) -> Optional[int]:
+        badge_id = self._ids.get(name)
+        if badge_id is not None:
+            return badge_id
+        missed_at = self._misses.get(name)
+        if missed_at is not None and self._clock() - missed_at < self.miss_ttl:
+            return None
+        self.load(db)
+        badge_id = self._ids.get(name)
+        if badge_id is None:
+            with self._lock:
+                self._misses[name] = self._clock()
+        return badge_id
+
+    def clear(self):
+        with self._lock:
+            self._ids = {}
+            self._misses = {}
+
+
+badge_catalog = BadgeCatalog()
+
+
+def _insert_award(session: Session, user_id: int, badge_id: int) -> bool:
+    # One savepoint per award, so a collision only drops the badge that collided
+    try:
+        with session.begin_nested():
+            session.add(UserBadge(user_id=user_id, badge_id=badge_id))
+    except IntegrityError:
+        # A concurrent evaluation awarded it first
+        return False
+    return True
+
+
+def _award_badges(session: Session, user_id: int, event: BadgeEvent) -> List[str]:
+    awarded: List[str] = []
+    earned = set(session.exec(select(UserBadge.badge_id).where(UserBadge.user_id == user_id)).all())
+    for rule in RULES_BY_EVENT.get(event, []):
+        badge_id = badge_catalog.badge_id(session, rule.badge_name)
+        if badge_id is None:
+            print(f"Badge '{rule.badge_name}' not found in database.")
+            continue
+        if badge_id in earned:
+            continue
+        if rule.threshold > 1 and rule.counter(session, user_id) < rule.threshold:
+            continue
+        if not _insert_award(session, user_id, badge_id):
+            continue
+        earned.add(badge_id)
+        awarded.append(rule.badge_name)
+    if awarded:
+        session.commit()
+    for name in awarded:
+        print(f"Awarded badge '{name}' to user {user_id}")
+    return awarded
+
+
+def evaluate_badges(bind, user_id: int, event: BadgeEvent) -> List[str]:
+    """Awards every badge the event earns. Returns the names awarded; never raises."""
+    if event not in RULES_BY_EVENT:
+        return []
+    try:
+        with Session(bind) as session:
+            return _award_badges(session, user_id, event)
+    except Exception as e:
+        print(f"Error evaluating badges for user {user_id} on {event.value}: {e}")
+        return []
+
+
+async def evaluate_badges_async(bind: AsyncEngine, user_id: int, event: BadgeEvent) -> List[str]:
+    """`evaluate_badges` for events emitted from routes on an async session."""
+    if event not in RULES_BY_EVENT:
+        return []
+    try:
+        async with AsyncSession(bind) as session:
+            return await session.run_sync(_award_badges, user_id, event)
+    except Exception as e:
+        print(f"Error evaluating badges for user {user_id} on {event.value}: {e}")
+        return []
+
+
+def emit_badge_event(
+    background_tasks: BackgroundTasks,
+    db: Union[Session, AsyncSession],
+    user_id: int,
+    event: BadgeEvent,
+):
+    """Queues badge evaluation to run after the response, on the request's database."""
+    if isinstance(db, AsyncSession):
+        background_tasks.add_task(evaluate_badges_async, db.bind, user_id, event)
+    else:
+        background_tasks.add_task(evaluate_badges, db.get_bind(), user_id, event)
@@ -1,33 +1,77 @@
 # GreenFund-test-Backend-backup/app/carbon_model.py
 import json
-from typing import Optional
-from openai import APIError # Import error type
-from app.soil_model import get_openai_client # Import the correct client function
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from app.ai_client import get_openai_client, create_chat_completion, AIServiceError
+from app.emission_factors import estimate_from_table, normalize_activity, normalize_unit
+
+# Per-unit factors the AI produced for combinations the table doesn't cover,
+# keyed by (canonical activity, canonical unit)
+AI_FACTOR_MEMO_SIZE = 512
+_ai_factor_memo: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+PLACEHOLDER_FOOTPRINTS = {"Planting": 1.5, "Harvesting": 1.8, "Fertilizing": 10.0}
+
+
+def _placeholder(activity_type: str) -> float:
+    return PLACEHOLDER_FOOTPRINTS.get(activity_type, 0.5)
+
 
 async def estimate_carbon_with_ai(activity_type: str, value: float, unit: str, description: Optional[str]) -> float:
-    """Estimates the carbon footprint for a farm activity by asking OpenAI."""
+    """
+    Estimates the carbon footprint (kg CO2e) for a farm activity.
+
+    The local emission-factor table is tried first; only combinations it
+    cannot resolve go to OpenAI, and the per-unit factor OpenAI returns is
+    memoized so the same combination is never asked twice.
+    """
+    table_estimate = estimate_from_table(activity_type, value, unit)
+    if table_estimate is not None:
+        return table_estimate
+
+    canonical_unit, multiplier = normalize_unit(unit)
+    quantity = (value if value is not None else 1.0) * multiplier
+    memo_key = (normalize_activity(activity_type), canonical_unit or "occurrence")
+
+    factor = _ai_factor_memo.get(memo_key)
+    if factor is not None:
+        _ai_factor_memo.move_to_end(memo_key)
+        return round(max(quantity, 0.0) * factor, 3)
+
+    # Ask per canonical unit: that's what the factor is multiplied by and memoized under
+    factor = await _ask_ai_for_factor(activity_type, canonical_unit or None, description)
+    if factor is None:
+        return _placeholder(activity_type)
+
+    _ai_factor_memo[memo_key] = factor
+    while len(_ai_factor_memo) > AI_FACTOR_MEMO_SIZE:
+        _ai_factor_memo.popitem(last=False)
+    return round(max(quantity, 0.0) * factor, 3)
+
+
+async def _ask_ai_for_factor(activity_type: str, unit: Optional[str], description: Optional[str]) -> Optional[float]:
+    """Asks OpenAI for kg CO2e per unit of an activity. Returns None on failure."""
     try:
-        client = get_openai_client()
+        get_openai_client()
     except HTTPException as e:
         # Handle client init failure (e.g., bad key)
-         print(f"WARNING: OpenAI client failed init. Returning placeholder. Error: {e.detail}")
-         return {"Planting": 1.5, "Harvesting": 1.8, "Fertilizing": 10.0}.get(activity_type, 0.5)
+        print(f"WARNING: OpenAI client failed init. Returning placeholder. Error: {e.detail}")
+        return None
 
     prompt = f"""
     You are a carbon footprint analyst for agriculture.
     A farmer in Kenya performed:
     - Activity: {activity_type}
     - Details: {description or 'No description.'}
-    - Amount: {value} {unit}
+    - Measured in: {unit or 'one occurrence of the activity'}
 
-    Consider: "Planting"/"Harvesting" with "litres" implies diesel. "Fertilizing" with "kg" implies nitrogen fertilizer.
-
-    Provide a single, reasonable estimate for the carbon footprint in kilograms of CO2 equivalent (kg CO2e).
-    Return ONLY a valid JSON object (no extra text or markdown) containing a single key: "carbon_kg". Example: {{"carbon_kg": 25.5}}
+    Provide a single, reasonable emission factor in kilograms of CO2 equivalent (kg CO2e) per ONE unit above.
+    Return ONLY a valid JSON object (no extra text or markdown) containing a single key: "carbon_kg_per_unit". Example: {{"carbon_kg_per_unit": 2.68}}
     """
 
     try:
-        chat_completion = client.chat.completions.create(
+        chat_completion = await create_chat_completion(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"}
@@ -35,17 +79,16 @@ async def estimate_carbon_with_ai(activity_type: str, value: float, unit: str, d
         ai_response_str = chat_completion.choices[0].message.content
         ai_data = json.loads(ai_response_str)
 
-        carbon_kg = ai_data.get("carbon_kg")
-        if carbon_kg is None or not isinstance(carbon_kg, (int, float)):
+        factor = ai_data.get("carbon_kg_per_unit")
+        if factor is None or not isinstance(factor, (int, float)):
             print(f"Warning: OpenAI returned invalid format. Response: {ai_data}")
-            return 0.5 # Placeholder on bad format
-
-        return float(carbon_kg)
-    except APIError as e:
-         # Handle quota errors etc.
-         print(f"OpenAI API Error during carbon estimation: {e}")
-         # Return placeholder if API fails (e.g., quota)
-         return {"Planting": 1.5, "Harvesting": 1.8, "Fertilizing": 10.0}.get(activity_type, 0.5)
+            return None
+
+        return float(factor)
+    except AIServiceError as e:
+        # Handle quota errors etc.
+        print(f"OpenAI API Error during carbon estimation: {e}")
+        return None
     except Exception as e:
         print(f"Error calling OpenAI for carbon estimation: {e}")
-        return {"Planting": 1.5, "Harvesting": 1.8, "Fertilizing": 10.0}.get(activity_type, 0.5)
\ No newline at end of file
+        return None
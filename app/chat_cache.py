@@ -0,0 +1,181 @@
+"""
+Answer cache for frequent GreenBot questions.
+
+Prompts are normalized (case, punctuation, whitespace) before lookup, so
+"How do I control fall armyworm?" and "how do i control FALL ARMYWORM"
+share one entry; the words themselves and their order are kept, since
+"when" and "how" to plant beans need different answers. With fuzzy
+matching enabled, near-duplicates asking the same kind of question are
+found through a character-shingle index and Jaccard similarity. Entries
+expire after a TTL and the least recently used are evicted once the cache
+is full.
+"""
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Optional, Set
+
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", 6 * 3600))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 1000))
+CHAT_CACHE_FUZZY = os.getenv("CHAT_CACHE_FUZZY", "true").lower() == "true"
+CHAT_CACHE_FUZZY_THRESHOLD = float(os.getenv("CHAT_CACHE_FUZZY_THRESHOLD", 0.8))
+# Long prompts are usually farm-specific and never repeat
+CHAT_CACHE_MAX_PROMPT_CHARS = int(os.getenv("CHAT_CACHE_MAX_PROMPT_CHARS", 300))
+
+SHINGLE_SIZE = 3
+
+# A fuzzy match must ask the same kind of question ("when" vs "how" to plant)
+QUESTION_WORDS = {
+    "how", "what", "which", "when", "where", "why", "who",
+    "vipi", "nini", "gani", "lini", "wapi", "jinsi",
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, punctuation and whitespace are folded; every word and its order are kept."""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def _question_words(key: str) -> FrozenSet[str]:
+    return frozenset(word for word in key.split() if word in QUESTION_WORDS)
+
+
+def _shingles(key: str) -> FrozenSet[str]:
+    padded = f" {key} "
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset({padded})
+    return frozenset(padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1))
+
+
+@dataclass
+class _Entry:
+    answer: str
+    stored_at: float
+    shingles: FrozenSet[str]
+
+
+class ChatAnswerCache:
+    def __init__(
+        self,
+        ttl: float = CHAT_CACHE_TTL_SECONDS,
+        max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+        fuzzy: bool = CHAT_CACHE_FUZZY,
+        fuzzy_threshold: float = CHAT_CACHE_FUZZY_THRESHOLD,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # shingle -> keys containing it
+        self._index: Dict[str, Set[str]] = {}
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def is_cacheable(prompt: str) -> bool:
+        return 0 < len(prompt) <= CHAT_CACHE_MAX_PROMPT_CHARS
+
+    def get(self, prompt: str) -> Optional[str]:
+        if not self.is_cacheable(prompt):
+            return None
+        key = normalize_prompt(prompt)
+        if not key:
+            return None
+        entry = self._live_entry(key)
+        if entry is not None:
+            self.exact_hits += 1
+            self._entries.move_to_end(key)
+            return entry.answer
+
+        if self.fuzzy:
+            match = self._best_fuzzy_match(key)
+            if match is not None:
+                self.fuzzy_hits += 1
+                self._entries.move_to_end(match)
+                return self._entries[match].answer
+
+        self.misses += 1
+        return None
+
+    def set(self, prompt: str, answer: str):
+        if not self.is_cacheable(prompt) or not answer:
+            return
+        key = normalize_prompt(prompt)
+        if not key:
+            return
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(answer=answer, stored_at=self._clock(), shingles=_shingles(key))
+        self._entries[key] = entry
+        for shingle in entry.shingles:
+            self._index.setdefault(shingle, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.exact_hits + self.fuzzy_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.exact_hits + self.fuzzy_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _live_entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._clock() - entry.stored_at >= self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def _best_fuzzy_match(self, key: str) -> Optional[str]:
+        shingles = _shingles(key)
+        question = _question_words(key)
+        overlap: Dict[str, int] = {}
+        for shingle in shingles:
+            for candidate in self._index.get(shingle, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        best_key, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            if _question_words(candidate) != question:
+                continue
+            candidate_size = len(self._entries[candidate].shingles)
+            score = shared / (len(shingles) + candidate_size - shared)
+            if score >= self.fuzzy_threshold and score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is not None and self._live_entry(best_key) is None:
+            return None
+        return best_key
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for shingle in entry.shingles:
+            keys = self._index.get(shingle)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[shingle]
+
+
+chat_answer_cache = ChatAnswerCache()
@@ -1,71 +1,34 @@
 import os
-from sqlmodel import create_engine, SQLModel, Session, select, func # <-- Import select, func
+from sqlmodel import Session
 from dotenv import load_dotenv
-from app.models import Badge # <-- Import Badge model
+import app.search  # registers the forum search index with create_all
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from app.db_pool import build_engine, build_async_engine, async_url_for
+from app.read_replicas import DATABASE_REPLICA_URLS, ReplicaRouter, user_id_from_authorization
 
 # Load environment variables from .env file
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# The `connect_args` is only needed for SQLite
-engine_args = {}
-if DATABASE_URL and DATABASE_URL.startswith("sqlite"):
-    engine_args["connect_args"] = {"check_same_thread": False}
-
 # Ensure DATABASE_URL is loaded before creating the engine
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set!")
 
-engine = create_engine(DATABASE_URL, echo=True, **engine_args)
-
-def create_db_and_tables():
-    """
-    Initializes the database by creating all tables defined by SQLModel models,
-    and seeds initial data like badges.
-    This function is called once on application startup.
-    """
-    print("Creating database tables...")
-    SQLModel.metadata.create_all(engine)
-    print("Database tables created.")
-
-    # --- vvvv SEED INITIAL BADGES vvvv ---
-    print("Seeding initial badges...")
-    try:
-        with Session(engine) as session:
-            badges_to_seed = [
-                {"name": "First Farm", "description": "Awarded for adding your first farm.", "icon_name": "FiMapPin"},
-                {"name": "Soil Analyst", "description": "Awarded for submitting your first soil analysis report.", "icon_name": "FiDroplet"},
-                {"name": "Community Member", "description": "Awarded for creating your first forum thread.", "icon_name": "FiUsers"},
-                {"name": "Climate Watcher", "description": "Awarded for viewing a climate action report.", "icon_name": "FiCloudDrizzle"},
-            ]
-
-            # Check if badges already exist before attempting to seed
-            existing_badge_count = session.exec(select(func.count(Badge.id))).one_or_none()
+# Pool size, timeouts and SQL echo come from the DB_* settings in app.db_pool
+engine = build_engine(DATABASE_URL)
 
-            # Handle case where table might not exist yet fully during first setup
-            if existing_badge_count is None:
-                 existing_badge_count = 0
+# Same database through an asyncio driver, for the async route handlers
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url_for(DATABASE_URL)
+async_engine = build_async_engine(ASYNC_DATABASE_URL)
 
-            if existing_badge_count == 0:
-                 print("No badges found, seeding...")
-                 for badge_data in badges_to_seed:
-                      # Double-check existence just in case
-                      existing = session.exec(select(Badge).where(Badge.name == badge_data["name"])).first()
-                      if not existing:
-                          badge = Badge(**badge_data)
-                          session.add(badge)
-                          print(f"  Added badge: {badge_data['name']}")
-                 session.commit()
-                 print("Initial badges seeded.")
-            else:
-                 print(f"Found {existing_badge_count} existing badges, skipping seed.")
-
-    except Exception as e:
-        print(f"Error seeding badges: {e}")
-        # Depending on the error, you might want to rollback the session
-        # session.rollback() # If using the session from `with Session(engine)...`
-    # --- ^^^^ END SEEDING ^^^^ ---
+# Optional read replicas for the read-heavy GET endpoints (see get_read_db)
+read_router = ReplicaRouter(
+    engine,
+    [build_engine(url, name=f"replica-{i}") for i, url in enumerate(DATABASE_REPLICA_URLS, start=1)],
+)
 
 def get_db():
     """
@@ -73,4 +36,41 @@ def get_db():
     It ensures the session is always closed after the request is finished.
     """
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_async_db():
+    """
+    The async counterpart of `get_db`, for `async def` routes.
+    Objects stay loaded after commit (expire_on_commit=False), and lazy
+    relationship loads are not available: load what the response needs up
+    front with `selectinload` or an explicit query.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+def get_read_db(request: Request):
+    """
+    A session for read-only endpoints: on a healthy read replica when any
+    are configured, otherwise (or for a user who has just written) on the
+    primary. Replicas lag slightly; don't use this where a stale read matters.
+    """
+    user_id = user_id_from_authorization(request.headers.get("authorization"))
+    candidates = read_router.candidates(user_id)
+    for candidate in candidates[:-1]:
+        session = Session(candidate)
+        try:
+            session.connection()
+        except DBAPIError as e:
+            session.close()
+            read_router.mark_down(candidate, e)
+            continue
+        read_router.mark_used(candidate)
+        with session:
+            yield session
+        return
+
+    read_router.mark_used(read_router.primary)
+    with Session(read_router.primary) as session:
+        yield session
@@ -0,0 +1,232 @@
+"""
+Database engine factory and connection-pool metrics.
+
+Every engine is built from the DB_* settings below instead of SQLAlchemy's
+defaults, so the pool can be sized to the real concurrency of the worker
+(and to the connection limit of a small Postgres plan). File-backed
+engines use an instrumented QueuePool that records how long each checkout
+waited for a connection; `pool_stats()` reports that histogram alongside
+the pool's live checked-out / overflow numbers. In-memory SQLite keeps
+SQLAlchemy's single-connection pools, instrumented the same way but with
+no occupancy to report.
+
+`build_async_engine` applies the same settings to an asyncio engine
+(asyncpg for PostgreSQL, aiosqlite for SQLite) for the async route
+handlers. Its pool is sized separately from the sync one, so a worker
+holds up to twice DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, SingletonThreadPool, StaticPool
+from sqlmodel import create_engine
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side statement timeout (PostgreSQL only); 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Upper bounds of the checkout wait histogram, in milliseconds
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self._buckets[bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+            self._wait_seconds += seconds
+            self._max_wait_seconds = max(self._max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def histogram(self) -> Dict[str, int]:
+        """Cumulative counts per bucket, Prometheus style."""
+        cumulative: Dict[str, int] = {}
+        total = 0
+        for bound, count in zip([str(b) for b in WAIT_BUCKETS_MS] + ["+Inf"], self._buckets):
+            total += count
+            cumulative[bound] = total
+        return cumulative
+
+    def stats(self) -> Dict[str, Any]:
+        observed = self.checkouts + self.timeouts
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self._wait_seconds / observed * 1000, 3) if observed else 0.0,
+            "max_wait_ms": round(self._max_wait_seconds * 1000, 3),
+            "wait_ms_buckets": self.histogram(),
+        }
+
+
+class TimedCheckoutMixin:
+    """Times every checkout of a pool. Subclassed per engine to carry its metrics."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+_engines: Dict[str, Engine] = {}
+_metrics: Dict[str, PoolMetrics] = {}
+
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url_for(url: str) -> str:
+    """Rewrites a sync DATABASE_URL to its asyncio driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for '{backend}' databases")
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == "postgresql" and "sslmode" in parsed.query:
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _register(name: str, engine: Engine, metrics: PoolMetrics):
+    _engines[name] = engine
+    _metrics[name] = metrics
+
+
+def _instrumented(pool_class, metrics: PoolMetrics):
+    return type(f"Instrumented{pool_class.__name__}", (TimedCheckoutMixin, pool_class), {"metrics": metrics})
+
+
+def build_engine(
+    url: str,
+    name: str = "primary",
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+    statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+    echo: bool = DB_ECHO,
+) -> Engine:
+    """Creates an engine from the pool settings and registers it for `pool_stats()`."""
+    backend = make_url(url).get_backend_name()
+    connect_args: Dict[str, Any] = {}
+    engine_args: Dict[str, Any] = {"echo": echo, "pool_pre_ping": pool_pre_ping}
+
+    metrics = PoolMetrics()
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+        if _is_memory_sqlite(url):
+            # In-memory databases live in a single connection; keep SQLAlchemy's pool class
+            engine = create_engine(
+                url, poolclass=_instrumented(SingletonThreadPool, metrics),
+                connect_args=connect_args, **engine_args,
+            )
+            _register(name, engine, metrics)
+            return engine
+    elif backend == "postgresql" and statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+    pool_class = _instrumented(QueuePool, metrics)
+    engine = create_engine(
+        url,
+        poolclass=pool_class,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        connect_args=connect_args,
+        **engine_args,
+    )
+    _register(name, engine, metrics)
+    return engine
+
+
+def build_async_engine(
+    url: str,
+    name: str = "primary-async",
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+    statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+    echo: bool = DB_ECHO,
+) -> AsyncEngine:
+    """Asyncio counterpart of `build_engine`; `url` must name an async driver."""
+    backend = make_url(url).get_backend_name()
+    connect_args: Dict[str, Any] = {}
+    engine_args: Dict[str, Any] = {"echo": echo, "pool_pre_ping": pool_pre_ping}
+
+    metrics = PoolMetrics()
+    if backend == "sqlite" and _is_memory_sqlite(url):
+        engine = create_async_engine(url, poolclass=_instrumented(StaticPool, metrics), **engine_args)
+        _register(name, engine.sync_engine, metrics)
+        return engine
+    if backend == "postgresql" and statement_timeout_ms > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+
+    pool_class = _instrumented(AsyncAdaptedQueuePool, metrics)
+    engine = create_async_engine(
+        url,
+        poolclass=pool_class,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        connect_args=connect_args,
+        **engine_args,
+    )
+    _register(name, engine.sync_engine, metrics)
+    return engine
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Live pool occupancy plus checkout wait metrics for every registered engine."""
+    report: Dict[str, Dict[str, Any]] = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        occupancy: Dict[str, Any] = {}
+        if isinstance(pool, QueuePool):
+            occupancy = {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        report[name] = {**occupancy, **_metrics[name].stats()}
+    return report
@@ -0,0 +1,133 @@
+"""
+Deterministic emission factors for farm activities.
+
+Maps (activity_type, unit) to kg CO2e per unit so that common activities
+(diesel for field operations, nitrogen fertilizer, ...) are estimated
+locally and reproducibly. Anything the table cannot resolve returns None
+and is left to the AI estimator in `app.carbon_model`.
+
+Bump EMISSION_FACTORS_VERSION whenever a factor changes so estimates can be
+traced back to the table they came from.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+EMISSION_FACTORS_VERSION = "2026.1"
+
+# Diesel combustion, well-to-wheel (DEFRA 2023): kg CO2e per litre
+_DIESEL_KG_PER_LITRE = 2.68
+# Typical small tractor burns ~8 L/h and ~6 L/acre when ploughing
+_TRACTOR_LITRES_PER_HOUR = 8.0
+_PLOUGH_LITRES_PER_ACRE = 6.0
+
+
+@dataclass(frozen=True)
+class EmissionFactor:
+    kg_co2e_per_unit: float
+    assumed_input: str
+    source: str
+
+
+# (canonical activity, canonical unit) -> factor
+EMISSION_FACTORS: Dict[Tuple[str, str], EmissionFactor] = {
+    ("planting", "litre"): EmissionFactor(_DIESEL_KG_PER_LITRE, "diesel", "DEFRA 2023"),
+    ("harvesting", "litre"): EmissionFactor(_DIESEL_KG_PER_LITRE, "diesel", "DEFRA 2023"),
+    ("tilling", "litre"): EmissionFactor(_DIESEL_KG_PER_LITRE, "diesel", "DEFRA 2023"),
+    ("irrigation", "litre"): EmissionFactor(_DIESEL_KG_PER_LITRE, "diesel (pump fuel)", "DEFRA 2023"),
+    ("transport", "litre"): EmissionFactor(_DIESEL_KG_PER_LITRE, "diesel", "DEFRA 2023"),
+    ("planting", "hour"): EmissionFactor(_DIESEL_KG_PER_LITRE * _TRACTOR_LITRES_PER_HOUR, "tractor diesel (~8 L/h)", "DEFRA 2023"),
+    ("harvesting", "hour"): EmissionFactor(_DIESEL_KG_PER_LITRE * _TRACTOR_LITRES_PER_HOUR, "tractor diesel (~8 L/h)", "DEFRA 2023"),
+    ("tilling", "hour"): EmissionFactor(_DIESEL_KG_PER_LITRE * _TRACTOR_LITRES_PER_HOUR, "tractor diesel (~8 L/h)", "DEFRA 2023"),
+    ("tilling", "acre"): EmissionFactor(_DIESEL_KG_PER_LITRE * _PLOUGH_LITRES_PER_ACRE, "ploughing diesel (~6 L/acre)", "DEFRA 2023"),
+    ("irrigation", "kwh"): EmissionFactor(0.1, "Kenya grid electricity", "KPLC 2023 grid mix"),
+    # Urea-equivalent product: manufacture + IPCC Tier 1 direct N2O (1% of N)
+    ("fertilizing", "kg"): EmissionFactor(4.0, "synthetic nitrogen fertilizer", "IPCC 2019 Tier 1"),
+    ("manure application", "kg"): EmissionFactor(0.02, "farmyard manure (~0.5% N)", "IPCC 2019 Tier 1"),
+}
+
+ACTIVITY_ALIASES: Dict[str, str] = {
+    "plant": "planting",
+    "sowing": "planting",
+    "harvest": "harvesting",
+    "fertilizing": "fertilizing",
+    "fertilising": "fertilizing",
+    "fertilizer": "fertilizing",
+    "fertiliser": "fertilizing",
+    "fertilizer application": "fertilizing",
+    "fertiliser application": "fertilizing",
+    "top dressing": "fertilizing",
+    "tillage": "tilling",
+    "ploughing": "tilling",
+    "plowing": "tilling",
+    "irrigating": "irrigation",
+    "watering": "irrigation",
+    "manuring": "manure application",
+    "manure": "manure application",
+    "transporting": "transport",
+}
+
+# unit alias -> (canonical unit, multiplier into the canonical unit)
+UNIT_CONVERSIONS: Dict[str, Tuple[str, float]] = {
+    "l": ("litre", 1.0),
+    "litre": ("litre", 1.0),
+    "liter": ("litre", 1.0),
+    "ltr": ("litre", 1.0),
+    "ml": ("litre", 0.001),
+    "gallon": ("litre", 3.785),
+    "kg": ("kg", 1.0),
+    "kilogram": ("kg", 1.0),
+    "kgs": ("kg", 1.0),
+    "g": ("kg", 0.001),
+    "gram": ("kg", 0.001),
+    "tonne": ("kg", 1000.0),
+    "ton": ("kg", 1000.0),
+    "t": ("kg", 1000.0),
+    "bag": ("kg", 50.0),  # standard 50 kg fertilizer bag
+    "hour": ("hour", 1.0),
+    "hr": ("hour", 1.0),
+    "h": ("hour", 1.0),
+    "minute": ("hour", 1 / 60),
+    "min": ("hour", 1 / 60),
+    "acre": ("acre", 1.0),
+    "ac": ("acre", 1.0),
+    "hectare": ("acre", 2.471),
+    "ha": ("acre", 2.471),
+    "kwh": ("kwh", 1.0),
+}
+
+
+def normalize_activity(activity_type: Optional[str]) -> str:
+    text = re.sub(r"\s+", " ", (activity_type or "").strip().lower())
+    return ACTIVITY_ALIASES.get(text, text)
+
+
+def normalize_unit(unit: Optional[str]) -> Tuple[str, float]:
+    """Returns (canonical unit, multiplier). Unknown units pass through unchanged."""
+    text = re.sub(r"\s+", "", (unit or "").strip().lower()).rstrip(".")
+    if text in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[text]
+    # Plurals: "litres", "bags", "hours", "acres"
+    if text.endswith("s") and text[:-1] in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[text[:-1]]
+    return text, 1.0
+
+
+def lookup_factor(activity_type: Optional[str], unit: Optional[str]) -> Optional[Tuple[EmissionFactor, float]]:
+    """Returns (factor, unit multiplier) or None if the table has no entry."""
+    canonical_unit, multiplier = normalize_unit(unit)
+    factor = EMISSION_FACTORS.get((normalize_activity(activity_type), canonical_unit))
+    if factor is None:
+        return None
+    return factor, multiplier
+
+
+def estimate_from_table(activity_type: Optional[str], value: Optional[float], unit: Optional[str]) -> Optional[float]:
+    """kg CO2e for an activity, or None when the table cannot resolve it."""
+    if value is None:
+        return None
+    resolved = lookup_factor(activity_type, unit)
+    if resolved is None:
+        return None
+    factor, multiplier = resolved
+    return round(max(value, 0.0) * multiplier * factor.kg_co2e_per_unit, 3)
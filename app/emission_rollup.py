@@ -0,0 +1,140 @@
+"""
+Daily carbon rollup.
+
+Farm summaries read `FarmDailyEmission` (one row per farm, UTC day and
+activity type) instead of summing every activity the farm has ever
+logged. Every code path that inserts or deletes a FarmActivity adjusts
+the rollup in the same transaction (callers commit).
+
+`rebuild_rollup` recomputes the rollup from the activity table, for the
+initial backfill or to repair drift:
+
+    python -m app.emission_rollup [--farm-id ID ...]
+"""
+import argparse
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from sqlalchemy import Date, cast, delete, insert, text, update
+from sqlmodel import Session, func, select
+
+from app.models import FarmActivity, FarmDailyEmission
+from app.upsert import upsert
+
+ActivityLike = Union[FarmActivity, Mapping[str, Any]]
+RollupKey = Tuple[int, date, str]
+
+
+def to_utc(moment: datetime) -> datetime:
+    """Activity dates are stored as UTC; naive datetimes are taken to be UTC already."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _field(activity: ActivityLike, name: str) -> Any:
+    return activity.get(name) if isinstance(activity, Mapping) else getattr(activity, name)
+
+
+def _rollup_deltas(activities: Iterable[ActivityLike]) -> Dict[RollupKey, Tuple[float, int]]:
+    deltas: Dict[RollupKey, Tuple[float, int]] = {}
+    for activity in activities:
+        key = (
+            _field(activity, "farm_id"),
+            to_utc(_field(activity, "date")).date(),
+            _field(activity, "activity_type"),
+        )
+        total_kg, count = deltas.get(key, (0.0, 0))
+        deltas[key] = (total_kg + (_field(activity, "carbon_footprint_kg") or 0.0), count + 1)
+    return deltas
+
+
+def add_to_rollup(db: Session, activities: Iterable[ActivityLike]) -> None:
+    """Adds new activities (models or insert dicts) to their days, one statement for the batch."""
+    deltas = _rollup_deltas(activities)
+    if not deltas:
+        return
+    upsert(
+        db, FarmDailyEmission,
+        [
+            {"farm_id": farm_id, "day": day, "activity_type": activity_type,
+             "total_kg": total_kg, "activity_count": count}
+            for (farm_id, day, activity_type), (total_kg, count) in deltas.items()
+        ],
+        key_columns=["farm_id", "day", "activity_type"],
+        accumulate=["total_kg", "activity_count"],
+    )
+
+
+def remove_from_rollup(db: Session, activities: Iterable[ActivityLike]) -> None:
+    """Takes deleted activities off their days; a day with nothing left is dropped."""
+    for (farm_id, day, activity_type), (total_kg, count) in _rollup_deltas(activities).items():
+        key = (
+            (FarmDailyEmission.farm_id == farm_id)
+            & (FarmDailyEmission.day == day)
+            & (FarmDailyEmission.activity_type == activity_type)
+        )
+        db.execute(
+            update(FarmDailyEmission).where(key)
+            .values(total_kg=FarmDailyEmission.total_kg - total_kg,
+                    activity_count=FarmDailyEmission.activity_count - count)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(FarmDailyEmission).where(key).where(FarmDailyEmission.activity_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def get_farm_breakdown(db: Session, farm_id: int) -> Dict[str, float]:
+    """Lifetime emissions of a farm per activity type."""
+    return dict(db.exec(
+        select(FarmDailyEmission.activity_type, func.sum(FarmDailyEmission.total_kg))
+        .where(FarmDailyEmission.farm_id == farm_id)
+        .group_by(FarmDailyEmission.activity_type)
+    ).all())
+
+
+def _day_expression(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(FarmActivity.date)
+    return cast(FarmActivity.date, Date)
+
+
+def rebuild_rollup(db: Session, farm_ids: Optional[List[int]] = None) -> int:
+    """Replaces the rollup rows of `farm_ids` (default: every farm). Returns the rows written."""
+    if db.get_bind().dialect.name == "postgresql":
+        # Activity writes wait for the rebuild, then apply their delta on top of it
+        db.execute(text("LOCK TABLE farmdailyemission IN EXCLUSIVE MODE"))
+
+    clear = delete(FarmDailyEmission)
+    day = _day_expression(db)
+    totals = (
+        select(
+            FarmActivity.farm_id, day, FarmActivity.activity_type,
+            func.coalesce(func.sum(FarmActivity.carbon_footprint_kg), 0.0), func.count(FarmActivity.id),
+        )
+        .group_by(FarmActivity.farm_id, day, FarmActivity.activity_type)
+    )
+    if farm_ids is not None:
+        clear = clear.where(FarmDailyEmission.farm_id.in_(farm_ids))
+        totals = totals.where(FarmActivity.farm_id.in_(farm_ids))
+
+    db.execute(clear)
+    written = db.execute(insert(FarmDailyEmission).from_select(
+        ["farm_id", "day", "activity_type", "total_kg", "activity_count"], totals
+    )).rowcount
+    db.commit()
+    return written
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily carbon rollup from the activity table.")
+    parser.add_argument("--farm-id", type=int, action="append", dest="farm_ids", help="only this farm (repeatable)")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        rows = rebuild_rollup(session, args.farm_ids)
+    print(f"Rebuilt the daily carbon rollup: {rows} rows.")
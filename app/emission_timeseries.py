@@ -0,0 +1,205 @@
+"""
+Emissions time series aggregated in SQL.
+
+Activities are bucketed by local day, ISO week (starting Monday) or month
+in the caller's timezone and summed with GROUP BY, so an endpoint reads
+one row per bucket instead of every activity in the range.
+
+Activity dates are stored as UTC. PostgreSQL converts them with
+`AT TIME ZONE` and buckets with `date_trunc`. SQLite has no timezone
+database, so the range is split wherever the zone's UTC offset changes
+(DST) and each row is shifted by the offset of its segment before
+`date()` buckets it.
+"""
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException, status
+from sqlalchemy import Date, case, cast, literal, literal_column
+from sqlmodel import Session, func, select
+
+from app.models import Farm, FarmActivity
+
+GRANULARITIES = ("day", "week", "month")
+BREAKDOWNS = ("farm", "activity_type")
+TIMESERIES_MAX_BUCKETS = int(os.getenv("EMISSIONS_TIMESERIES_MAX_BUCKETS", 1000))
+
+
+@dataclass
+class EmissionBucketRow:
+    period_start: date
+    total_kg: float
+    activity_count: int
+    farm_id: Optional[int] = None
+    activity_type: Optional[str] = None
+
+
+def resolve_timezone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown timezone '{name}'.")
+
+
+def period_start(day: date, granularity: str) -> date:
+    """The first day of the bucket `day` falls in."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_count(start: date, end: date, granularity: str) -> int:
+    if granularity == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if granularity == "week":
+        return (period_start(end, "week") - period_start(start, "week")).days // 7 + 1
+    return (end - start).days + 1
+
+
+def local_range_to_utc(start: date, end: date, tz: ZoneInfo) -> Tuple[datetime, datetime]:
+    """[start 00:00, day after end 00:00) in `tz`, as UTC datetimes."""
+    start_utc = datetime.combine(start, time.min, tzinfo=tz).astimezone(timezone.utc)
+    end_utc = datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz).astimezone(timezone.utc)
+    return start_utc, end_utc
+
+
+def _offset_minutes(tz: ZoneInfo, moment: datetime) -> int:
+    return int(moment.astimezone(tz).utcoffset().total_seconds() // 60)
+
+
+def utc_offset_segments(tz: ZoneInfo, start_utc: datetime, end_utc: datetime) -> List[Tuple[datetime, int]]:
+    """
+    (from_utc, offset_minutes) for each stretch of [start_utc, end_utc) with
+    a constant UTC offset. Walks a day at a time and bisects to the second
+    where the offset changes.
+    """
+    segments = [(start_utc, _offset_minutes(tz, start_utc))]
+    cursor = start_utc
+    while cursor < end_utc:
+        following = min(cursor + timedelta(days=1), end_utc)
+        if _offset_minutes(tz, following) != segments[-1][1]:
+            low, high = int(cursor.timestamp()), int(following.timestamp())
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _offset_minutes(tz, datetime.fromtimestamp(middle, timezone.utc)) == segments[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            changed_at = datetime.fromtimestamp(high, timezone.utc)
+            segments.append((changed_at, _offset_minutes(tz, changed_at)))
+        cursor = following
+    return segments
+
+
+def _sqlite_bucket(tz: ZoneInfo, start_utc: datetime, end_utc: datetime, granularity: str):
+    segments = utc_offset_segments(tz, start_utc, end_utc)
+    modifiers = [f"{offset:+d} minutes" for _, offset in segments]
+    if len(segments) == 1:
+        offset = literal(modifiers[0])
+    else:
+        # Stored datetimes are naive UTC strings; compare against the same
+        offset = case(
+            *((FarmActivity.date < changed_at.replace(tzinfo=None), modifier)
+              for (changed_at, _), modifier in zip(segments[1:], modifiers)),
+            else_=modifiers[-1],
+        )
+    local = func.datetime(FarmActivity.date, offset)
+    if granularity == "week":
+        # 'weekday 0' moves forward to Sunday; six days back is that week's Monday
+        return func.date(local, "weekday 0", "-6 days")
+    if granularity == "month":
+        return func.date(local, "start of month")
+    return func.date(local)
+
+
+def _postgresql_bucket(tz: ZoneInfo, granularity: str):
+    local = func.timezone(tz.key, func.timezone("UTC", FarmActivity.date))
+    return cast(func.date_trunc(granularity, local), Date)
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def emission_buckets_statement(
+    dialect_name: str,
+    owner_id: int,
+    start: date,
+    end: date,
+    granularity: str = "day",
+    tz: ZoneInfo = ZoneInfo("UTC"),
+    breakdown: Sequence[str] = (),
+    farm_ids: Optional[Sequence[int]] = None,
+):
+    """
+    SELECT period_start, [farm_id], [activity_type], total_kg, activity_count
+    over the owner's activities between the local dates `start` and `end`
+    (inclusive). Buckets with no activities are omitted. Pass `farm_ids`
+    when the owner's farms are already known, to skip the farm subquery.
+    """
+    start_utc, end_utc = local_range_to_utc(start, end, tz)
+    if dialect_name == "postgresql":
+        bucket = _postgresql_bucket(tz, granularity)
+    else:
+        bucket = _sqlite_bucket(tz, start_utc, end_utc, granularity)
+
+    breakdown_columns: List[Any] = []
+    if "farm" in breakdown:
+        breakdown_columns.append(FarmActivity.farm_id)
+    if "activity_type" in breakdown:
+        breakdown_columns.append(FarmActivity.activity_type)
+    # Grouped by the alias: repeating the bucket expression would repeat its
+    # bind parameters, which PostgreSQL does not treat as the same expression
+    group_columns = [literal_column("period_start"), *breakdown_columns]
+
+    return (
+        select(
+            bucket.label("period_start"),
+            *breakdown_columns,
+            func.coalesce(func.sum(FarmActivity.carbon_footprint_kg), 0.0),
+            func.count(FarmActivity.id),
+        )
+        .where(FarmActivity.farm_id.in_(
+            farm_ids if farm_ids is not None else select(Farm.id).where(Farm.owner_id == owner_id)
+        ))
+        .where(FarmActivity.date >= start_utc)
+        .where(FarmActivity.date < end_utc)
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+
+
+def query_emission_buckets(
+    db: Session,
+    owner_id: int,
+    start: date,
+    end: date,
+    granularity: str = "day",
+    tz: ZoneInfo = ZoneInfo("UTC"),
+    breakdown: Sequence[str] = (),
+    farm_ids: Optional[Sequence[int]] = None,
+) -> List[EmissionBucketRow]:
+    statement = emission_buckets_statement(
+        db.get_bind().dialect.name, owner_id, start, end, granularity, tz, breakdown, farm_ids
+    )
+    rows: List[EmissionBucketRow] = []
+    for row in db.exec(statement).all():
+        values: Dict[str, Any] = {"period_start": _as_date(row[0])}
+        position = 1
+        if "farm" in breakdown:
+            values["farm_id"] = row[position]
+            position += 1
+        if "activity_type" in breakdown:
+            values["activity_type"] = row[position]
+            position += 1
+        rows.append(EmissionBucketRow(total_kg=float(row[position]), activity_count=row[position + 1], **values))
+    return rows
@@ -0,0 +1,109 @@
+"""Shared outbound HTTP clients for third-party APIs.
+
+One `httpx.AsyncClient` per provider is created in the FastAPI `lifespan`
+hook and reused for the life of the process, so repeated calls to the same
+host reuse pooled keep-alive connections instead of paying DNS + TCP + TLS
+setup on every request.
+"""
+import os
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPEN_METEO_BASE_URL = os.getenv("OPEN_METEO_BASE_URL", "https://api.open-meteo.com")
+NOMINATIM_BASE_URL = os.getenv("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org")
+
+# --- Pool / timeout settings (shared by all providers) ---
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5.0))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 15.0))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 5.0))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+
+WEATHER_CLIENT = "open_meteo"
+GEOCODING_CLIENT = "nominatim"
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (installed via `httpx[http2]`)."""
+    if not HTTP_ENABLE_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_client(base_url: str, headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+    """Builds a pooled client with the configured limits and timeouts."""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            HTTP_READ_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+def _build_provider_client(name: str) -> httpx.AsyncClient:
+    if name == WEATHER_CLIENT:
+        return build_client(OPEN_METEO_BASE_URL)
+    if name == GEOCODING_CLIENT:
+        # Nominatim's usage policy requires an identifying User-Agent
+        return build_client(NOMINATIM_BASE_URL, headers={"User-Agent": "GreenFundApp/1.0"})
+    raise KeyError(f"Unknown HTTP client: {name}")
+
+
+async def start_http_clients():
+    """Creates the application-lifetime clients. Called from the lifespan hook."""
+    for name in (WEATHER_CLIENT, GEOCODING_CLIENT):
+        if name not in _clients:
+            _clients[name] = _build_provider_client(name)
+
+
+async def close_http_clients():
+    """Closes all pooled connections. Called on application shutdown."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Returns the shared client for a provider.
+    Falls back to creating it on first use (e.g. scripts that don't run the lifespan).
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_provider_client(name)
+        _clients[name] = client
+    return client
+
+
+def set_http_client(name: str, client: httpx.AsyncClient):
+    """Replaces a provider client (used by tests to inject a mock transport)."""
+    _clients[name] = client
+
+
+def get_weather_client() -> httpx.AsyncClient:
+    return get_http_client(WEATHER_CLIENT)
+
+
+def get_geocoding_client() -> httpx.AsyncClient:
+    return get_http_client(GEOCODING_CLIENT)
@@ -1,22 +1,38 @@
+from app.startup_timing import startup_timer, FirstRequestTimer  # first, so the clock covers every import
 import os # <-- 1. Import os
 from fastapi import FastAPI, APIRouter
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles # <-- Import StaticFiles
 
-from app.database import create_db_and_tables
+from app.database import engine, async_engine, read_router
+from app.read_replicas import ReadYourWritesMiddleware
+from app.schema_version import check_schema_version
+from app.http_clients import start_http_clients, close_http_clients
+from app.ai_client import start_openai_client, close_openai_client
+from app.notification_broker import start_notification_broker, close_notification_broker
+from app.password_hashing import password_hasher
 from app.routers import (
     auth, users, farms, climate, activities,
     soil, forum, climate_actions, chatbot,
-    badges, notifications
+    badges, notifications, metrics, dashboard
 )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Starting up and creating database tables...")
-    create_db_and_tables()
+    print("Starting up...")
+    check_schema_version(engine)
+    await start_http_clients()
+    await start_openai_client()
+    await start_notification_broker()
+    startup_timer.mark_ready()
     yield
     print("Shutting down...")
+    await close_http_clients()
+    await close_openai_client()
+    await close_notification_broker()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -36,9 +52,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Access-Token"],  # refreshed token after a password change
 )
 # --- ^^^^ END CORS UPDATE ^^^^ ---
 
+# Pins a user's reads to the primary for a few seconds after they write
+app.add_middleware(ReadYourWritesMiddleware, router=read_router)
+app.add_middleware(FirstRequestTimer)
+
 # --- Mount Static Files ---
 # This makes /static/farm_images/... work
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -58,6 +79,8 @@ api_router.include_router(climate_actions.router)
 api_router.include_router(chatbot.router)
 api_router.include_router(badges.router)
 api_router.include_router(notifications.router)
+api_router.include_router(metrics.router)
+api_router.include_router(dashboard.router)
 
 app.include_router(api_router)
 # --- END ROUTER CONFIGURATION ---
@@ -65,4 +88,7 @@ app.include_router(api_router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the GreenFund API"}
\ No newline at end of file
+    return {"message": "Welcome to the GreenFund API"}
+
+
+startup_timer.mark_imported()
@@ -1,7 +1,7 @@
 from sqlmodel import Field, Relationship, SQLModel, JSON
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from typing import Optional, List, TYPE_CHECKING
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from pydantic import EmailStr # Need EmailStr for User model
 
 # --- Forward References ---
@@ -18,6 +18,8 @@ class User(SQLModel, table=True):
     hashed_password: str
     location: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Bumped on password change; tokens carrying an older version are rejected
+    token_version: int = Field(default=0)
 
     # --- Relationships ---
     farms: List["Farm"] = Relationship(back_populates="owner")
@@ -41,7 +43,7 @@ class Farm(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     current_crop: Optional[str] = Field(default=None, index=True)
 
-    owner_id: int = Field(foreign_key="user.id")
+    owner_id: int = Field(foreign_key="user.id", index=True)
     owner: "User" = Relationship(back_populates="farms")
 
     activities: List["FarmActivity"] = Relationship(back_populates="farm")
@@ -63,6 +65,9 @@ class FarmActivity(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     user: "User" = Relationship(back_populates="activities")
 
+    # Keyset pagination on (date, id) within a farm
+    __table_args__ = (Index("ix_farmactivity_farm_id_date_id", "farm_id", "date", "id"),)
+
 # --- SoilReport Model ---
 class SoilReport(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -78,6 +83,12 @@ class SoilReport(SQLModel, table=True):
     farm_id: int = Field(foreign_key="farm.id")
     farm: "Farm" = Relationship(back_populates="soil_reports")
 
+    __table_args__ = (
+        Index("ix_soilreport_farm_id_date_id", "farm_id", "date", "id"),
+        # Latest report per farm: MAX(id) ... GROUP BY farm_id
+        Index("ix_soilreport_farm_id_id", "farm_id", "id"),
+    )
+
 
 # --- ForumThread Model ---
 class ForumThread(SQLModel, table=True):
@@ -91,6 +102,8 @@ class ForumThread(SQLModel, table=True):
 
     posts: List["ForumPost"] = Relationship(back_populates="thread")
 
+    __table_args__ = (Index("ix_forumthread_created_at_id", "created_at", "id"),)
+
 # --- ForumPost Model ---
 class ForumPost(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -105,6 +118,9 @@ class ForumPost(SQLModel, table=True):
     
     # --- ADDED: Relationship to Notifications ---
     notifications: List["Notification"] = Relationship(back_populates="post")
+
+    # Replies of a thread in order, and the per-thread stats of the thread list
+    __table_args__ = (Index("ix_forumpost_thread_id_created_at", "thread_id", "created_at"),)
     # --- END ADDITION ---
 
 
@@ -139,4 +155,39 @@ class Notification(SQLModel, table=True):
     # Relationships
     user: "User" = Relationship(back_populates="notifications")
     post: Optional["ForumPost"] = Relationship(back_populates="notifications")
-# --- ^^^^ END NEW MODEL ^^^^ ---
\ No newline at end of file
+
+    # Serves the default (unread only) inbox page, newest first
+    __table_args__ = (Index("ix_notification_user_id_is_read_created_at_id", "user_id", "is_read", "created_at", "id"),)
+# --- ^^^^ END NEW MODEL ^^^^ ---
+
+
+# --- Unread notification counter ---
+class NotificationCounter(SQLModel, table=True):
+    # Maintained in the same transaction as every Notification insert/mark-read
+    # (see app.notification_counter); a missing row means zero
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    unread_count: int = Field(default=0)
+
+
+# --- Daily emissions rollup ---
+class FarmDailyEmission(SQLModel, table=True):
+    # Maintained in the same transaction as every FarmActivity insert/delete
+    # (see app.emission_rollup); one row per farm, UTC day and activity type
+    farm_id: int = Field(foreign_key="farm.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    activity_type: str = Field(primary_key=True)
+    total_kg: float = Field(default=0.0)
+    activity_count: int = Field(default=0)
+
+
+# --- Geocode Cache Model ---
+class GeocodeCache(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Normalized location text (see app.utils.normalize_location_text)
+    query: str = Field(unique=True, index=True)
+    # Both None means Nominatim had no match (negative cache entry)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    hit_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_hit_at: Optional[datetime] = None
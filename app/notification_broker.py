@@ -0,0 +1,169 @@
+"""
+Pub/sub for pushing notifications to connected clients.
+
+Each open WebSocket/SSE connection subscribes to its user's channel and
+gets a bounded queue; `publish_notification` fans an event out to every
+queue of that user. The default backend is in-process, which only reaches
+clients connected to the same worker. Set NOTIFICATION_BROKER_URL to a
+redis:// URL to fan out across workers through Redis pub/sub (requires
+the optional `redis` package).
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+NOTIFICATION_BROKER_URL = os.getenv("NOTIFICATION_BROKER_URL", "memory://")
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", 100))
+NOTIFICATION_KEEPALIVE_SECONDS = float(os.getenv("NOTIFICATION_KEEPALIVE_SECONDS", 15.0))
+REDIS_CHANNEL_PREFIX = "greenfund:notifications:"
+
+
+class InMemoryBroker:
+    def __init__(self, queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        self.published += 1
+        self._deliver(user_id, event)
+
+    def _deliver(self, user_id: int, event: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # A stalled client loses its oldest events rather than growing memory
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "users": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class RedisBroker(InMemoryBroker):
+    """Publishes through Redis; one pattern subscription per worker feeds the local queues."""
+
+    def __init__(self, url: str, queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("NOTIFICATION_BROKER_URL points at Redis but the 'redis' package is not installed.")
+        self._redis = redis_asyncio.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        self.published += 1
+        await self._redis.publish(f"{REDIS_CHANNEL_PREFIX}{user_id}", json.dumps(event))
+
+    async def _read(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    user_id = int(channel[len(REDIS_CHANNEL_PREFIX):])
+                    self._deliver(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification broker lost its Redis subscription, retrying: {e}")
+                await asyncio.sleep(1.0)
+
+
+def build_broker(url: str = NOTIFICATION_BROKER_URL) -> InMemoryBroker:
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    return InMemoryBroker()
+
+
+_broker: Optional[InMemoryBroker] = None
+
+
+async def start_notification_broker():
+    """Creates and starts the broker. Called from the lifespan hook."""
+    global _broker
+    if _broker is None:
+        _broker = build_broker()
+        await _broker.start()
+
+
+async def close_notification_broker():
+    global _broker
+    if _broker is not None:
+        await _broker.close()
+        _broker = None
+
+
+def get_notification_broker() -> InMemoryBroker:
+    global _broker
+    if _broker is None:
+        # Outside the lifespan (e.g. scripts) fall back to a local broker
+        _broker = InMemoryBroker()
+    return _broker
+
+
+async def publish_notification(user_id: int, payload: Dict[str, Any], unread_count: Optional[int] = None):
+    """Pushes a new notification to the user's open connections; never raises."""
+    event = {"type": "notification", "notification": payload}
+    if unread_count is not None:
+        # Lets clients update the nav-bar badge without another request
+        event["unread_count"] = unread_count
+    try:
+        await get_notification_broker().publish(user_id, event)
+    except Exception as e:
+        print(f"ERROR: Could not publish notification for user {user_id}: {e}")
@@ -0,0 +1,93 @@
+"""
+Per-user unread notification counter.
+
+The nav-bar badge reads `NotificationCounter` by primary key instead of
+counting unread rows. Every code path that inserts a Notification or marks
+one read adjusts the counter in the same transaction (callers commit).
+
+`reconcile_unread_counters` recomputes the counters from the notification
+table and fixes any drift; run it from cron with
+
+    python -m app.notification_counter
+"""
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, update
+from sqlmodel import Session, func, select
+
+from app.models import Notification, NotificationCounter
+from app.upsert import upsert
+
+
+def increment_unread(db: Session, user_id: int, amount: int = 1) -> None:
+    if amount <= 0:
+        return
+    upsert(db, NotificationCounter, [{"user_id": user_id, "unread_count": amount}],
+           key_columns=["user_id"], accumulate=["unread_count"])
+
+
+def decrement_unread(db: Session, user_id: int, amount: int = 1) -> None:
+    if amount <= 0:
+        return
+    db.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id == user_id)
+        .values(unread_count=case(
+            (NotificationCounter.unread_count > amount, NotificationCounter.unread_count - amount),
+            else_=0,
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    count = db.exec(
+        select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id)
+    ).first()
+    return count or 0
+
+
+def reconcile_unread_counters(db: Session, user_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """
+    Sets every counter to the real number of unread notifications.
+    Returns {user_id: drift} for the counters that were wrong.
+    """
+    actual_query = (
+        select(Notification.user_id, func.count(Notification.id))
+        .where(Notification.is_read == False)
+        .group_by(Notification.user_id)
+    )
+    stored_query = select(NotificationCounter.user_id, NotificationCounter.unread_count)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        actual_query = actual_query.where(Notification.user_id.in_(user_ids))
+        stored_query = stored_query.where(NotificationCounter.user_id.in_(user_ids))
+
+    actual = dict(db.exec(actual_query).all())
+    stored = dict(db.exec(stored_query).all())
+
+    drift = {}
+    for user_id in set(actual) | set(stored):
+        expected, current = actual.get(user_id, 0), stored.get(user_id, 0)
+        if expected == current:
+            continue
+        drift[user_id] = current - expected
+        # Recount inside the write so notifications arriving meanwhile aren't lost
+        recount = (
+            select(func.count(Notification.id))
+            .where(Notification.user_id == user_id, Notification.is_read == False)
+            .scalar_subquery()
+        )
+        upsert(db, NotificationCounter, [{"user_id": user_id, "unread_count": recount}], key_columns=["user_id"])
+    db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    with Session(engine) as session:
+        fixed = reconcile_unread_counters(session)
+    print(f"Reconciled unread notification counters: {len(fixed)} corrected.")
+    for user_id, delta in sorted(fixed.items()):
+        print(f"  user {user_id}: counter was off by {delta:+d}")
@@ -0,0 +1,58 @@
+"""
+Keyset (cursor) pagination helpers.
+
+List endpoints are ordered newest first on (timestamp, id). The cursor is
+an opaque token holding the (timestamp, id) of the last row returned, and
+the next page starts strictly after it, so every page is an index range
+scan no matter how deep the client has paged.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+
+def page_size(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)) -> int:
+    """Dependency for the `limit` query parameter shared by paginated endpoints."""
+    return limit
+
+
+def keyset_page(statement, sort_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Orders `statement` newest first on (sort_column, id_column), starts after
+    `cursor` and fetches one extra row so we know whether a next page exists.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    return statement.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Any], limit: int, sort_attr: str, id_attr: str = "id") -> Tuple[List[Any], Optional[str]]:
+    """Trims the look-ahead row and returns (items, next_cursor)."""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+    return items, next_cursor
@@ -0,0 +1,96 @@
+"""
+Bounded executor for password hashing.
+
+bcrypt is deliberately slow (~250 ms at cost 12), so hashing and checking
+passwords on the shared threadpool lets a burst of logins starve every
+other sync route. Password work instead runs on a small dedicated pool;
+bcrypt releases the GIL, so threads give real parallelism. Requests
+beyond the pool size wait in a bounded queue, and once that is full new
+requests are refused straight away with `PasswordHashingBusy` (surfaced as
+503 + Retry-After) instead of queueing without limit.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", 2))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasherPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._busy_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise PasswordHashingBusy()
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            executor = self._executor
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._busy_seconds += elapsed
+
+        future = executor.submit(timed)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Runs `fn` on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def run_sync(self, fn: Callable, *args: Any) -> Any:
+        """Same admission control for callers already on a worker thread."""
+        return self._submit(fn, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_hash_ms": round(self._busy_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasherPool()
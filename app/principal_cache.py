@@ -0,0 +1,85 @@
+"""
+In-process cache of authenticated principals.
+
+Access tokens carry the user id (`uid`) and the user's `token_version`
+(`ver`). `get_current_user` looks the pair up here before going to the
+database; an entry only matches the version it was stored with, so tokens
+issued before a password change (which bumps the version) miss and are
+then rejected against the database.
+
+Entries hold plain column values, never a session-bound `User`, and
+expire after PRINCIPAL_CACHE_TTL_SECONDS. Each worker has its own cache:
+profile edits are invalidated immediately on the worker that handled them
+and within the TTL everywhere else.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        ttl: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        # user id -> (token version, column values, stored at)
+        self._entries: "OrderedDict[int, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        # Sync dependencies run in the threadpool
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version or self._clock() - entry[2] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, version: int, values: Dict[str, Any]):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (version, values, self._clock())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
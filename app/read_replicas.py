@@ -0,0 +1,148 @@
+"""
+Read-replica routing.
+
+Read-heavy GET endpoints take their session from `get_read_db` (in
+app.database), which hands out a session on one of the
+DATABASE_REPLICA_URLS, round-robin, and falls back to the primary when
+none are configured or reachable.
+
+* Health: a replica that fails to connect is taken out of rotation for
+  REPLICA_RETRY_SECONDS, then tried again on the next read.
+* Read-your-writes: replicas lag the primary, so a user who has just
+  written (any successful non-GET request) reads from the primary for
+  READ_YOUR_WRITES_SECONDS. The window is tracked per worker, keyed by
+  the `uid` claim of the access token.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+READ_YOUR_WRITES_MAX_USERS = int(os.getenv("READ_YOUR_WRITES_MAX_USERS", 10000))
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        retry_seconds: float = REPLICA_RETRY_SECONDS,
+        pin_seconds: float = READ_YOUR_WRITES_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_seconds = retry_seconds
+        self.pin_seconds = pin_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+        # replica index -> time it was taken out of rotation
+        self._down_since: Dict[int, float] = {}
+        # user id -> time of their last write
+        self._recent_writers: "OrderedDict[int, float]" = OrderedDict()
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.pinned_reads = 0
+        self.failovers = 0
+
+    def record_write(self, user_id: int):
+        if not self.replicas or self.pin_seconds <= 0:
+            return
+        with self._lock:
+            self._recent_writers[user_id] = self._clock()
+            self._recent_writers.move_to_end(user_id)
+            while len(self._recent_writers) > READ_YOUR_WRITES_MAX_USERS:
+                self._recent_writers.popitem(last=False)
+
+    def _pinned(self, user_id: Optional[int]) -> bool:
+        written_at = self._recent_writers.get(user_id) if user_id is not None else None
+        return written_at is not None and self._clock() - written_at < self.pin_seconds
+
+    def candidates(self, user_id: Optional[int] = None) -> List[Engine]:
+        """Engines to try for a read, in order; always ends with the primary."""
+        with self._lock:
+            if not self.replicas:
+                return [self.primary]
+            if self._pinned(user_id):
+                self.pinned_reads += 1
+                return [self.primary]
+            now = self._clock()
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+            healthy = []
+            for offset in range(len(self.replicas)):
+                index = (start + offset) % len(self.replicas)
+                down_since = self._down_since.get(index)
+                if down_since is None or now - down_since >= self.retry_seconds:
+                    healthy.append(self.replicas[index])
+            return healthy + [self.primary]
+
+    def mark_down(self, engine: Engine, error: Exception):
+        index = self.replicas.index(engine)
+        with self._lock:
+            self._down_since[index] = self._clock()
+            self.failovers += 1
+        print(f"Read replica {index + 1} unavailable, taking it out of rotation: {error}")
+
+    def mark_used(self, engine: Engine):
+        with self._lock:
+            if engine is self.primary:
+                self.primary_reads += 1
+                return
+            self.replica_reads += 1
+            index = self.replicas.index(engine)
+            if self._down_since.pop(index, None) is not None:
+                print(f"Read replica {index + 1} is back in rotation.")
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "replicas": len(self.replicas),
+            "replicas_down": sum(1 for since in self._down_since.values() if now - since < self.retry_seconds),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "pinned_reads": self.pinned_reads,
+            "failovers": self.failovers,
+        }
+
+
+def user_id_from_authorization(authorization: Optional[str]) -> Optional[int]:
+    """The `uid` claim of a Bearer token, without touching the database."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    from app.security import decode_token_claims
+
+    claims = decode_token_claims(authorization[7:].strip())
+    return claims.get("uid") if claims else None
+
+
+class ReadYourWritesMiddleware:
+    """Records successful writes so the writer's next reads skip the replicas."""
+
+    def __init__(self, app, router: ReplicaRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not self.router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = dict(scope["headers"])
+                user_id = user_id_from_authorization(headers.get(b"authorization", b"").decode("latin-1"))
+                if user_id is not None:
+                    self.router.record_write(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_and_record)
@@ -1,27 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import csv
+import io
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import insert
 from sqlmodel import Session, select, func, desc # Import desc
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta, timezone
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
-from app.database import get_db
+from app.database import get_db, get_async_db, get_read_db
 # Import Farm model
 from app.models import FarmActivity, User, Farm
-from app.schemas import FarmActivityCreate, FarmActivityRead, WeeklyEmissionsResponse
+from app.schemas import (
+    FarmActivityCreate, FarmActivityRead, WeeklyEmissionsResponse,
+    BulkActivityResponse, BulkActivityRowError, CursorPage,
+    EmissionBucket, EmissionsTimeseriesResponse
+)
 from app.security import get_current_user
+from app.pagination import keyset_page, build_page, page_size
 from app.carbon_model import estimate_carbon_with_ai
+from app.emission_factors import EMISSION_FACTORS, EMISSION_FACTORS_VERSION
+from app.emission_rollup import add_to_rollup, get_farm_breakdown, remove_from_rollup, to_utc
+from app.emission_timeseries import (
+    BREAKDOWNS, GRANULARITIES, TIMESERIES_MAX_BUCKETS,
+    bucket_count, query_emission_buckets, resolve_timezone
+)
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
 
+BULK_MAX_ROWS = int(os.getenv("BULK_ACTIVITY_MAX_ROWS", 10000))
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_ACTIVITY_CHUNK_SIZE", 500))
+BULK_ESTIMATION_CONCURRENCY = int(os.getenv("BULK_ESTIMATION_CONCURRENCY", 8))
+
 @router.post("/", response_model=FarmActivityRead, status_code=status.HTTP_201_CREATED)
 async def create_activity(
     activity: FarmActivityCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    farm = db.get(Farm, activity.farm_id)
+    farm = await db.get(Farm, activity.farm_id)
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Farm not found")
+    # Give the connection back to the pool while the estimate runs
+    await db.close()
 
     estimated_carbon = await estimate_carbon_with_ai(
         activity.activity_type,
@@ -31,8 +54,7 @@ async def create_activity(
     )
 
     activity_data = activity.model_dump()
-    if activity_data.get("date") is None:
-        activity_data["date"] = datetime.now(timezone.utc)
+    activity_data["date"] = to_utc(activity_data.get("date") or datetime.now(timezone.utc))
     activity_data["user_id"] = current_user.id
     activity_data["carbon_footprint_kg"] = estimated_carbon
 
@@ -45,18 +67,174 @@ async def create_activity(
 
     try:
         db.add(db_activity)
-        db.commit()
-        db.refresh(db_activity)
+        await db.run_sync(add_to_rollup, [db_activity])
+        await db.commit()
+        await db.refresh(db_activity)
         return db_activity
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"ERROR: Failed to save activity to DB: {e}")
         raise HTTPException(status_code=500, detail="Could not save activity to database.")
 
 
-@router.get("/farm/{farm_id}", response_model=List[FarmActivityRead])
+# --- Bulk ingestion ---
+def _parse_csv_rows(text: str) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(text))
+    rows = []
+    for raw in reader:
+        # Empty CSV cells mean "not provided"
+        rows.append({key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                     for key, value in raw.items() if key})
+    return rows
+
+
+async def _read_bulk_rows(request: Request) -> List[Any]:
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            payload = await request.json()
+            if isinstance(payload, dict):
+                payload = payload.get("activities")
+            if not isinstance(payload, list):
+                raise ValueError("expected a JSON array of activities")
+            return payload
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise ValueError("expected a CSV upload in the 'file' field")
+            return _parse_csv_rows((await upload.read()).decode("utf-8-sig"))
+        if content_type.startswith(("text/csv", "text/plain", "application/csv")):
+            return _parse_csv_rows((await request.body()).decode("utf-8-sig"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not parse bulk upload: {e}")
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send a JSON array (application/json) or CSV (text/csv or a multipart 'file')."
+    )
+
+
+async def estimate_carbon_batch(activities: List[FarmActivityCreate]) -> List[float]:
+    """
+    Estimates carbon for many activities, calling the estimator once per
+    distinct (type, value, unit, description) with bounded concurrency.
+    """
+    semaphore = asyncio.Semaphore(BULK_ESTIMATION_CONCURRENCY)
+    keys = [(a.activity_type, a.value, a.unit, a.description) for a in activities]
+    unique_keys = list(dict.fromkeys(keys))
+
+    async def estimate(key: Tuple):
+        async with semaphore:
+            return await estimate_carbon_with_ai(*key)
+
+    results = await asyncio.gather(*(estimate(key) for key in unique_keys))
+    by_key = dict(zip(unique_keys, results))
+    return [by_key[key] for key in keys]
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkActivityResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/FarmActivityCreate"}}
+                },
+                "text/csv": {"schema": {"type": "string"}},
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}}
+                },
+            },
+        }
+    },
+)
+async def create_activities_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Log many activities at once from a JSON array or a CSV with the columns
+    farm_id, activity_type, description, date, value, unit.
+    Invalid rows are reported individually and do not abort the batch.
+    """
+    raw_rows = await _read_bulk_rows(request)
+    if len(raw_rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A bulk upload may contain at most {BULK_MAX_ROWS} activities."
+        )
+
+    errors: List[BulkActivityRowError] = []
+    valid: List[Tuple[int, FarmActivityCreate]] = []
+    for row_number, raw in enumerate(raw_rows, start=1):
+        try:
+            valid.append((row_number, FarmActivityCreate.model_validate(raw)))
+        except ValidationError as e:
+            messages = "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+            errors.append(BulkActivityRowError(row=row_number, error=messages))
+
+    # One ownership query for every farm referenced in the batch
+    farm_ids = {activity.farm_id for _, activity in valid}
+    owned_farm_ids = set()
+    if farm_ids:
+        owned_farm_ids = set((await db.exec(
+            select(Farm.id)
+            .where(Farm.id.in_(farm_ids))
+            .where(Farm.owner_id == current_user.id)
+        )).all())
+        await db.close()
+
+    owned = []
+    for row_number, activity in valid:
+        if activity.farm_id in owned_farm_ids:
+            owned.append((row_number, activity))
+        else:
+            errors.append(BulkActivityRowError(row=row_number, error="Farm not found"))
+
+    footprints = await estimate_carbon_batch([activity for _, activity in owned])
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for (row_number, activity), footprint in zip(owned, footprints):
+        data = activity.model_dump()
+        data["date"] = to_utc(data.get("date") or now)
+        data["user_id"] = current_user.id
+        data["carbon_footprint_kg"] = footprint
+        rows.append((row_number, data))
+
+    created = 0
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+        try:
+            await db.exec(insert(FarmActivity), params=[data for _, data in chunk])
+            await db.run_sync(add_to_rollup, [data for _, data in chunk])
+            await db.commit()
+            created += len(chunk)
+        except Exception as e:
+            await db.rollback()
+            print(f"ERROR: Bulk insert of {len(chunk)} activities failed: {e}")
+            errors.extend(
+                BulkActivityRowError(row=row_number, error="Could not save activity to database.")
+                for row_number, _ in chunk
+            )
+
+    errors.sort(key=lambda err: err.row)
+    return BulkActivityResponse(
+        received=len(raw_rows),
+        created=created,
+        failed=len(raw_rows) - created,
+        errors=errors,
+    )
+
+
+@router.get("/farm/{farm_id}", response_model=CursorPage[FarmActivityRead])
 def get_activities_for_farm(
     farm_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Depends(page_size),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -64,12 +242,12 @@ def get_activities_for_farm(
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Farm not found")
 
-    activities = db.exec(
-        select(FarmActivity)
-        .where(FarmActivity.farm_id == farm_id)
-        .order_by(desc(FarmActivity.date))
-    ).all()
-    return activities
+    statement = keyset_page(
+        select(FarmActivity).where(FarmActivity.farm_id == farm_id),
+        FarmActivity.date, FarmActivity.id, cursor, limit,
+    )
+    activities, next_cursor = build_page(db.exec(statement).all(), limit, "date")
+    return CursorPage(items=activities, next_cursor=next_cursor)
     
 # --- vvvv ADD THIS NEW ENDPOINT vvvv ---
 @router.get("/me/recent", response_model=List[FarmActivityRead])
@@ -85,7 +263,11 @@ def get_my_recent_activities(
     user_farm_ids = db.exec(
         select(Farm.id).where(Farm.owner_id == current_user.id)
     ).all()
-    
+    return recent_activities(db, user_farm_ids, limit)
+
+
+def recent_activities(db: Session, user_farm_ids: List[int], limit: int = 5) -> List[FarmActivity]:
+    """The newest activities across a known set of farms; shared with the dashboard."""
     if not user_farm_ids:
         return [] # Return empty list if user has no farms
 
@@ -101,6 +283,27 @@ def get_my_recent_activities(
 # --- ^^^^ END NEW ENDPOINT ^^^^ ---
 
 
+@router.get("/emission-factors")
+def get_emission_factors():
+    """
+    List the local emission-factor table used to estimate activity footprints.
+    Combinations not listed here are estimated by the AI model.
+    """
+    return {
+        "version": EMISSION_FACTORS_VERSION,
+        "factors": [
+            {
+                "activity_type": activity,
+                "unit": unit,
+                "kg_co2e_per_unit": factor.kg_co2e_per_unit,
+                "assumed_input": factor.assumed_input,
+                "source": factor.source,
+            }
+            for (activity, unit), factor in EMISSION_FACTORS.items()
+        ],
+    }
+
+
 @router.delete("/{activity_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_activity(
     activity_id: int,
@@ -114,6 +317,7 @@ def delete_activity(
     if activity.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    remove_from_rollup(db, [activity])
     db.delete(activity)
     db.commit()
     return
@@ -126,7 +330,7 @@ class CarbonSummary(BaseModel):
 @router.get("/farm/{farm_id}/carbon_summary", response_model=CarbonSummary)
 def get_carbon_summary_for_farm(
     farm_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # ... (carbon summary logic) ...
@@ -134,64 +338,76 @@ def get_carbon_summary_for_farm(
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Farm not found")
 
-    total_carbon = db.exec(
-        select(func.sum(FarmActivity.carbon_footprint_kg))
-        .where(FarmActivity.farm_id == farm_id)
-    ).first()
-
-    breakdown_query = db.exec(
-        select(
-            FarmActivity.activity_type,
-            func.sum(FarmActivity.carbon_footprint_kg)
-        )
-        .where(FarmActivity.farm_id == farm_id)
-        .group_by(FarmActivity.activity_type)
-    ).all()
-
-    breakdown_dict = {activity: carbon for activity, carbon in breakdown_query if carbon is not None}
+    # A few rows per active day from the rollup, not the farm's whole activity history
+    breakdown_dict = get_farm_breakdown(db, farm_id)
 
     return CarbonSummary(
-        total_carbon_kg=total_carbon or 0.0,
+        total_carbon_kg=sum(breakdown_dict.values()),
         breakdown_by_activity=breakdown_dict
     )
 
-@router.get("/emissions/weekly", response_model=WeeklyEmissionsResponse)
-def get_weekly_emissions_summary(
-    db: Session = Depends(get_db),
+@router.get("/emissions/timeseries", response_model=EmissionsTimeseriesResponse)
+def get_emissions_timeseries(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "day",
+    breakdown: List[str] = Query(default=[]),
+    tz: str = "UTC",
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    # ... (weekly emissions logic) ...
-    today = datetime.now(timezone.utc).date()
-    seven_days_ago = today - timedelta(days=6)
-    user_farm_ids_query = select(Farm.id).where(Farm.owner_id == current_user.id)
-    user_farm_ids = db.exec(user_farm_ids_query).all()
+    """
+    Emissions across all of the user's farms, summed per day, week (from
+    Monday) or month of the local calendar in `tz`. `start` and `end` are
+    inclusive local dates; by default the last 30 days. Repeat `breakdown`
+    with `farm` and/or `activity_type` to split each bucket.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}.")
+    unknown = [value for value in breakdown if value not in BREAKDOWNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"breakdown must be any of {', '.join(BREAKDOWNS)}.")
+    zone = resolve_timezone(tz)
 
-    if not user_farm_ids:
-        return WeeklyEmissionsResponse(total_emissions_kg=0.0, daily_emissions=[0.0]*7)
+    end = end or datetime.now(zone).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+    if bucket_count(start, end, granularity) > TIMESERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The range spans more than {TIMESERIES_MAX_BUCKETS} {granularity} buckets; use a coarser granularity."
+        )
 
-    start_datetime = datetime.combine(seven_days_ago, datetime.min.time(), tzinfo=timezone.utc)
-    end_datetime = datetime.combine(today, datetime.max.time(), tzinfo=timezone.utc)
+    rows = query_emission_buckets(db, current_user.id, start, end, granularity, zone, breakdown)
+    return EmissionsTimeseriesResponse(
+        start=start,
+        end=end,
+        granularity=granularity,
+        timezone=zone.key,
+        total_emissions_kg=round(sum(row.total_kg for row in rows), 2),
+        buckets=[EmissionBucket(**vars(row)) for row in rows],
+    )
 
-    activities = db.exec(
-        select(FarmActivity)
-        .where(FarmActivity.farm_id.in_(user_farm_ids))
-        .where(FarmActivity.date >= start_datetime)
-        .where(FarmActivity.date <= end_datetime)
-    ).all()
 
-    daily_totals = { (seven_days_ago + timedelta(days=i)): 0.0 for i in range(7) }
-    total_emissions = 0.0
+@router.get("/emissions/weekly", response_model=WeeklyEmissionsResponse)
+def get_weekly_emissions_summary(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The last seven UTC days, oldest first; a fixed view of /emissions/timeseries."""
+    return weekly_emissions(db, current_user.id)
 
-    for activity in activities:
-        activity_date = activity.date.astimezone(timezone.utc).date()
-        if activity_date in daily_totals:
-            footprint = activity.carbon_footprint_kg or 0.0
-            daily_totals[activity_date] += footprint
-            total_emissions += footprint
 
-    daily_emissions_list = [daily_totals[seven_days_ago + timedelta(days=i)] for i in range(7)]
+def weekly_emissions(db: Session, owner_id: int, farm_ids: Optional[List[int]] = None) -> WeeklyEmissionsResponse:
+    today = datetime.now(timezone.utc).date()
+    seven_days_ago = today - timedelta(days=6)
+    rows = query_emission_buckets(db, owner_id, seven_days_ago, today, farm_ids=farm_ids)
+
+    daily_totals = {row.period_start: row.total_kg for row in rows}
+    daily_emissions_list = [daily_totals.get(seven_days_ago + timedelta(days=i), 0.0) for i in range(7)]
 
     return WeeklyEmissionsResponse(
-        total_emissions_kg=round(total_emissions, 2),
+        total_emissions_kg=round(sum(daily_emissions_list), 2),
         daily_emissions=daily_emissions_list
-    )
\ No newline at end of file
+    )
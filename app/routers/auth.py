@@ -1,23 +1,26 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app import models, schemas, security # Make sure these imports are correct
-from app.database import get_db
+from app.database import get_async_db
 from typing import Annotated # Import Annotated
+from app.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_create: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.exec(select(models.User).where(
-        models.User.email == user_create.email)).first()
+async def register_user(user_create: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = (await db.exec(select(models.User).where(
+        models.User.email == user_create.email))).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="Email already registered")
     
-    hashed_password = security.get_password_hash(user_create.password)
+    # bcrypt runs on the bounded hashing pool, not the event loop or the shared threadpool
+    hashed_password = await security.get_password_hash_async(user_create.password)
     
     # Use your original model validation
     db_user = models.User.model_validate(
@@ -32,27 +35,43 @@ def register_user(user_create: schemas.UserCreate, db: Session = Depends(get_db)
     # )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 # --- THIS IS THE FIX ---
 @router.post("/token", response_model=schemas.Token)
 # --- END FIX ---
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], # Use Annotated
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.exec(select(models.User).where(
-        models.User.email == form_data.username)).first()
+    user = (await db.exec(select(models.User).where(
+        models.User.email == form_data.username))).first()
     
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password", 
             headers={"WWW-Authenticate": "Bearer"}
         )
+
+    # Read before the rehash below, whose rollback would expire `user`
+    claims = security.token_claims_for(user)
+
+    # Upgrade the stored hash when BCRYPT_ROUNDS has changed since it was made
+    if security.password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await security.get_password_hash_async(form_data.password)
+            db.add(user)
+            await db.commit()
+            principal_cache.invalidate(user.id)
+        except HTTPException:
+            await db.rollback()  # pool is busy; keep the old hash and retry on a later login
+        except Exception as e:
+            await db.rollback()
+            print(f"Error rehashing password for user {user.id}: {e}")
         
     # Check if ACCESS_TOKEN_EXPIRE_MINUTES is in your security file
     # If not, just remove the 'expires_delta' part
@@ -64,6 +83,6 @@ def login_for_access_token(
     access_token_expires = timedelta(minutes=expires_minutes)
     
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=claims, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -42,13 +42,15 @@ def get_my_badge_count(
     Get the total count of badges earned by the current user.
     (This is for the dashboard card)
     """
-    # This query counts the rows in UserBadge for the current user
-    count = db.exec(
+    return BadgeCountResponse(count=count_user_badges(db, current_user.id))
+
+
+def count_user_badges(db: Session, user_id: int) -> int:
+    # This query counts the rows in UserBadge for the user
+    return db.exec(
         select(func.count(UserBadge.badge_id))
-        .where(UserBadge.user_id == current_user.id)
+        .where(UserBadge.user_id == user_id)
     ).one()
-    
-    return BadgeCountResponse(count=count)
 
 
 # --- Test Endpoint (So you can see it work) ---
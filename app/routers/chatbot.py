@@ -1,8 +1,11 @@
 # GreenFund-test-Backend-backup/app/routers/chatbot.py
-from fastapi import APIRouter
+import json
+import anyio
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import APIError # Import error type
-from app.soil_model import get_openai_client # Import the correct client function
+from app.ai_client import create_chat_completion, stream_chat_completion, get_openai_client, AIServiceError
+from app.chat_cache import chat_answer_cache
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
@@ -19,10 +22,15 @@ def get_chatbot_system_prompt() -> str:
     """
 
 @router.post("/ask")
-async def ask_chatbot(request: ChatRequest):
+async def ask_chatbot(request: ChatRequest, response: Response):
+    cached_reply = chat_answer_cache.get(request.prompt)
+    if cached_reply is not None:
+        response.headers["X-Cache"] = "HIT"
+        return {"reply": cached_reply}
+    response.headers["X-Cache"] = "MISS"
+
     try:
-        client = get_openai_client()
-        completion = client.chat.completions.create(
+        completion = await create_chat_completion(
             model="gpt-4o-mini", # Use a standard chat model
             messages=[
                 {"role": "system", "content": get_chatbot_system_prompt()},
@@ -30,11 +38,78 @@ async def ask_chatbot(request: ChatRequest):
             ]
         )
         response_content = completion.choices[0].message.content
+        chat_answer_cache.set(request.prompt, response_content)
         return {"reply": response_content}
-    except APIError as e:
+    except AIServiceError as e:
         print(f"OpenAI API Error during chatbot request: {e}")
         raise HTTPException(status_code=e.status_code or 500, detail=f"AI chatbot failed: {e.message}")
     except Exception as e:
         print(f"Error calling OpenAI for chatbot: {e}")
         # Use a generic error message for the user in case of failure
-        raise HTTPException(status_code=500, detail="Sorry, the chatbot encountered an error. Please try again later.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Sorry, the chatbot encountered an error. Please try again later.")
+
+
+def _sse_event(data: dict, event: str = None) -> str:
+    """Formats one Server-Sent Event; JSON keeps newlines inside tokens safe."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/stream")
+async def ask_chatbot_stream(request: ChatRequest, http_request: Request):
+    """
+    Same as /ask, but streams the reply as Server-Sent Events:
+    `data: {"token": "..."}` per chunk, then `event: done`.
+    If the client disconnects, the upstream completion is cancelled.
+    """
+    cached_reply = chat_answer_cache.get(request.prompt)
+    if cached_reply is not None:
+        async def cached_stream():
+            yield _sse_event({"token": cached_reply})
+            yield _sse_event({}, event="done")
+        return StreamingResponse(
+            cached_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": "HIT"},
+        )
+
+    try:
+        get_openai_client()  # fail with a normal HTTP error before streaming starts
+    except HTTPException:
+        raise HTTPException(status_code=500, detail="Sorry, the chatbot encountered an error. Please try again later.")
+
+    async def event_stream():
+        tokens = stream_chat_completion(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": get_chatbot_system_prompt()},
+                {"role": "user", "content": request.prompt}
+            ]
+        )
+        reply_parts = []
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    print("GreenBot client disconnected, cancelling completion.")
+                    return
+                reply_parts.append(token)
+                yield _sse_event({"token": token})
+            # Only complete answers are cached
+            chat_answer_cache.set(request.prompt, "".join(reply_parts))
+            yield _sse_event({}, event="done")
+        except AIServiceError as e:
+            print(f"OpenAI API Error during chatbot stream: {e}")
+            yield _sse_event({"detail": f"AI chatbot failed: {e.message}"}, event="error")
+        except Exception as e:
+            print(f"Error streaming OpenAI chatbot reply: {e}")
+            yield _sse_event({"detail": "Sorry, the chatbot encountered an error. Please try again later."}, event="error")
+        finally:
+            # Shielded so the upstream stream is closed even when the response task is cancelled
+            with anyio.CancelScope(shield=True):
+                await tokens.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Cache": "MISS"},
+    )
@@ -1,37 +1,14 @@
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select, desc
-from typing import Dict, Any # Added Dict, Any
 
 from app.database import get_db
 from app.models import Farm, User, FarmActivity
 from app.security import get_current_user
 from app.recommendations import generate_recommendations # Keep using this
+from app.weather import get_forecast
 
 router = APIRouter(prefix="/climate", tags=["Climate"])
 
-# Use the same helper function for consistency
-async def _fetch_weather_data(latitude: float, longitude: float, daily_params: str) -> Dict[str, Any]:
-    """Fetches weather data from Open-Meteo."""
-    WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
-    params = {"latitude": latitude, "longitude": longitude, "daily": daily_params, "timezone": "auto"}
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(WEATHER_API_URL, params=params, timeout=10.0)
-            response.raise_for_status()
-            # Return the full forecast structure, not just daily
-            return response.json()
-    except httpx.HTTPStatusError as e:
-        print(f"ERROR: Open-Meteo API returned status {e.response.status_code}: {e.response.text}")
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Weather service returned an error.")
-    except httpx.RequestError as e:
-        print(f"ERROR: Could not connect to Open-Meteo API: {e}")
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not connect to the weather service.")
-    except Exception as e:
-        print(f"ERROR: An unexpected error occurred while fetching weather data: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
-
-
 @router.get("/{farm_id}/forecast")
 async def get_weather_forecast_and_recommendations( # Renamed function for clarity
     farm_id: int,
@@ -59,7 +36,7 @@ async def get_weather_forecast_and_recommendations( # Renamed function for clari
     # --- END ---
 
     try:
-        full_forecast_data = await _fetch_weather_data(farm.latitude, farm.longitude, weather_params)
+        full_forecast_data = await get_forecast(farm.latitude, farm.longitude, weather_params)
         daily_data = full_forecast_data.get("daily", {})
 
         # Call the updated recommendation function
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import exc as sa_exc
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_async_db
+from app.models import Farm, User
+from app.notification_counter import get_unread_count
+from app.routers.activities import recent_activities, weekly_emissions
+from app.routers.badges import count_user_badges
+from app.routers.soil import crop_suggestion_summary
+from app.schemas import DashboardResponse, FarmActivityRead, FarmRead
+from app.security import get_current_user
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_SECTION_TIMEOUT_SECONDS", 5))
+# Pooled connections one dashboard request may hold at once
+DASHBOARD_MAX_CONNECTIONS = int(os.getenv("DASHBOARD_MAX_CONNECTIONS", 2))
+DASHBOARD_RECENT_ACTIVITIES = 5
+
+
+def _read_farms(db: Session, user_id: int) -> List[FarmRead]:
+    farms = db.exec(select(Farm).where(Farm.owner_id == user_id)).all()
+    return [FarmRead.model_validate(farm) for farm in farms]
+
+
+def _read_recent_activities(db: Session, farm_ids: List[int]) -> List[FarmActivityRead]:
+    return [FarmActivityRead.model_validate(activity)
+            for activity in recent_activities(db, farm_ids, DASHBOARD_RECENT_ACTIVITIES)]
+
+
+async def _section(bind, connections: asyncio.Semaphore, name: str, function: Callable[..., Any], *args) -> Any:
+    # Sessions can't run queries concurrently, so every section gets its own,
+    # but a request holds at most DASHBOARD_MAX_CONNECTIONS of them
+    async with connections:
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            try:
+                # Waiting for the pool (up to DB_POOL_TIMEOUT) doesn't count against the section
+                await session.connection()
+                return await asyncio.wait_for(session.run_sync(function, *args), DASHBOARD_SECTION_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"Dashboard section '{name}' timed out after {DASHBOARD_SECTION_TIMEOUT_SECONDS}s")
+                raise
+            except Exception as e:
+                print(f"ERROR: Dashboard section '{name}' failed: {e}")
+                raise
+
+
+@router.get("/", response_model=DashboardResponse)
+async def get_dashboard(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Everything the dashboard shows after login in one round trip. The user's
+    farms are resolved once and the other sections run concurrently, each on
+    its own connection but never more than DASHBOARD_MAX_CONNECTIONS at once.
+    A section that fails or times out is left null and named in `errors`; the
+    rest of the response is still valid.
+    """
+    bind = db.bind
+    # The request's own session is only used for its engine
+    await db.close()
+    user_id = current_user.id
+    connections = asyncio.Semaphore(DASHBOARD_MAX_CONNECTIONS)
+
+    sections: Dict[str, Awaitable[Any]] = {
+        "badge_count": _section(bind, connections, "badge_count", count_user_badges, user_id),
+        "unread_notifications": _section(bind, connections, "unread_notifications", get_unread_count, user_id),
+    }
+    # Independent of the farms; start them while the farms load
+    tasks = {name: asyncio.ensure_future(section) for name, section in sections.items()}
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    try:
+        results["farms"] = await _section(bind, connections, "farms", _read_farms, user_id)
+    except Exception:
+        errors["farms"] = "unavailable"
+
+    if "farms" in results:
+        farm_ids = [farm.id for farm in results["farms"]]
+        tasks["recent_activities"] = asyncio.ensure_future(
+            _section(bind, connections, "recent_activities", _read_recent_activities, farm_ids))
+        tasks["weekly_emissions"] = asyncio.ensure_future(
+            _section(bind, connections, "weekly_emissions", weekly_emissions, user_id, farm_ids))
+        tasks["crop_suggestions"] = asyncio.ensure_future(
+            _section(bind, connections, "crop_suggestions", crop_suggestion_summary, farm_ids))
+    else:
+        for name in ("recent_activities", "weekly_emissions", "crop_suggestions"):
+            errors[name] = "farms unavailable"
+
+    outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for name, outcome in zip(tasks, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[name] = "timed out"
+        elif isinstance(outcome, sa_exc.TimeoutError):
+            errors[name] = "no database connection available"
+        elif isinstance(outcome, BaseException):
+            errors[name] = "unavailable"
+        else:
+            results[name] = outcome
+
+    return DashboardResponse(**results, errors=errors)
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select, func # <-- 1. Import 'func'
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 
-from app.database import get_db
-# 2. Import Badge and UserBadge
-from app.models import Farm, User, Badge, UserBadge 
+from app.database import get_db, get_async_db
+from app.models import Farm, User
 from app.schemas import FarmCreate, FarmRead
 from app.security import get_current_user
 from app.utils import get_coords_from_location 
+from app.badge_service import emit_badge_event, BadgeEvent
 
 router = APIRouter(prefix="/farms", tags=["Farms"])
 
@@ -15,10 +16,11 @@ router = APIRouter(prefix="/farms", tags=["Farms"])
 @router.post("/", response_model=FarmRead, status_code=status.HTTP_201_CREATED)
 async def create_farm(
     farm: FarmCreate, 
-    db: Session = Depends(get_db), 
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db), 
     current_user: User = Depends(get_current_user)
 ):
-    coords = await get_coords_from_location(farm.location_text)
+    coords = await get_coords_from_location(farm.location_text, db)
     if not coords:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -33,37 +35,14 @@ async def create_farm(
 
     try:
         db.add(db_farm)
-        db.commit()
-        db.refresh(db_farm)
+        await db.commit()
+        await db.refresh(db_farm)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error creating farm: {e}")
         raise HTTPException(status_code=500, detail="Error creating farm")
 
-    # --- vvvv NEW BADGE LOGIC vvvv ---
-    try:
-        # Check how many farms this user owns
-        farm_count = db.exec(
-            select(func.count(Farm.id))
-            .where(Farm.owner_id == current_user.id)
-        ).one()
-
-        if farm_count == 1:
-            # This is their first farm, award the badge
-            badge_name = "First Farm"
-            badge = db.exec(select(Badge).where(Badge.name == badge_name)).first()
-            
-            if badge:
-                # Check if they already have it (e.g., from testing)
-                existing_link = db.get(UserBadge, (current_user.id, badge.id))
-                if not existing_link:
-                    new_badge_link = UserBadge(user_id=current_user.id, badge_id=badge.id)
-                    db.add(new_badge_link)
-                    db.commit() # Commit the new badge link
-    except Exception as e:
-        # If badge logic fails, just log it but don't crash the farm creation
-        print(f"Error awarding 'First Farm' badge: {e}")
-    # --- ^^^^ END NEW BADGE LOGIC ^^^^ ---
+    emit_badge_event(background_tasks, db, current_user.id, BadgeEvent.FARM_CREATED)
 
     return db_farm
 
@@ -85,8 +64,8 @@ def read_farm(farm_id: int, db: Session = Depends(get_db), current_user: User =
 
 
 @router.patch("/{farm_id}", response_model=FarmRead)
-async def update_farm(farm_id: int, farm_update: FarmCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_farm = db.get(Farm, farm_id)
+async def update_farm(farm_id: int, farm_update: FarmCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    db_farm = await db.get(Farm, farm_id)
     if not db_farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     if db_farm.owner_id != current_user.id:
@@ -95,7 +74,7 @@ async def update_farm(farm_id: int, farm_update: FarmCreate, db: Session = Depen
     farm_data = farm_update.model_dump(exclude_unset=True)
 
     if 'location_text' in farm_data and farm_data['location_text'] != db_farm.location_text:
-        coords = await get_coords_from_location(farm_data['location_text'])
+        coords = await get_coords_from_location(farm_data['location_text'], db)
         if not coords:
             raise HTTPException(
                 status_code=4.04, detail=f"Could not find new coordinates")
@@ -105,8 +84,8 @@ async def update_farm(farm_id: int, farm_update: FarmCreate, db: Session = Depen
         setattr(db_farm, key, value)
 
     db.add(db_farm)
-    db.commit()
-    db.refresh(db_farm)
+    await db.commit()
+    await db.refresh(db_farm)
     return db_farm
 
 
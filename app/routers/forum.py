@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlmodel import Session, select, desc, func 
-from typing import List
+from sqlalchemy.orm import aliased, joinedload
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 # 1. Import Notification model
-from app.models import ForumThread, ForumPost, User, Badge, UserBadge, Notification 
+from app.models import ForumThread, ForumPost, User, Notification 
 from app.schemas import ( 
     ForumThreadCreate, ForumThreadReadBasic, ForumThreadReadWithPosts,
-    ForumPostCreate, ForumPostRead
+    ForumThreadListItem, ForumPostCreate, ForumPostRead, ForumUserBase, CursorPage,
+    ForumSearchHit, NotificationRead
 )
 from app.security import get_current_user
+from app.pagination import keyset_page, build_page, page_size, MAX_PAGE_SIZE
+from app.search import index_thread, index_post, search_forum
+from app.notification_broker import publish_notification
+from app.badge_service import emit_badge_event, BadgeEvent
+from app.notification_counter import increment_unread, get_unread_count
 
 router = APIRouter(prefix="/forum", tags=["Forum"])
 
@@ -17,6 +24,7 @@ router = APIRouter(prefix="/forum", tags=["Forum"])
 @router.post("/threads", response_model=ForumThreadReadBasic, status_code=status.HTTP_201_CREATED)
 def create_thread(
     thread_data: ForumThreadCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -24,60 +32,99 @@ def create_thread(
         db_thread = ForumThread(**thread_data.model_dump(),
                                 owner_id=current_user.id)
         db.add(db_thread)
+        db.flush()
+        index_thread(db, db_thread)
         db.commit()
         db.refresh(db_thread)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating thread: {e}")
 
-    # --- Badge Logic (Community Member) ---
-    try:
-        thread_count = db.exec(
-            select(func.count(ForumThread.id))
-            .where(ForumThread.owner_id == current_user.id)
-        ).one()
-
-        if thread_count == 1:
-            badge_name = "Community Member"
-            badge = db.exec(select(Badge).where(Badge.name == badge_name)).first()
-            if badge:
-                existing_link = db.get(UserBadge, (current_user.id, badge.id))
-                if not existing_link:
-                    new_badge_link = UserBadge(user_id=current_user.id, badge_id=badge.id)
-                    db.add(new_badge_link)
-                    db.commit()
-    except Exception as e:
-        print(f"Error awarding 'Community Member' badge: {e}")
-    # --- End Badge Logic ---
+    emit_badge_event(background_tasks, db, current_user.id, BadgeEvent.THREAD_CREATED)
 
     # Eagerly load owner if necessary before returning
     _ = db_thread.owner 
     return db_thread
 
 
-@router.get("/threads", response_model=List[ForumThreadReadBasic])
+@router.get("/threads", response_model=CursorPage[ForumThreadListItem])
 def get_all_threads(
-    skip: int = 0,
-    limit: int = 20, 
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Depends(page_size),
+    db: Session = Depends(get_read_db),
 ):
+    """
+    List threads newest first with their reply count, last reply time and
+    last replier, computed in a single query (no per-thread post loading).
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    """
+    page_ids = keyset_page(select(ForumThread.id), ForumThread.created_at, ForumThread.id, cursor, limit)
+
+    # Aggregate replies for the threads on this page only
+    post_stats = (
+        select(
+            ForumPost.thread_id,
+            func.count(ForumPost.id).label("post_count"),
+            func.max(ForumPost.created_at).label("last_reply_at"),
+        )
+        .where(ForumPost.thread_id.in_(page_ids))
+        .group_by(ForumPost.thread_id)
+        .subquery()
+    )
+    last_replier_id = (
+        select(ForumPost.owner_id)
+        .where(ForumPost.thread_id == ForumThread.id)
+        .order_by(desc(ForumPost.created_at), desc(ForumPost.id))
+        .limit(1)
+        .correlate(ForumThread)
+        .scalar_subquery()
+    )
+    LastReplier = aliased(User)
+
     statement = (
-        select(ForumThread)
-        .order_by(desc(ForumThread.created_at))
-        .offset(skip)
-        .limit(limit)
+        select(ForumThread, post_stats.c.post_count, post_stats.c.last_reply_at, LastReplier)
+        .options(joinedload(ForumThread.owner))
+        .outerjoin(post_stats, post_stats.c.thread_id == ForumThread.id)
+        .outerjoin(LastReplier, LastReplier.id == last_replier_id)
+        .where(ForumThread.id.in_(page_ids))
+        .order_by(desc(ForumThread.created_at), desc(ForumThread.id))
     )
-    threads = db.exec(statement).all()
-    # Ensure owner data is loaded if relationships are lazy
-    # for thread in threads:
-    #     _ = thread.owner 
-    return threads
+    rows = db.exec(statement).all()
+    threads, next_cursor = build_page([row[0] for row in rows], limit, "created_at")
+
+    items = [
+        ForumThreadListItem(
+            id=thread.id,
+            title=thread.title,
+            content=thread.content,
+            created_at=thread.created_at,
+            owner=ForumUserBase.model_validate(thread.owner),
+            post_count=post_count or 0,
+            last_reply_at=last_reply_at,
+            last_replier=ForumUserBase.model_validate(last_replier) if last_replier else None,
+        )
+        for thread, post_count, last_reply_at, last_replier in rows[:len(threads)]
+    ]
+    return CursorPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=List[ForumSearchHit])
+def search_threads_and_posts(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Full-text search over thread titles, thread content and replies, best
+    match first, with the matching terms highlighted.
+    """
+    return [ForumSearchHit(**hit) for hit in search_forum(db, q, limit)]
 
 
 @router.get("/threads/{thread_id}", response_model=ForumThreadReadWithPosts)
 def get_thread_by_id(
     thread_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     db_thread = db.get(ForumThread, thread_id)
 
@@ -98,6 +145,7 @@ def get_thread_by_id(
 @router.post("/posts", response_model=ForumPostRead, status_code=status.HTTP_201_CREATED)
 def create_post(
     post_data: ForumPostCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -109,6 +157,8 @@ def create_post(
     try:
         db_post = ForumPost(**post_data.model_dump(), owner_id=current_user.id)
         db.add(db_post)
+        db.flush()
+        index_post(db, db_post)
         db.commit()
         db.refresh(db_post)
     except Exception as e:
@@ -130,7 +180,16 @@ def create_post(
                 post_id=db_post.id # Link notification to the new post
             )
             db.add(new_notification)
+            increment_unread(db, db_thread.owner_id)
             db.commit() # Commit the notification separately
+
+            # Push to the owner's open WebSocket/SSE connections after the response
+            background_tasks.add_task(
+                publish_notification,
+                new_notification.user_id,
+                NotificationRead.model_validate(new_notification).model_dump(mode="json"),
+                get_unread_count(db, db_thread.owner_id),
+            )
             
     except Exception as e:
         # Log error but don't fail the post creation
@@ -0,0 +1,75 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.chat_cache import chat_answer_cache
+from app.database import read_router
+from app.db_pool import pool_stats
+from app.notification_broker import get_notification_broker
+from app.principal_cache import principal_cache
+from app.startup_timing import startup_timer
+from app.password_hashing import password_hasher
+from app.weather import forecast_cache
+
+# Shared secret for the X-Metrics-Token header; the endpoints are disabled while unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """Metrics describe internal state, so only callers holding METRICS_TOKEN may read them."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_metrics_token is None or not secrets.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token")
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/caches")
+def get_cache_metrics():
+    """
+    Per-worker hit/miss counters for the in-process caches.
+    Each worker process keeps its own caches, so aggregate across workers.
+    """
+    return {
+        "forecast": forecast_cache.stats(),
+        "chatbot_answers": chat_answer_cache.stats(),
+        "principals": principal_cache.stats(),
+    }
+
+
+@router.get("/notifications")
+def get_notification_push_metrics():
+    """Open push connections and delivery counters for this worker."""
+    return get_notification_broker().stats()
+
+
+@router.get("/password-hashing")
+def get_password_hashing_metrics():
+    """Load on the bounded bcrypt pool for this worker (rejected = shed with 503)."""
+    return password_hasher.stats()
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """
+    Connection pool occupancy and checkout wait times for this worker.
+    Sustained waits or timeouts mean DB_POOL_SIZE / DB_MAX_OVERFLOW are too small
+    for the worker's concurrency; an idle pool means they can come down.
+    """
+    return pool_stats()
+
+
+@router.get("/replicas")
+def get_read_replica_metrics():
+    """How read-only endpoints were routed on this worker (pinned = read-your-writes)."""
+    return read_router.stats()
+
+
+@router.get("/startup")
+def get_startup_metrics():
+    """Seconds from the start of app imports to end of imports, to ready, and to the first request."""
+    return startup_timer.stats()
@@ -1,27 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, desc
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, tuple_, update
+from typing import List, Optional
 
 from app.database import get_db
 from app.models import Notification, User
-from app.security import get_current_user
-from app.schemas import NotificationRead  # Assuming you'll create this schema
+from app.security import get_current_user, get_user_from_token, oauth2_scheme_optional
+from app.notification_broker import get_notification_broker, NOTIFICATION_KEEPALIVE_SECONDS
+from app.notification_counter import decrement_unread, get_unread_count
+from app.schemas import (
+    NotificationPage, NotificationBulkMarkRead, NotificationBulkMarkReadResult
+)
+from app.pagination import keyset_page, build_page, page_size, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
-@router.get("/", response_model=List[NotificationRead])
+@router.get("/", response_model=NotificationPage)
 def get_my_notifications(
-    skip: int = 0,
-    limit: int = 20,  # Paginate notifications
+    cursor: Optional[str] = None,
+    limit: int = Depends(page_size),
     include_read: bool = False,  # Option to include read ones
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get notifications for the current user, newest first.
-    By default, only fetches unread notifications.
+    By default, only fetches unread notifications. Pass the returned
+    `next_cursor` back as `cursor` for the next page; keep the first page's
+    `head_cursor` and the last page's `tail_cursor` for marking what was
+    seen as read.
     """
     statement = select(Notification).where(
         Notification.user_id == current_user.id)
@@ -29,11 +40,15 @@ def get_my_notifications(
     if not include_read:
         statement = statement.where(Notification.is_read == False)
 
-    statement = statement.order_by(
-        desc(Notification.created_at)).offset(skip).limit(limit)
+    statement = keyset_page(statement, Notification.created_at, Notification.id, cursor, limit)
 
-    notifications = db.exec(statement).all()
-    return notifications
+    notifications, next_cursor = build_page(db.exec(statement).all(), limit, "created_at")
+    head_cursor = tail_cursor = None
+    if notifications:
+        head_cursor = encode_cursor(notifications[0].created_at, notifications[0].id)
+        tail_cursor = encode_cursor(notifications[-1].created_at, notifications[-1].id)
+    return NotificationPage(items=notifications, next_cursor=next_cursor,
+                            head_cursor=head_cursor, tail_cursor=tail_cursor)
 
 
 @router.get("/unread-count", response_model=dict)
@@ -43,17 +58,9 @@ def get_unread_notification_count(
 ):
     """
     Get the count of unread notifications for the current user.
+    Served from the maintained counter (a primary-key lookup), not COUNT(*).
     """
-    # Use scalar_one() to get the integer result rather than a Row/tuple
-    # SQLModel's Session.exec may return a ScalarResult depending on SQLAlchemy
-    # version; call .one() to retrieve the scalar count value when appropriate.
-    count = db.exec(
-        select(func.count(Notification.id))
-        .where(Notification.user_id == current_user.id)
-        .where(Notification.is_read == False)
-    ).one()
-
-    return {"unread_count": int(count)}
+    return {"unread_count": get_unread_count(db, current_user.id)}
 
 
 @router.post("/{notification_id}/mark-read", status_code=status.HTTP_204_NO_CONTENT)
@@ -78,6 +85,7 @@ def mark_notification_as_read(
     if not notification.is_read:
         notification.is_read = True
         db.add(notification)
+        decrement_unread(db, current_user.id)
         db.commit()
 
     return  # Return 204 No Content
@@ -91,31 +99,160 @@ def mark_all_notifications_as_read(
     """
     Mark all unread notifications for the current user as read.
     """
-    # Fetch all unread notifications for the user
-    unread_notifications = db.exec(
-        select(Notification)
-        .where(Notification.user_id == current_user.id)
-        .where(Notification.is_read == False)
-    ).all()
+    _mark_read(db, current_user, [])
+    return  # Return 204 No Content
 
-    if not unread_notifications:
-        return  # Nothing to mark
 
-    updated_count = 0
-    try:
-        for notification in unread_notifications:
-            notification.is_read = True
-            db.add(notification)
-            updated_count += 1
+@router.post("/mark-read", response_model=NotificationBulkMarkReadResult)
+def mark_notifications_as_read(
+    payload: NotificationBulkMarkRead,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Mark a list of notifications read, or every notification the listing has
+    returned so far: from the first page's `head_cursor` down to the
+    `tail_cursor` of the last page loaded (its `next_cursor` works too while
+    more pages remain). Notifications that arrived after the first page was
+    fetched stay unread.
+    """
+    if (payload.ids is None) == (payload.up_to_cursor is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Provide exactly one of 'ids' or 'up_to_cursor'.")
+    if payload.up_to_cursor is not None and payload.head_cursor is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="'up_to_cursor' needs the 'head_cursor' of the first page loaded.")
 
+    if payload.ids is not None:
+        if not payload.ids:
+            return NotificationBulkMarkReadResult(updated=0)
+        conditions = [Notification.id.in_(payload.ids)]
+    else:
+        key = tuple_(Notification.created_at, Notification.id)
+        conditions = [
+            key >= tuple_(*decode_cursor(payload.up_to_cursor)),
+            key <= tuple_(*decode_cursor(payload.head_cursor)),
+        ]
+
+    return NotificationBulkMarkReadResult(updated=_mark_read(db, current_user, conditions))
+
+
+def _mark_read(db: Session, user: User, conditions) -> int:
+    """One UPDATE for all matching unread rows; nothing is loaded into Python."""
+    statement = (
+        update(Notification)
+        .where(Notification.user_id == user.id)
+        .where(Notification.is_read == False)
+        .where(*conditions)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated_count = db.execute(statement).rowcount
+        decrement_unread(db, user.id, updated_count)
         db.commit()
-        print(
-            f"Marked {updated_count} notifications as read for user {current_user.id}")
     except Exception as e:
         db.rollback()
-        print(
-            f"Error marking all notifications read for user {current_user.id}: {e}")
+        print(f"Error marking notifications read for user {user.id}: {e}")
         raise HTTPException(
-            status_code=500, detail="Could not mark all notifications as read")
+            status_code=500, detail="Could not mark notifications as read")
 
-    return  # Return 204 No Content
+    print(f"Marked {updated_count} notifications as read for user {user.id}")
+    return updated_count
+
+
+# --- Push channel ---
+def _sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.get("/stream")
+async def stream_notifications(
+    token: Optional[str] = Query(None, description="JWT, for EventSource clients that can't send headers"),
+    bearer: Optional[str] = Depends(oauth2_scheme_optional),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-Sent Events stream of new notifications for the current user.
+    Sends a `ready` event once subscribed and a comment line as keepalive.
+    """
+    try:
+        user_id = get_user_from_token(bearer or token, db).id
+    finally:
+        # End the read transaction so the stream doesn't hold a pooled connection
+        db.rollback()
+    broker = get_notification_broker()
+
+    async def event_stream():
+        async with broker.subscribe(user_id) as queue:
+            yield _sse_event({}, event="ready")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse_event(event, event=event["type"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients don't send anything we act on; just notice when they leave
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws")
+async def notifications_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    WebSocket push of new notifications, as JSON messages. Authenticate with
+    `?token=<JWT>` (browsers can't set headers on WebSockets) or a Bearer header.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    bearer = authorization[7:] if authorization.lower().startswith("bearer ") else None
+    try:
+        user_id = get_user_from_token(bearer or token, db).id
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        db.rollback()
+
+    broker = get_notification_broker()
+    async with broker.subscribe(user_id) as queue:
+        # Subscribed before accepting, so nothing published after the handshake is missed
+        await websocket.accept()
+        receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+        getter = None
+        try:
+            while True:
+                getter = getter or asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, receiver}, timeout=NOTIFICATION_KEEPALIVE_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if receiver in done:
+                    break
+                if getter in done:
+                    await websocket.send_json(getter.result())
+                    getter = None
+                else:
+                    await websocket.send_json({"type": "ping"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in (receiver, getter):
+                if task is not None:
+                    task.cancel()
@@ -1,48 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from sqlmodel import Session, select, desc, func
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 
-from app.database import get_db
-from app.models import Farm, SoilReport, User, Badge, UserBadge
+from app.database import get_db, get_async_db, get_read_db
+from app.models import Farm, SoilReport, User
 # <-- Import the new schema
-from app.schemas import SoilReportCreate, SoilReportRead, CropSuggestionSummaryResponse
+from app.schemas import SoilReportCreate, SoilReportRead, CropSuggestionSummaryResponse, CursorPage
 from app.security import get_current_user
+from app.pagination import keyset_page, build_page, page_size
 from app.soil_model import analyze_soil_with_ai, analyze_soil_image_with_ai
+from app.badge_service import emit_badge_event, BadgeEvent
 
 router = APIRouter(prefix="/soil", tags=["Soil"])
 
-# --- Badge Logic ---
-def _award_soil_badge(db: Session, current_user: User):
-    try:
-        user_farm_ids_query = select(Farm.id).where(Farm.owner_id == current_user.id)
-        report_count = db.exec(
-            select(func.count(SoilReport.id))
-            .where(SoilReport.farm_id.in_(user_farm_ids_query))
-        ).one()
-
-        if report_count == 1:
-            badge_name = "Soil Analyst"
-            badge = db.exec(select(Badge).where(Badge.name == badge_name)).first()
-            if badge:
-                existing_link = db.get(UserBadge, (current_user.id, badge.id))
-                if not existing_link:
-                    new_badge_link = UserBadge(user_id=current_user.id, badge_id=badge.id)
-                    db.add(new_badge_link)
-                    db.commit()
-    except Exception as e:
-        print(f"Error awarding 'Soil Analyst' badge: {e}")
-# --- End Badge Logic ---
-
 
 @router.post("/manual", response_model=SoilReportRead, status_code=status.HTTP_201_CREATED)
 async def create_soil_report_manual(
     report_data: SoilReportCreate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    farm = db.get(Farm, report_data.farm_id)
+    farm = await db.get(Farm, report_data.farm_id)
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Farm not found or not owned by user")
+    # Give the connection back to the pool while the AI analysis runs
+    await db.close()
 
     try:
         ai_analysis_data = await analyze_soil_with_ai(report_data.model_dump())
@@ -50,31 +34,33 @@ async def create_soil_report_manual(
         full_report_data.update(ai_analysis_data)
         db_report = SoilReport.model_validate(full_report_data)
         db.add(db_report)
-        db.commit()
-        db.refresh(db_report)
+        await db.commit()
+        await db.refresh(db_report)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"AI analysis failed: {e}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not save soil report: {e}")
 
-    _award_soil_badge(db, current_user)
+    emit_badge_event(background_tasks, db, current_user.id, BadgeEvent.SOIL_REPORT_CREATED)
     return db_report
 
 
 @router.post("/upload_soil_image/{farm_id}", response_model=SoilReportRead, status_code=status.HTTP_201_CREATED)
 async def upload_soil_image_analysis(
     farm_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    farm = db.get(Farm, farm_id)
+    farm = await db.get(Farm, farm_id)
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Farm not found or not owned by user")
 
     if not file.content_type.startswith("image/"):
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file type. Please upload an image.")
+    await db.close()
 
     try:
         image_data = await file.read()
@@ -91,21 +77,23 @@ async def upload_soil_image_analysis(
         }
         db_report = SoilReport.model_validate(full_report_data)
         db.add(db_report)
-        db.commit()
-        db.refresh(db_report)
+        await db.commit()
+        await db.refresh(db_report)
     except ValueError as e:
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"AI image analysis failed: {e}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not process image or save report: {e}")
 
-    _award_soil_badge(db, current_user)
+    emit_badge_event(background_tasks, db, current_user.id, BadgeEvent.SOIL_REPORT_CREATED)
     return db_report
 
 
-@router.get("/farm/{farm_id}", response_model=List[SoilReportRead])
+@router.get("/farm/{farm_id}", response_model=CursorPage[SoilReportRead])
 def get_soil_reports_for_farm(
     farm_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Depends(page_size),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -113,17 +101,17 @@ def get_soil_reports_for_farm(
     if not farm or farm.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Farm not found or not owned by user")
 
-    reports = db.exec(
-        select(SoilReport)
-        .where(SoilReport.farm_id == farm_id)
-        .order_by(desc(SoilReport.date))
-    ).all()
-    return reports
+    statement = keyset_page(
+        select(SoilReport).where(SoilReport.farm_id == farm_id),
+        SoilReport.date, SoilReport.id, cursor, limit,
+    )
+    reports, next_cursor = build_page(db.exec(statement).all(), limit, "date")
+    return CursorPage(items=reports, next_cursor=next_cursor)
 
 # --- vvvv ADD THIS NEW ENDPOINT vvvv ---
 @router.get("/suggestions/summary", response_model=CropSuggestionSummaryResponse)
 def get_crop_suggestion_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -133,7 +121,11 @@ def get_crop_suggestion_summary(
     user_farm_ids = db.exec(
         select(Farm.id).where(Farm.owner_id == current_user.id)
     ).all()
+    return crop_suggestion_summary(db, user_farm_ids)
+
 
+def crop_suggestion_summary(db: Session, user_farm_ids: List[int]) -> CropSuggestionSummaryResponse:
+    """The suggestion summary for a known set of farms; shared with the dashboard."""
     if not user_farm_ids:
         return CropSuggestionSummaryResponse(unique_suggestion_count=0, recent_suggestions=[])
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select
 from typing import List
 
@@ -6,7 +6,10 @@ from app.database import get_db
 from app.models import User
 # --- vvvv ADD/UPDATE IMPORTS vvvv ---
 from app.schemas import UserRead, UserUpdate, UserPasswordChange
-from app.security import get_current_user, get_password_hash, verify_password
+from app.security import (
+    get_current_user, get_password_hash_bounded, verify_password_bounded, create_access_token, token_claims_for
+)
+from app.principal_cache import principal_cache
 # --- ^^^^ END IMPORTS ^^^^ ---
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -45,6 +48,7 @@ def update_users_me(
     try:
         db.add(current_user)
         db.commit()
+        principal_cache.invalidate(current_user.id)
         db.refresh(current_user)
         return current_user
     except Exception as e:
@@ -56,14 +60,17 @@ def update_users_me(
 @router.post("/me/change-password", status_code=status.HTTP_204_NO_CONTENT)
 def change_user_password(
     password_data: UserPasswordChange,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Allows a logged-in user to change their own password.
+    All previously issued tokens are revoked; a fresh token for this
+    session is returned in the `X-Access-Token` header.
     """
     # 1. Verify the user's old password
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    if not verify_password_bounded(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect old password."
@@ -78,15 +85,18 @@ def change_user_password(
 
     # 3. Hash the new password and save it
     try:
-        current_user.hashed_password = get_password_hash(password_data.new_password)
+        current_user.hashed_password = get_password_hash_bounded(password_data.new_password)
+        current_user.token_version = (current_user.token_version or 0) + 1
         db.add(current_user)
         db.commit()
+        principal_cache.invalidate(current_user.id)
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating password: {e}"
         )
-    
+
+    response.headers["X-Access-Token"] = create_access_token(token_claims_for(current_user))
     return # Return 204 No Content
 # --- ^^^^ END NEW ENDPOINT ^^^^ ---
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Startup schema check.
+
+Migrations are applied by `alembic upgrade head` before the server starts
+(see the Dockerfile), so startup only compares the database's
+`alembic_version` with the head revision of alembic/versions: one small
+query instead of `create_all()` reflecting every table on every boot.
+
+The oldest migrations assume tables that create_all used to make, so
+`python -m app.schema_version` runs first and gets an unversioned database
+onto the migration history: an empty one is created, seeded and stamped
+head; one built by the old create_all() is stamped LEGACY_REVISION and
+upgraded from there.
+
+The head is read straight from the revision files rather than through
+Alembic's ScriptDirectory, which costs about half a second of imports.
+Alembic is only imported to stamp a database.
+"""
+import os
+import re
+from typing import Optional, Set
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, SQLModel
+
+# warn: log a mismatch and keep serving; strict: refuse to start; off: skip the check
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "warn").lower()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_DIR = os.path.join(PROJECT_ROOT, "alembic")
+VERSIONS_DIR = os.path.join(ALEMBIC_DIR, "versions")
+
+_REVISION = re.compile(r"^revision(?::[^=]+)?=\s*['\"](\w+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision(?::[^=]+)?=\s*(.+)$", re.MULTILINE)
+
+# Last revision from before migrations ran on deploy; every table it expects
+# came from create_all(), and the later migrations tolerate what's already there
+LEGACY_REVISION = "f078b8a06b59"
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the migration head and SCHEMA_CHECK=strict."""
+
+
+def alembic_heads(versions_dir: str = VERSIONS_DIR) -> Set[str]:
+    """Revisions that no other revision builds on."""
+    revisions, parents = set(), set()
+    for filename in os.listdir(versions_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, filename), encoding="utf-8") as f:
+            source = f.read()
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(source)
+        if down_revision is not None:
+            parents.update(re.findall(r"['\"](\w+)['\"]", down_revision.group(1)))
+    return revisions - parents
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """The stamped revision, or None when the database has never been stamped."""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+def stamp(engine: Engine, revision: str):
+    # Stamps through a MigrationContext rather than alembic/env.py, which would reconfigure logging
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(ScriptDirectory(ALEMBIC_DIR), revision)
+
+
+def bootstrap_empty_database(engine: Engine):
+    from app.badge_service import seed_default_badges
+
+    print("Empty database: creating tables and stamping the migration head...")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_default_badges(session)
+    stamp(engine, "head")
+
+
+def prepare_for_upgrade(engine: Engine):
+    """Puts an unversioned database on the migration history; run before `alembic upgrade head`."""
+    if current_revision(engine) is not None:
+        return
+    if not inspect(engine).get_table_names():
+        bootstrap_empty_database(engine)
+        return
+    print(f"Unversioned database from create_all(): stamping {LEGACY_REVISION} before upgrading...")
+    stamp(engine, LEGACY_REVISION)
+
+
+def check_schema_version(engine: Engine):
+    """Called once from the lifespan hook."""
+    if SCHEMA_CHECK == "off":
+        return
+
+    heads = alembic_heads()
+    revision = current_revision(engine)
+    if revision is not None and heads == {revision}:
+        print(f"Database schema is at migration head {revision}.")
+        return
+
+    if revision is None and not inspect(engine).get_table_names():
+        bootstrap_empty_database(engine)
+        return
+
+    message = (
+        f"Database schema is at {revision or 'an unversioned state'}, but the code expects "
+        f"{', '.join(sorted(heads))}. Run `alembic upgrade head`."
+    )
+    if SCHEMA_CHECK == "strict":
+        raise SchemaOutOfDate(message)
+    print(f"WARNING: {message}")
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    prepare_for_upgrade(engine)
@@ -1,9 +1,18 @@
 # GreenFund-test-Backend/app/schemas.py
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Generic, Optional, List, TypeVar
+from datetime import date, datetime
 from sqlmodel import SQLModel
 
+T = TypeVar("T")
+
+
+# --- Pagination ---
+class CursorPage(BaseModel, Generic[T]):
+    """One page of a keyset-paginated list; pass `next_cursor` back as `cursor`."""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 # --- User Schemas ---
 
 
@@ -84,6 +93,18 @@ class FarmActivityRead(FarmActivityBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BulkActivityRowError(BaseModel):
+    row: int  # 1-based position in the submitted array / CSV data rows
+    error: str
+
+
+class BulkActivityResponse(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[BulkActivityRowError] = []
+
+
 # --- SoilReport Schemas ---
 # ... (SoilReport Schemas) ...
 class SoilReportBase(SQLModel):
@@ -147,11 +168,33 @@ class ForumThreadReadBasic(ForumThreadBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ForumThreadListItem(ForumThreadBase):
+    """Thread listing row: reply stats instead of the full post list."""
+    id: int
+    created_at: datetime
+    owner: ForumUserBase
+    post_count: int = 0
+    last_reply_at: Optional[datetime] = None
+    last_replier: Optional[ForumUserBase] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
 class ForumThreadReadWithPosts(ForumThreadReadBasic):
     posts: List[ForumPostRead] = []
     model_config = ConfigDict(from_attributes=True)
 
 
+class ForumSearchHit(BaseModel):
+    """A matching thread or post; highlighted terms are wrapped in <mark>."""
+    kind: str  # "thread" or "post"
+    id: int
+    thread_id: int
+    thread_title: str
+    title_highlight: Optional[str] = None
+    snippet: str
+    rank: float
+
+
 # --- Climate Action Schemas ---
 # ... (Climate Action Schemas) ...
 class Alert(BaseModel):
@@ -211,12 +254,43 @@ class WeeklyEmissionsResponse(BaseModel):
     trend_percent: Optional[float] = None
 
 
+class EmissionBucket(BaseModel):
+    period_start: date
+    total_kg: float
+    activity_count: int
+    # Set when the series is broken down by farm / activity type
+    farm_id: Optional[int] = None
+    activity_type: Optional[str] = None
+
+
+class EmissionsTimeseriesResponse(BaseModel):
+    start: date
+    end: date
+    granularity: str
+    timezone: str
+    total_emissions_kg: float
+    # Non-empty buckets only, oldest first
+    buckets: List[EmissionBucket]
+
+
 class CropSuggestionSummaryResponse(BaseModel):
     unique_suggestion_count: int
     # List of the 3 most recent unique suggestions
     recent_suggestions: List[str]
 
 
+class DashboardResponse(BaseModel):
+    # Each section is null when it could not be loaded; see `errors`
+    farms: Optional[List[FarmRead]] = None
+    recent_activities: Optional[List[FarmActivityRead]] = None
+    weekly_emissions: Optional[WeeklyEmissionsResponse] = None
+    badge_count: Optional[int] = None
+    unread_notifications: Optional[int] = None
+    crop_suggestions: Optional[CropSuggestionSummaryResponse] = None
+    # Section name -> why it is missing
+    errors: Dict[str, str] = {}
+
+
 class NotificationRead(BaseModel):
     id: int
     message: str
@@ -224,3 +298,23 @@ class NotificationRead(BaseModel):
     created_at: datetime
     post_id: Optional[int] = None  # Include post_id if available
     model_config = ConfigDict(from_attributes=True)
+
+
+class NotificationPage(CursorPage[NotificationRead]):
+    """`head_cursor` / `tail_cursor` point at the newest / oldest notification on this page."""
+    head_cursor: Optional[str] = None
+    tail_cursor: Optional[str] = None
+
+
+class NotificationBulkMarkRead(BaseModel):
+    """
+    Either explicit ids, or the range the client has seen in the listing:
+    `head_cursor` of the first page loaded and `tail_cursor` of the last.
+    """
+    ids: Optional[List[int]] = Field(default=None, max_length=1000)
+    up_to_cursor: Optional[str] = None
+    head_cursor: Optional[str] = None
+
+
+class NotificationBulkMarkReadResult(BaseModel):
+    updated: int
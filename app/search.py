@@ -0,0 +1,215 @@
+"""
+Full-text search over forum threads and posts.
+
+Every thread (title + content) and every post (content) has one row in the
+`forum_search` index:
+
+* PostgreSQL: a regular table with a generated, weighted `tsvector` column
+  and a GIN index; queries use `websearch_to_tsquery`, `ts_rank_cd` and
+  `ts_headline`.
+* SQLite: an FTS5 virtual table with the porter tokenizer; queries use
+  `bm25`, `highlight` and `snippet`.
+
+The index is created alongside the other tables (`metadata.create_all`) and
+kept up to date by `index_thread` / `index_post`, which run in the same
+transaction as the write they mirror.
+
+Highlights are returned as HTML: the database marks matches with private-use
+sentinel characters, the text is HTML-escaped, and only then are the
+sentinels swapped for <mark> tags, so user content never reaches the client
+as markup.
+"""
+import html
+import re
+from typing import List, Optional
+
+from sqlalchemy import DDL, event, text
+from sqlmodel import Session, SQLModel
+
+SEARCH_TABLE = "forum_search"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# Match delimiters as they come back from the database, before escaping
+_SENTINEL_START = "\ue000"
+_SENTINEL_END = "\ue001"
+SNIPPET_WORDS = 16
+# Title matches count ten times as much as body matches
+TITLE_WEIGHT = 10.0
+
+_POSTGRES_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        kind VARCHAR(8) NOT NULL,
+        source_id INTEGER NOT NULL,
+        thread_id INTEGER NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        document TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', body), 'D')
+        ) STORED,
+        PRIMARY KEY (kind, source_id)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+]
+
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        kind UNINDEXED, source_id UNINDEXED, thread_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+
+def _create_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    statements = _POSTGRES_DDL if dialect == "postgresql" else _SQLITE_DDL if dialect == "sqlite" else []
+    for statement in statements:
+        connection.execute(DDL(statement))
+
+
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name in ("postgresql", "sqlite"):
+        connection.execute(DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+# The FTS5 table can't be declared as a model, so piggyback on create_all/drop_all
+event.listen(SQLModel.metadata, "after_create", _create_search_index)
+event.listen(SQLModel.metadata, "before_drop", _drop_search_index)
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _fts_rowid(kind: str, source_id: int) -> int:
+    # Threads and posts share one FTS5 table; interleave their ids so the
+    # rowid is a stable key we can REPLACE on
+    return source_id * 2 + (1 if kind == "post" else 0)
+
+
+def _upsert(db: Session, kind: str, source_id: int, thread_id: int, title: str, body: str):
+    params = {"kind": kind, "source_id": source_id, "thread_id": thread_id, "title": title or "", "body": body or ""}
+    if _is_postgres(db):
+        db.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (kind, source_id, thread_id, title, body)
+            VALUES (:kind, :source_id, :thread_id, :title, :body)
+            ON CONFLICT (kind, source_id) DO UPDATE
+            SET thread_id = EXCLUDED.thread_id, title = EXCLUDED.title, body = EXCLUDED.body
+        """), params)
+    else:
+        db.execute(text(f"""
+            INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, kind, source_id, thread_id, title, body)
+            VALUES (:rowid, :kind, :source_id, :thread_id, :title, :body)
+        """), {**params, "rowid": _fts_rowid(kind, source_id)})
+
+
+def index_thread(db: Session, thread) -> None:
+    """Adds or refreshes a thread in the search index (caller commits)."""
+    _upsert(db, "thread", thread.id, thread.id, thread.title, thread.content)
+
+
+def index_post(db: Session, post) -> None:
+    """Adds or refreshes a post in the search index (caller commits)."""
+    _upsert(db, "post", post.id, post.thread_id, "", post.content)
+
+
+def rebuild_search_index(db: Session) -> None:
+    """Re-indexes every thread and post, e.g. after restoring a backup."""
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    if _is_postgres(db):
+        db.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (kind, source_id, thread_id, title, body)
+            SELECT 'thread', id, id, title, content FROM forumthread
+            UNION ALL
+            SELECT 'post', id, thread_id, '', content FROM forumpost
+        """))
+    else:
+        db.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (rowid, kind, source_id, thread_id, title, body)
+            SELECT id * 2, 'thread', id, id, title, content FROM forumthread
+            UNION ALL
+            SELECT id * 2 + 1, 'post', id, thread_id, '', content FROM forumpost
+        """))
+    db.commit()
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _highlight_markup(fragment: Optional[str]) -> Optional[str]:
+    if fragment is None:
+        return None
+    escaped = html.escape(fragment)
+    return escaped.replace(_SENTINEL_START, HIGHLIGHT_START).replace(_SENTINEL_END, HIGHLIGHT_END)
+
+
+def search_forum(db: Session, query: str, limit: int = 20) -> List[dict]:
+    """
+    Returns the best matching threads and posts, best first. Each hit has
+    kind, id, thread_id, thread_title, title_highlight, snippet and rank.
+    """
+    if _is_postgres(db):
+        # Rank inside the CTE so ts_headline only runs on the returned rows
+        statement = text(f"""
+            WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+            hits AS (
+                SELECT s.kind, s.source_id, s.thread_id, s.title, s.body,
+                       ts_rank_cd(s.document, q.query) AS rank
+                FROM {SEARCH_TABLE} s, q
+                WHERE s.document @@ q.query
+                ORDER BY rank DESC
+                LIMIT :limit
+            )
+            SELECT hits.kind, hits.source_id, hits.thread_id, t.title AS thread_title,
+                   CASE WHEN hits.kind = 'thread' THEN ts_headline('english', hits.title, q.query,
+                        'StartSel={_SENTINEL_START}, StopSel={_SENTINEL_END}, HighlightAll=true') END AS title_highlight,
+                   ts_headline('english', hits.body, q.query,
+                        'StartSel={_SENTINEL_START}, StopSel={_SENTINEL_END}, MaxWords={SNIPPET_WORDS}, MinWords=5') AS snippet,
+                   hits.rank
+            FROM hits CROSS JOIN q
+            JOIN forumthread t ON t.id = hits.thread_id
+            ORDER BY hits.rank DESC
+        """)
+        params = {"query": query, "limit": limit}
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        # bm25 weights follow column order; lower scores are better
+        statement = text(f"""
+            SELECT {SEARCH_TABLE}.kind, {SEARCH_TABLE}.source_id, {SEARCH_TABLE}.thread_id,
+                   t.title AS thread_title,
+                   CASE WHEN {SEARCH_TABLE}.kind = 'thread'
+                        THEN highlight({SEARCH_TABLE}, 3, '{_SENTINEL_START}', '{_SENTINEL_END}') END AS title_highlight,
+                   snippet({SEARCH_TABLE}, 4, '{_SENTINEL_START}', '{_SENTINEL_END}', '…', {SNIPPET_WORDS}) AS snippet,
+                   -bm25({SEARCH_TABLE}, 0, 0, 0, {TITLE_WEIGHT}, 1.0) AS rank
+            FROM {SEARCH_TABLE}
+            JOIN forumthread t ON t.id = {SEARCH_TABLE}.thread_id
+            WHERE {SEARCH_TABLE} MATCH :query
+            ORDER BY bm25({SEARCH_TABLE}, 0, 0, 0, {TITLE_WEIGHT}, 1.0)
+            LIMIT :limit
+        """)
+        params = {"query": match, "limit": limit}
+
+    rows = db.execute(statement, params).mappings().all()
+    return [
+        {
+            "kind": row["kind"],
+            "id": row["source_id"],
+            "thread_id": row["thread_id"],
+            "thread_title": row["thread_title"],
+            "title_highlight": _highlight_markup(row["title_highlight"]),
+            "snippet": _highlight_markup(row["snippet"]),
+            "rank": float(row["rank"]),
+        }
+        for row in rows
+    ]
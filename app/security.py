@@ -9,12 +9,18 @@ from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from dotenv import load_dotenv
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.principal_cache import principal_cache
+from app.password_hashing import password_hasher, PasswordHashingBusy, PASSWORD_HASH_RETRY_AFTER_SECONDS
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+# bcrypt work factor for new hashes; existing hashes are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
 
 # --- Password Verification ---
 
@@ -32,11 +38,57 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     # Convert password to bytes and truncate to 72 bytes
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a stored hash ($2b$<cost>$...) uses a different work factor."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# --- Bounded offload (see app/password_hashing.py) ---
+def _hashing_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests right now, please try again shortly.",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.run(verify_password, plain_password, hashed_password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
+
+
+async def get_password_hash_async(password: str) -> str:
+    try:
+        return await password_hasher.run(get_password_hash, password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
+
+
+def verify_password_bounded(plain_password: str, hashed_password: str) -> bool:
+    """For sync routes: runs on the hashing pool, still shedding load when it is full."""
+    try:
+        return password_hasher.run_sync(verify_password, plain_password, hashed_password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
+
+
+def get_password_hash_bounded(password: str) -> str:
+    try:
+        return password_hasher.run_sync(get_password_hash, password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
+
+
 # --- JWT Token Creation ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -54,19 +106,30 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def decode_access_token(token: str) -> Optional[str]:
+    payload = decode_token_claims(token)
+    return payload.get("sub") if payload else None
+
+
+def decode_token_claims(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+
+def token_claims_for(user: "User") -> dict:
+    """Claims for a new access token: `uid` and `ver` let requests skip the user lookup."""
+    return {"sub": user.email, "uid": user.id, "ver": user.token_version}
 
 
 # --- vvvv THIS IS THE FIX vvvv ---
 # Tell Swagger and FastAPI that the login URL is /api/auth/token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+# Same scheme but returns None instead of 401, for endpoints with another token source
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
 # --- ^^^^ END OF FIX ^^^^ ---
 
 
@@ -75,7 +138,14 @@ def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> "User":  # Use string "User" to avoid import
+    return get_user_from_token(token, db)
 
+
+def get_user_from_token(token: Optional[str], db: Session) -> "User":
+    """
+    Resolves a bearer token to its user. Shared by `get_current_user` and the
+    push endpoints, which also accept the token as a query parameter.
+    """
     # Import here to prevent circular imports
     from app.models import User
 
@@ -84,11 +154,33 @@ def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    email = decode_access_token(token)
-    if email is None:
+    claims = decode_token_claims(token) if token else None
+    if claims is None:
         raise credentials_exception
 
-    user = db.exec(select(User).where(User.email == email)).first()
-    if user is None:
+    user_id, version = claims.get("uid"), claims.get("ver")
+    if user_id is None or version is None:
+        # Tokens issued before uid/ver claims existed: look up by email
+        user = db.exec(select(User).where(User.email == claims["sub"])).first()
+        if user is None:
+            raise credentials_exception
+        return user
+
+    values = principal_cache.get(user_id, version)
+    if values is not None:
+        return _attach_cached_user(db, User, values)
+
+    user = db.get(User, user_id)
+    if user is None or user.token_version != version:
+        # Unknown user, or a token revoked by a password change
         raise credentials_exception
+    principal_cache.set(user_id, version, {column.key: getattr(user, column.key) for column in User.__table__.columns})
     return user
+
+
+def _attach_cached_user(db: Session, user_model, values: dict) -> "User":
+    # A fresh instance per request, attached to this request's session without a
+    # SELECT, so handlers can lazy-load relationships and modify it as usual
+    user = user_model(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
@@ -1,37 +1,14 @@
 # GreenFund-test-Backend-backup/app/soil_model.py
-import os
 import json
 import base64
-from openai import OpenAI, APIError # Import OpenAI and potential error types
 from typing import Dict, Any
 from fastapi import HTTPException
-from dotenv import load_dotenv
 
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# --- Reusable OpenAI Client Function ---
-def get_openai_client():
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OpenAI API key is not configured.")
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        # Optional: Test the connection immediately (costs a tiny amount)
-        # client.models.list()
-        return client
-    except APIError as e:
-         # Handle potential authentication errors during client creation
-         print(f"OpenAI API Error during client creation: {e}")
-         raise HTTPException(status_code=500, detail=f"OpenAI client initialization failed: {e}")
-    except Exception as e:
-         print(f"Unexpected error during OpenAI client creation: {e}")
-         raise HTTPException(status_code=500, detail=f"Unexpected error initializing OpenAI client.")
+from app.ai_client import create_chat_completion, AIServiceError
 
 
 async def analyze_soil_with_ai(data: Dict[str, float]) -> Dict[str, Any]:
     """Analyzes soil data from manual text input using OpenAI."""
-    client = get_openai_client()
     prompt = f"""
     Analyze the following soil data for a farm in Kenya:
     - pH: {data['ph']}, Nitrogen (N): {data['nitrogen']} ppm, Phosphorus (P): {data['phosphorus']} ppm, Potassium (K): {data['potassium']} ppm, Moisture: {data['moisture']}%
@@ -39,7 +16,7 @@ async def analyze_soil_with_ai(data: Dict[str, float]) -> Dict[str, Any]:
     Return ONLY a valid JSON object (no extra text or markdown) with keys "ai_analysis_text" (string) and "suggested_crops" (list of strings).
     """
     try:
-        completion = client.chat.completions.create(
+        completion = await create_chat_completion(
             model="gpt-4o-mini", # Use a capable OpenAI model
             response_format={"type": "json_object"},
             messages=[
@@ -49,7 +26,7 @@ async def analyze_soil_with_ai(data: Dict[str, float]) -> Dict[str, Any]:
         )
         response_content = completion.choices[0].message.content
         return json.loads(response_content)
-    except APIError as e:
+    except AIServiceError as e:
         # Handle specific OpenAI errors during the call
         print(f"OpenAI API Error during soil analysis: {e}")
         raise HTTPException(status_code=e.status_code or 500, detail=f"AI analysis failed: {e.message}")
@@ -61,7 +38,6 @@ async def analyze_soil_with_ai(data: Dict[str, float]) -> Dict[str, Any]:
 
 async def analyze_soil_image_with_ai(image_data: bytes) -> Dict[str, Any]:
     """Analyzes a soil image using OpenAI's multi-modal capabilities."""
-    client = get_openai_client()
     base64_image = base64.b64encode(image_data).decode('utf-8')
 
     prompt_messages = [
@@ -96,7 +72,7 @@ async def analyze_soil_image_with_ai(image_data: bytes) -> Dict[str, Any]:
     ]
 
     try:
-        completion = client.chat.completions.create(
+        completion = await create_chat_completion(
             # Ensure you use a model that supports vision, like gpt-4o or gpt-4-turbo
             model="gpt-4o-mini",
             messages=prompt_messages,
@@ -108,7 +84,7 @@ async def analyze_soil_image_with_ai(image_data: bytes) -> Dict[str, Any]:
 
         ai_data.update({"ph": 0.0, "nitrogen": 0, "phosphorus": 0, "potassium": 0, "moisture": 0})
         return ai_data
-    except APIError as e:
+    except AIServiceError as e:
         print(f"OpenAI API Error during image analysis: {e}")
         raise HTTPException(status_code=e.status_code or 500, detail=f"AI image analysis failed: {e.message}")
     except Exception as e:
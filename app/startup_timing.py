@@ -0,0 +1,53 @@
+"""
+Startup timings for this worker, served by /metrics/startup.
+
+app.main imports this module before anything else, so the clock starts
+before FastAPI, SQLAlchemy and the routers are imported.
+"""
+import time
+from typing import Dict, Optional
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imported: Optional[float] = None
+        self.ready: Optional[float] = None
+        self.first_request: Optional[float] = None
+
+    def mark_imported(self):
+        self.imported = time.perf_counter()
+
+    def mark_ready(self):
+        self.ready = time.perf_counter()
+        print(f"Startup complete in {self.ready - self.started:.2f}s "
+              f"(imports {self.imported - self.started:.2f}s).")
+
+    def mark_first_request(self):
+        if self.first_request is None:
+            self.first_request = time.perf_counter()
+
+    def _since_start(self, mark: Optional[float]) -> Optional[float]:
+        return round(mark - self.started, 3) if mark is not None else None
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "import_seconds": self._since_start(self.imported),
+            "ready_seconds": self._since_start(self.ready),
+            "first_request_seconds": self._since_start(self.first_request),
+        }
+
+
+startup_timer = StartupTimer()
+
+
+class FirstRequestTimer:
+    """ASGI middleware that records when the first HTTP request arrives."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and startup_timer.first_request is None:
+            startup_timer.mark_first_request()
+        await self.app(scope, receive, send)
@@ -0,0 +1,71 @@
+"""
+Insert-or-update for maintained summary tables (the daily carbon rollup,
+the unread notification counters).
+
+PostgreSQL and SQLite get one `INSERT ... ON CONFLICT DO UPDATE` for the
+whole batch. Any other database falls back to an UPDATE per row, then an
+INSERT when no row matched.
+"""
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import and_, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+_DIALECT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def upsert(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    key_columns: Sequence[str],
+    accumulate: Sequence[str] = (),
+) -> None:
+    """
+    Inserts `rows`; where a row with the same key exists, columns named in
+    `accumulate` are added to the stored value and the others overwritten.
+    Values may be SQL expressions. The caller commits.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    value_columns = [name for name in rows[0] if name not in key_columns]
+
+    dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(model).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns],
+            set_={
+                name: table.c[name] + statement.excluded[name] if name in accumulate else statement.excluded[name]
+                for name in value_columns
+            },
+        ))
+        return
+
+    for row in rows:
+        _update_or_insert(db, model, row, key_columns, value_columns, accumulate)
+
+
+def _update_or_insert(db: Session, model, row, key_columns, value_columns, accumulate) -> None:
+    table = model.__table__
+    statement = (
+        update(model)
+        .where(and_(*(table.c[name] == row[name] for name in key_columns)))
+        .values({
+            name: table.c[name] + row[name] if name in accumulate else row[name]
+            for name in value_columns
+        })
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(statement).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(model).values(row))
+    except IntegrityError:
+        # A concurrent writer inserted the row first
+        db.execute(statement)
@@ -1,29 +1,216 @@
-import httpx
-from fastapi import HTTPException, status
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple, Union
 
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-async def get_coords_from_location(location_text: str):
-    """Calls the Nominatim API to get lat/lon for a location name, restricted to Kenya."""
-    NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+from app.http_clients import get_geocoding_client
+from app.models import GeocodeCache
+
+GEOCODE_MEMORY_CACHE_SIZE = int(os.getenv("GEOCODE_MEMORY_CACHE_SIZE", 1024))
+# How long "no match" answers are trusted before Nominatim is asked again
+GEOCODE_NEGATIVE_TTL_HOURS = float(os.getenv("GEOCODE_NEGATIVE_TTL_HOURS", 24))
+# In-memory hits are added to `hit_count` in batches of this many
+GEOCODE_HIT_FLUSH_EVERY = int(os.getenv("GEOCODE_HIT_FLUSH_EVERY", 50))
+
+Coords = Optional[Dict[str, float]]
+
+# normalized query -> (cached_at, coords or None)
+_memory_cache: "OrderedDict[str, Tuple[datetime, Coords]]" = OrderedDict()
+# normalized query -> in-memory hits not yet written to the table
+_pending_hits: Dict[str, int] = {}
+
+
+class GeocodingUnavailable(Exception):
+    """Nominatim could not be reached; the result must not be cached."""
+
+
+def normalize_location_text(location_text: str) -> str:
+    """
+    Normalizes user-typed location text so that "Nakuru", " nakuru, Kenya "
+    and "NAKURU." share one cache entry.
+    """
+    text = unicodedata.normalize("NFKC", location_text).lower()
+    text = re.sub(r"[^\w]+", " ", text).strip()
+    tokens = text.split()
+    # Every lookup is already restricted to Kenya
+    if len(tokens) > 1 and tokens[-1] == "kenya":
+        tokens = tokens[:-1]
+    return " ".join(tokens)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _negative_expired(cached_at: datetime) -> bool:
+    return datetime.now(timezone.utc) - _as_utc(cached_at) > timedelta(hours=GEOCODE_NEGATIVE_TTL_HOURS)
+
+
+def _remember(query: str, cached_at: datetime, coords: Coords):
+    _memory_cache[query] = (cached_at, coords)
+    _memory_cache.move_to_end(query)
+    while len(_memory_cache) > GEOCODE_MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def clear_geocode_memory_cache():
+    """Drops the in-memory LRU, along with hit counts not yet written."""
+    _memory_cache.clear()
+    _pending_hits.clear()
+
+
+async def _fetch_coords_from_nominatim(location_text: str) -> Coords:
+    """Returns coords, None for "no match", or raises GeocodingUnavailable."""
     params = {
         "q": location_text,
         "format": "json",
         "limit": 1,
         "countrycodes": "ke"
     }
-    headers = {"User-Agent": "GreenFundApp/1.0"}
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(NOMINATIM_URL, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            if not data:
-                return None
-            return {
-                "latitude": float(data[0]["lat"]),
-                "longitude": float(data[0]["lon"]),
-            }
-        except Exception as e:
-            print(f"Geocoding error: {e}")
-            return None
+
+    client = get_geocoding_client()
+    try:
+        response = await client.get("/search", params=params)
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        raise GeocodingUnavailable(str(e))
+
+    if not data:
+        return None
+    return {
+        "latitude": float(data[0]["lat"]),
+        "longitude": float(data[0]["lon"]),
+    }
+
+
+def _lookup_db(db: Session, query: str) -> Optional[Tuple[datetime, Coords]]:
+    entry = db.exec(select(GeocodeCache).where(GeocodeCache.query == query)).first()
+    if entry is None:
+        return None
+    if entry.latitude is None and _negative_expired(entry.created_at):
+        return None
+
+    # Read the values before the commit below expires the instance
+    cached_at = _as_utc(entry.created_at)
+    coords = None
+    if entry.latitude is not None:
+        coords = {"latitude": entry.latitude, "longitude": entry.longitude}
+
+    try:
+        db.execute(
+            update(GeocodeCache)
+            .where(GeocodeCache.id == entry.id)
+            .values(hit_count=GeocodeCache.hit_count + 1, last_hit_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Could not update geocode hit counter for '{query}': {e}")
+    return cached_at, coords
+
+
+def _flush_hits(db: Session, hits: Dict[str, int]):
+    now = datetime.now(timezone.utc)
+    try:
+        for query, count in hits.items():
+            db.execute(
+                update(GeocodeCache)
+                .where(GeocodeCache.query == query)
+                .values(hit_count=GeocodeCache.hit_count + count, last_hit_at=now)
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Could not update geocode hit counters: {e}")
+
+
+def _take_pending_hits() -> Dict[str, int]:
+    hits = dict(_pending_hits)
+    _pending_hits.clear()
+    return hits
+
+
+def _store_db(db: Session, query: str, coords: Coords):
+    now = datetime.now(timezone.utc)
+    values = {
+        "latitude": coords["latitude"] if coords else None,
+        "longitude": coords["longitude"] if coords else None,
+        "created_at": now,
+    }
+    try:
+        entry = db.exec(select(GeocodeCache).where(GeocodeCache.query == query)).first()
+        if entry is None:
+            db.add(GeocodeCache(query=query, **values))
+        else:
+            # Refreshing an expired negative entry
+            db.execute(update(GeocodeCache).where(GeocodeCache.id == entry.id).values(**values))
+        db.commit()
+    except IntegrityError:
+        # Another request cached the same location concurrently
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        print(f"Could not store geocode cache entry for '{query}': {e}")
+
+
+async def _run_db(db: Union[Session, AsyncSession], fn, *args):
+    # The cache commits on its own short-lived session over the caller's database,
+    # never on the caller's unit of work. The helpers are sync; an async session
+    # runs them without blocking the loop
+    if isinstance(db, AsyncSession):
+        async with AsyncSession(db.bind) as session:
+            return await session.run_sync(fn, *args)
+    with Session(db.get_bind()) as session:
+        return fn(session, *args)
+
+
+async def get_coords_from_location(location_text: str, db: Union[Session, AsyncSession, None] = None):
+    """
+    Resolves a location name (restricted to Kenya) to lat/lon.
+
+    Lookup order: in-memory LRU -> `geocodecache` table (when a session is
+    given) -> Nominatim. Both matches and "no match" answers are cached;
+    network failures are not. The table is read and written through a
+    separate session, so `db` is never committed or rolled back here.
+    """
+    query = normalize_location_text(location_text)
+    if not query:
+        return None
+
+    cached = _memory_cache.get(query)
+    if cached is not None:
+        cached_at, coords = cached
+        if coords is not None or not _negative_expired(cached_at):
+            _memory_cache.move_to_end(query)
+            _pending_hits[query] = _pending_hits.get(query, 0) + 1
+            if db is not None and sum(_pending_hits.values()) >= GEOCODE_HIT_FLUSH_EVERY:
+                await _run_db(db, _flush_hits, _take_pending_hits())
+            return coords
+        del _memory_cache[query]
+
+    if db is not None:
+        cached = await _run_db(db, _lookup_db, query)
+        if cached is not None:
+            cached_at, coords = cached
+            _remember(query, cached_at, coords)
+            return coords
+
+    try:
+        coords = await _fetch_coords_from_nominatim(location_text)
+    except GeocodingUnavailable:
+        return None
+
+    _remember(query, datetime.now(timezone.utc), coords)
+    if db is not None:
+        await _run_db(db, _store_db, query, coords)
+    return coords
@@ -0,0 +1,167 @@
+"""Open-Meteo forecast fetching and caching, shared by the climate and climate-actions routers."""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.http_clients import get_weather_client
+
+FORECAST_PATH = "/v1/forecast"
+WEATHER_MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", 2))
+WEATHER_RETRY_BASE_DELAY = float(os.getenv("WEATHER_RETRY_BASE_DELAY", 1.0))
+
+
+async def fetch_weather_data(latitude: float, longitude: float, daily_params: str) -> Dict[str, Any]:
+    """
+    Fetches the full forecast (including the "daily" block) from Open-Meteo
+    using the shared pooled client, retrying transient failures with backoff.
+    """
+    params = {"latitude": latitude, "longitude": longitude, "daily": daily_params, "timezone": "auto"}
+    client = get_weather_client()
+
+    for attempt in range(WEATHER_MAX_RETRIES + 1):
+        try:
+            response = await client.get(FORECAST_PATH, params=params)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.RequestError, httpx.HTTPStatusError) as e:
+            print(f"WARN: Attempt {attempt + 1}/{WEATHER_MAX_RETRIES + 1} failed to fetch weather: {e}")
+            if attempt == WEATHER_MAX_RETRIES:
+                if isinstance(e, httpx.HTTPStatusError):
+                    print(f"ERROR: Open-Meteo API returned status {e.response.status_code} after retries: {e.response.text}")
+                    raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Weather service returned an error.")
+                print(f"ERROR: Could not connect to Open-Meteo API after {WEATHER_MAX_RETRIES + 1} attempts: {e}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not connect to the weather service.")
+            await asyncio.sleep(WEATHER_RETRY_BASE_DELAY * (2 ** attempt))
+        except Exception as e:
+            print(f"ERROR: An unexpected error occurred while fetching weather data: {e}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred fetching weather data.")
+    raise HTTPException(status_code=500, detail="Weather fetch failed unexpectedly after retries.")
+
+
+# --- Forecast cache ---
+# Forecasts only change a few times a day and neighbouring farms share the
+# same model grid cell, so responses are cached per (snapped lat/lon, daily params).
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", 0.1))
+FORECAST_CACHE_TTL_SECONDS = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", 1800))
+FORECAST_CACHE_STALE_SECONDS = float(os.getenv("FORECAST_CACHE_STALE_SECONDS", 86400))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", 2048))
+
+ForecastKey = Tuple[float, float, str]
+
+
+def snap_to_grid(value: float, step: float = WEATHER_GRID_DEGREES) -> float:
+    """Snaps a coordinate to the centre of its forecast grid cell."""
+    return round(round(value / step) * step, 4)
+
+
+def forecast_cache_key(latitude: float, longitude: float, daily_params: str) -> ForecastKey:
+    params = ",".join(sorted({p.strip() for p in daily_params.split(",") if p.strip()}))
+    return (snap_to_grid(latitude), snap_to_grid(longitude), params)
+
+
+class ForecastCache:
+    """
+    In-memory LRU of forecasts with TTL expiry.
+
+    - Fresh entries (younger than `ttl`) are served directly.
+    - Stale entries (younger than `stale_ttl`) are served immediately while a
+      single background fetch revalidates them, so an upstream outage keeps
+      serving the last good forecast.
+    - Concurrent misses for the same key share one upstream fetch.
+    """
+
+    def __init__(
+        self,
+        fetcher: Callable[[float, float, str], Awaitable[Dict[str, Any]]],
+        ttl: float = FORECAST_CACHE_TTL_SECONDS,
+        stale_ttl: float = FORECAST_CACHE_STALE_SECONDS,
+        max_entries: int = FORECAST_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[ForecastKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[ForecastKey, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.upstream_fetches = 0
+        self.upstream_errors = 0
+
+    async def get(self, latitude: float, longitude: float, daily_params: str) -> Dict[str, Any]:
+        key = forecast_cache_key(latitude, longitude, daily_params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, data = entry
+            age = self._clock() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return data
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._fetch_shared(key)  # revalidate in the background
+                return data
+            del self._entries[key]
+
+        self.misses += 1
+        return await asyncio.shield(self._fetch_shared(key))
+
+    def _fetch_shared(self, key: ForecastKey) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_fetch_done(k, t))
+        return task
+
+    def _on_fetch_done(self, key: ForecastKey, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Marks the exception as retrieved for background revalidations
+            print(f"WARN: Forecast fetch for {key} failed: {task.exception()}")
+
+    async def _fetch_and_store(self, key: ForecastKey) -> Dict[str, Any]:
+        latitude, longitude, params = key
+        self.upstream_fetches += 1
+        try:
+            data = await self._fetcher(latitude, longitude, params)
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        self._entries[key] = (self._clock(), data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "upstream_fetches": self.upstream_fetches,
+            "upstream_errors": self.upstream_errors,
+        }
+
+
+forecast_cache = ForecastCache(fetch_weather_data)
+
+
+async def get_forecast(latitude: float, longitude: float, daily_params: str) -> Dict[str, Any]:
+    """Cached, coalesced forecast lookup used by the routers."""
+    return await forecast_cache.get(latitude, longitude, daily_params)
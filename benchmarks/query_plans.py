@@ -0,0 +1,238 @@
+"""
+Query-plan benchmark for the hot endpoint queries.
+
+Seeds a throwaway database with a realistic dataset, then runs the query
+behind each hot endpoint, recording its plan (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN ANALYZE on PostgreSQL) and timings.
+
+    python -m benchmarks.query_plans --database-url sqlite:////tmp/bench.db
+    python -m benchmarks.query_plans --database-url postgresql://... --json plans.json
+    python -m benchmarks.query_plans --without-indexes   # baseline without the hot-query indexes
+
+The target database is dropped and recreated; never point it at real data.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, func, insert, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine, desc, select
+
+from app.emission_rollup import rebuild_rollup
+from app.emission_timeseries import emission_buckets_statement
+from app.models import Farm, FarmActivity, FarmDailyEmission, ForumPost, ForumThread, Notification, SoilReport, User
+from app.pagination import keyset_page
+
+# Indexes added for these queries (5b2e9d41a7c3, e6a2d7c41f58)
+HOT_QUERY_INDEXES = [
+    "ix_farm_owner_id",
+    "ix_farmactivity_farm_id_date_id",
+    "ix_soilreport_farm_id_date_id",
+    "ix_soilreport_farm_id_id",
+    "ix_forumthread_created_at_id",
+    "ix_forumpost_thread_id_created_at",
+    "ix_notification_user_id_is_read_created_at_id",
+]
+
+ACTIVITY_TYPES = ["Planting", "Fertilizing", "Irrigation", "Harvesting", "Tillage", "Spraying"]
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+CHUNK_SIZE = 5000
+
+
+def _insert_chunked(connection, model, rows: List[Dict[str, Any]]):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def seed(engine: Engine, users: int, farms_per_user: int, activities_per_farm: int, seed_value: int = 42):
+    """Recreates the schema and fills it. Ids are assigned here so rows can reference each other."""
+    rng = random.Random(seed_value)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+
+    user_rows = [{"id": u, "email": f"farmer{u}@example.com", "full_name": f"Farmer {u}",
+                  "hashed_password": "x", "token_version": 0} for u in range(1, users + 1)]
+    farm_rows, activity_rows, report_rows = [], [], []
+    for user_id in range(1, users + 1):
+        for _ in range(farms_per_user):
+            farm_id = len(farm_rows) + 1
+            farm_rows.append({"id": farm_id, "name": f"Farm {farm_id}", "location_text": "Nakuru",
+                              "owner_id": user_id, "created_at": NOW})
+            for _ in range(activities_per_farm):
+                activity_rows.append({
+                    "activity_type": rng.choice(ACTIVITY_TYPES), "farm_id": farm_id, "user_id": user_id,
+                    "date": NOW - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                    "carbon_footprint_kg": round(rng.uniform(0.5, 400), 2), "value": 1.0, "unit": "kg",
+                })
+            for r in range(max(1, activities_per_farm // 20)):
+                report_rows.append({
+                    "farm_id": farm_id, "date": NOW - timedelta(days=r * 7), "ph": 6.5,
+                    "suggested_crops": ["Maize", "Beans"] if r % 2 == 0 else None,
+                })
+
+    thread_count = max(1, users * 2)
+    thread_rows = [{"id": t, "title": f"Question {t}", "content": "How do I improve my soil?",
+                    "owner_id": rng.randint(1, users), "created_at": NOW - timedelta(hours=thread_count - t)}
+                   for t in range(1, thread_count + 1)]
+    post_rows, notification_rows = [], []
+    for thread in thread_rows:
+        for p in range(rng.randint(0, 20)):
+            post_id = len(post_rows) + 1
+            replier = rng.randint(1, users)
+            created_at = thread["created_at"] + timedelta(minutes=p + 1)
+            post_rows.append({"id": post_id, "content": "Try mulching.", "thread_id": thread["id"],
+                              "owner_id": replier, "created_at": created_at})
+            if replier != thread["owner_id"]:
+                notification_rows.append({"user_id": thread["owner_id"], "post_id": post_id,
+                                          "message": "New reply", "is_read": rng.random() < 0.7,
+                                          "created_at": created_at})
+
+    with engine.begin() as connection:
+        _insert_chunked(connection, User, user_rows)
+        _insert_chunked(connection, Farm, farm_rows)
+        _insert_chunked(connection, FarmActivity, activity_rows)
+        _insert_chunked(connection, SoilReport, report_rows)
+        _insert_chunked(connection, ForumThread, thread_rows)
+        _insert_chunked(connection, ForumPost, post_rows)
+        _insert_chunked(connection, Notification, notification_rows)
+    with Session(engine) as session:
+        rebuild_rollup(session)
+    with engine.begin() as connection:
+        # Fresh planner statistics, as a long-lived database would have
+        connection.execute(text("ANALYZE"))
+    return {"users": len(user_rows), "farms": len(farm_rows), "activities": len(activity_rows),
+            "soil_reports": len(report_rows), "threads": len(thread_rows), "posts": len(post_rows),
+            "notifications": len(notification_rows)}
+
+
+def drop_hot_query_indexes(engine: Engine):
+    with engine.begin() as connection:
+        for name in HOT_QUERY_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def hot_queries(dialect_name: str, user_id: int, farm_id: int, thread_id: int) -> Dict[str, Any]:
+    """The statement behind each hot endpoint, as the routers build it."""
+    user_farms = select(Farm.id).where(Farm.owner_id == user_id)
+    today = NOW.date()
+    return {
+        "GET /farms": select(Farm).where(Farm.owner_id == user_id),
+        "GET /activities/emissions/weekly": emission_buckets_statement(
+            dialect_name, user_id, today - timedelta(days=6), today),
+        "GET /activities/emissions/timeseries (a year by week)": emission_buckets_statement(
+            dialect_name, user_id, today - timedelta(days=364), today, "week", ZoneInfo("Europe/Berlin"),
+            ("activity_type",)),
+        "GET /activities/farm/{id}": keyset_page(
+            select(FarmActivity).where(FarmActivity.farm_id == farm_id),
+            FarmActivity.date, FarmActivity.id, None, 20),
+        "GET /activities/farm/{id}/carbon_summary": select(
+            FarmDailyEmission.activity_type, func.sum(FarmDailyEmission.total_kg))
+            .where(FarmDailyEmission.farm_id == farm_id).group_by(FarmDailyEmission.activity_type),
+        "GET /activities/me/recent": select(FarmActivity)
+            .where(FarmActivity.farm_id.in_(user_farms)).order_by(desc(FarmActivity.date)).limit(5),
+        "GET /soil/farm/{id}": keyset_page(
+            select(SoilReport).where(SoilReport.farm_id == farm_id),
+            SoilReport.date, SoilReport.id, None, 20),
+        "GET /soil/suggestions/summary": select(func.max(SoilReport.id))
+            .where(SoilReport.farm_id.in_(user_farms)).where(SoilReport.suggested_crops != None)
+            .group_by(SoilReport.farm_id),
+        "GET /forum/threads": keyset_page(
+            select(ForumThread.id), ForumThread.created_at, ForumThread.id, None, 20),
+        "GET /forum/threads (reply stats)": select(
+            ForumPost.thread_id, func.count(ForumPost.id), func.max(ForumPost.created_at))
+            .where(ForumPost.thread_id.in_(
+                keyset_page(select(ForumThread.id), ForumThread.created_at, ForumThread.id, None, 20)))
+            .group_by(ForumPost.thread_id),
+        "GET /forum/threads/{id}": select(ForumPost)
+            .where(ForumPost.thread_id == thread_id).order_by(ForumPost.created_at),
+        "GET /notifications": keyset_page(
+            select(Notification).where(Notification.user_id == user_id).where(Notification.is_read == False),
+            Notification.created_at, Notification.id, None, 20),
+    }
+
+
+def _install_explain(engine: Engine, analyze: bool):
+    """Rewrites statements run with execution_options(explain=True) into EXPLAIN statements."""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else (
+        "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN ")
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def explain(connection, cursor, statement, parameters, context, executemany):
+        if context is not None and context.execution_options.get("explain"):
+            statement = prefix + statement
+        return statement, parameters
+
+
+def _plan_lines(rows) -> List[str]:
+    # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are single text columns
+    return [row[-1] for row in rows]
+
+
+def run(engine: Engine, repeat: int = 20, analyze: bool = True) -> Dict[str, Dict[str, Any]]:
+    _install_explain(engine, analyze)
+    with engine.connect() as connection:
+        user_id = connection.execute(
+            select(Farm.owner_id).group_by(Farm.owner_id).order_by(func.count(Farm.id).desc()).limit(1)
+        ).scalar()
+        farm_id = connection.execute(select(Farm.id).where(Farm.owner_id == user_id).limit(1)).scalar()
+        thread_id = connection.execute(
+            select(ForumPost.thread_id).group_by(ForumPost.thread_id)
+            .order_by(func.count(ForumPost.id).desc()).limit(1)
+        ).scalar()
+
+        results = {}
+        for name, statement in hot_queries(engine.dialect.name, user_id, farm_id, thread_id).items():
+            plan = _plan_lines(connection.execution_options(explain=True).execute(statement).all())
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(statement).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+                "plan": plan,
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default="sqlite:////tmp/greenfund_bench.db")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--farms-per-user", type=int, default=2)
+    parser.add_argument("--activities-per-farm", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--without-indexes", action="store_true", help="drop the hot-query indexes first")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    counts = seed(engine, args.users, args.farms_per_user, args.activities_per_farm)
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+    if args.without_indexes:
+        drop_hot_query_indexes(engine)
+        print("Dropped the hot-query indexes.")
+
+    results = run(engine, repeat=args.repeat)
+    for name, result in results.items():
+        print(f"\n{name}: median {result['median_ms']} ms, p95 {result['p95_ms']} ms")
+        for line in result["plan"]:
+            print(f"    {line}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"dataset": counts, "indexes": not args.without_indexes, "queries": results}, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
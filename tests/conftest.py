@@ -2,24 +2,29 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 import os
 
 from app.main import app
-from app.database import get_db, engine
+from app.database import get_db, get_async_db, get_read_db, engine
 from app.models import User
+from app.principal_cache import principal_cache
+from app.badge_service import badge_catalog
 from app.security import get_password_hash
 
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
-
 
 @pytest.fixture(scope="function")
-def test_db():
-    # Create a new engine instance for testing
+def test_db(tmp_path):
+    # A file rather than :memory:, so the async routes' aiosqlite engine sees the same data
+    database_path = tmp_path / "test.db"
     test_engine = create_engine(
-        SQLALCHEMY_TEST_DATABASE_URL,
+        f"sqlite:///{database_path}",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    async_test_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
     SQLModel.metadata.create_all(test_engine)
 
     # Create a new session for the test
@@ -30,11 +35,21 @@ def test_db():
             finally:
                 pass
 
+        async def override_get_async_db():
+            async with AsyncSession(async_test_engine, expire_on_commit=False) as async_session:
+                yield async_session
+
         # Override the get_db dependency
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_read_db] = override_get_db
         yield session
 
     SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    # User ids repeat across the per-test databases
+    principal_cache.clear()
+    badge_catalog.clear()
 
 
 @pytest.fixture
@@ -60,3 +75,11 @@ def test_user(test_db):
     test_db.commit()
     test_db.refresh(user)
     return user
+
+
+@pytest.fixture
+def metrics_headers(monkeypatch):
+    from app.routers import metrics
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "test-metrics-token")
+    return {"X-Metrics-Token": "test-metrics-token"}
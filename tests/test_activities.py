@@ -0,0 +1,256 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from sqlmodel import select
+
+from app import upsert
+from app.emission_rollup import add_to_rollup, rebuild_rollup
+from app.models import Farm, FarmActivity, FarmDailyEmission, User
+from app.security import get_password_hash
+
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    response = client.post(
+        "/api/auth/token",
+        data={"username": test_user.email, "password": "test123"}
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def test_farm(test_db, test_user):
+    farm = Farm(name="Shamba", location_text="Nakuru", latitude=-0.3, longitude=36.08, owner_id=test_user.id)
+    test_db.add(farm)
+    test_db.commit()
+    test_db.refresh(farm)
+    return farm
+
+
+@pytest.fixture
+def other_farm(test_db):
+    other = User(email="other@example.com", hashed_password=get_password_hash("other123"))
+    test_db.add(other)
+    test_db.commit()
+    farm = Farm(name="Not mine", location_text="Eldoret", owner_id=other.id)
+    test_db.add(farm)
+    test_db.commit()
+    test_db.refresh(farm)
+    return farm
+
+
+def test_bulk_json_reports_row_errors_without_aborting(client, test_db, auth_headers, test_farm, other_farm):
+    payload = [
+        {"farm_id": test_farm.id, "activity_type": "Planting", "value": 10, "unit": "litres"},
+        {"farm_id": other_farm.id, "activity_type": "Planting", "value": 5, "unit": "litres"},
+        {"farm_id": test_farm.id, "value": 5, "unit": "kg"},
+        {"farm_id": test_farm.id, "activity_type": "Fertilizing", "value": 2, "unit": "bags"},
+    ]
+    response = client.post("/api/activities/bulk", json=payload, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["received"], data["created"], data["failed"]) == (4, 2, 2)
+    assert [err["row"] for err in data["errors"]] == [2, 3]
+
+    footprints = test_db.exec(
+        select(FarmActivity.carbon_footprint_kg).where(FarmActivity.farm_id == test_farm.id)
+    ).all()
+    assert sorted(footprints) == [26.8, 400.0]
+
+
+def test_bulk_csv_upload(client, test_db, auth_headers, test_farm):
+    csv_body = (
+        "farm_id,activity_type,description,date,value,unit\n"
+        f"{test_farm.id},Harvesting,Combine,2026-03-01T08:00:00,4,L\n"
+        f"{test_farm.id},Tilling,,2026-03-02T08:00:00,1,acre\n"
+    )
+    response = client.post(
+        "/api/activities/bulk",
+        content=csv_body,
+        headers={**auth_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["created"] == 2
+
+    activities = test_db.exec(select(FarmActivity).where(FarmActivity.farm_id == test_farm.id)).all()
+    assert {a.activity_type for a in activities} == {"Harvesting", "Tilling"}
+
+
+def test_farm_activities_page_with_a_stable_cursor(client, test_db, auth_headers, test_farm, test_user):
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        test_db.add(FarmActivity(
+            activity_type="Planting", date=base + timedelta(days=i // 2),
+            farm_id=test_farm.id, user_id=test_user.id,
+        ))
+    test_db.commit()
+
+    first = client.get(f"/api/activities/farm/{test_farm.id}", params={"limit": 3}, headers=auth_headers).json()
+    assert len(first["items"]) == 3 and first["next_cursor"]
+
+    # A row added after page 1 was served must not shift the following pages
+    test_db.add(FarmActivity(activity_type="Harvesting", date=base + timedelta(days=10),
+                             farm_id=test_farm.id, user_id=test_user.id))
+    test_db.commit()
+
+    seen = [a["id"] for a in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/api/activities/farm/{test_farm.id}",
+                          params={"limit": 3, "cursor": cursor}, headers=auth_headers).json()
+        seen += [a["id"] for a in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert len(seen) == len(set(seen)) == 7
+
+
+def test_async_create_activity_overlaps_slow_estimates(client, test_db, auth_headers, test_farm, monkeypatch):
+    import asyncio
+    import time
+
+    import httpx
+
+    from app.main import app
+    from app.routers import activities
+
+    async def slow_estimate(*args):
+        await asyncio.sleep(0.3)
+        return 1.5
+
+    monkeypatch.setattr(activities, "estimate_carbon_with_ai", slow_estimate)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(
+                ac.post("/api/activities/", headers=auth_headers, json={
+                    "farm_id": test_farm.id, "activity_type": "Irrigation", "value": i + 1, "unit": "litres",
+                })
+                for i in range(8)
+            ))
+
+    started = time.perf_counter()
+    responses = asyncio.run(burst())
+    elapsed = time.perf_counter() - started
+
+    assert [r.status_code for r in responses] == [status.HTTP_201_CREATED] * 8
+    # Eight 0.3 s estimates run concurrently instead of one after another
+    assert elapsed < 1.2
+    assert len(test_db.exec(select(FarmActivity).where(FarmActivity.farm_id == test_farm.id)).all()) == 8
+
+
+def _log(test_db, farm, user, activity_type, when, kg):
+    test_db.add(FarmActivity(activity_type=activity_type, farm_id=farm.id, user_id=user.id, date=when,
+                             carbon_footprint_kg=kg, value=1, unit="kg"))
+
+
+def test_weekly_emissions_buckets_the_last_seven_days(client, test_db, auth_headers, test_farm, test_user, other_farm):
+    now = datetime.now(timezone.utc)
+    _log(test_db, test_farm, test_user, "Planting", now, 1.5)
+    _log(test_db, test_farm, test_user, "Irrigation", now, 2.0)
+    _log(test_db, test_farm, test_user, "Planting", now - timedelta(days=3), 4.0)
+    _log(test_db, test_farm, test_user, "Planting", now - timedelta(days=9), 100.0)
+    _log(test_db, other_farm, test_user, "Planting", now, 50.0)
+    test_db.commit()
+
+    response = client.get("/api/activities/emissions/weekly", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["daily_emissions"] == [0.0, 0.0, 0.0, 4.0, 0.0, 0.0, 3.5]
+    assert data["total_emissions_kg"] == 7.5
+
+
+def test_emissions_timeseries_in_local_time_across_dst(client, test_db, auth_headers, test_farm, test_user):
+    # 23:30 UTC on 30 March is 1:30 on 31 March in Berlin (CEST, after the 30 March switch)
+    _log(test_db, test_farm, test_user, "Planting", datetime(2025, 3, 30, 23, 30, tzinfo=timezone.utc), 1.0)
+    # 23:30 UTC on 29 March is 0:30 on 30 March (CET)
+    _log(test_db, test_farm, test_user, "Tillage", datetime(2025, 3, 29, 23, 30, tzinfo=timezone.utc), 2.0)
+    _log(test_db, test_farm, test_user, "Planting", datetime(2025, 4, 2, 12, 0, tzinfo=timezone.utc), 4.0)
+    test_db.commit()
+
+    params = {"start": "2025-03-01", "end": "2025-04-30", "tz": "Europe/Berlin"}
+    daily = client.get("/api/activities/emissions/timeseries", params=params, headers=auth_headers).json()
+    assert [(b["period_start"], b["total_kg"]) for b in daily["buckets"]] == [
+        ("2025-03-30", 2.0), ("2025-03-31", 1.0), ("2025-04-02", 4.0)
+    ]
+
+    monthly = client.get(
+        "/api/activities/emissions/timeseries",
+        params={**params, "granularity": "month", "breakdown": "activity_type"},
+        headers=auth_headers,
+    ).json()
+    assert [(b["period_start"], b["activity_type"], b["total_kg"], b["activity_count"]) for b in monthly["buckets"]] == [
+        ("2025-03-01", "Planting", 1.0, 1), ("2025-03-01", "Tillage", 2.0, 1), ("2025-04-01", "Planting", 4.0, 1)
+    ]
+    assert monthly["total_emissions_kg"] == 7.0
+
+    weekly = client.get(
+        "/api/activities/emissions/timeseries", params={**params, "granularity": "week"}, headers=auth_headers
+    ).json()
+    assert [(b["period_start"], b["total_kg"]) for b in weekly["buckets"]] == [("2025-03-24", 2.0), ("2025-03-31", 5.0)]
+
+
+def test_emissions_timeseries_rejects_bad_parameters(client, auth_headers):
+    for params in ({"tz": "Mars/Olympus"}, {"granularity": "hour"}, {"breakdown": "user"},
+                   {"start": "2025-02-01", "end": "2025-01-01"}, {"start": "2000-01-01", "end": "2025-01-01"}):
+        response = client.get("/api/activities/emissions/timeseries", params=params, headers=auth_headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, params
+
+
+def _rollup(test_db, farm):
+    test_db.expire_all()
+    return sorted(
+        (row.day.isoformat(), row.activity_type, row.total_kg, row.activity_count)
+        for row in test_db.exec(select(FarmDailyEmission).where(FarmDailyEmission.farm_id == farm.id)).all()
+    )
+
+
+def test_rollup_follows_activity_writes(client, test_db, auth_headers, test_farm):
+    payload = [
+        {"farm_id": test_farm.id, "activity_type": "Planting", "value": 10, "unit": "litres", "date": "2026-03-01T08:00:00"},
+        {"farm_id": test_farm.id, "activity_type": "Planting", "value": 10, "unit": "litres", "date": "2026-03-01T18:00:00"},
+        {"farm_id": test_farm.id, "activity_type": "Fertilizing", "value": 2, "unit": "bags", "date": "2026-03-02T08:00:00"},
+    ]
+    assert client.post("/api/activities/bulk", json=payload, headers=auth_headers).json()["created"] == 3
+    # 23:30 in Nairobi on 2 March is 20:30 UTC, the same UTC day
+    single = client.post("/api/activities/", headers=auth_headers, json={
+        "farm_id": test_farm.id, "activity_type": "Fertilizing", "value": 1, "unit": "bags",
+        "date": "2026-03-02T23:30:00+03:00",
+    })
+    assert single.status_code == status.HTTP_201_CREATED
+
+    assert _rollup(test_db, test_farm) == [
+        ("2026-03-01", "Planting", 53.6, 2),
+        ("2026-03-02", "Fertilizing", 600.0, 2),
+    ]
+    summary = client.get(f"/api/activities/farm/{test_farm.id}/carbon_summary", headers=auth_headers).json()
+    assert summary == {"total_carbon_kg": 653.6, "breakdown_by_activity": {"Planting": 53.6, "Fertilizing": 600.0}}
+
+    planting = test_db.exec(select(FarmActivity).where(FarmActivity.activity_type == "Planting")).all()
+    for activity in planting:
+        assert client.delete(f"/api/activities/{activity.id}", headers=auth_headers).status_code == 204
+    assert _rollup(test_db, test_farm) == [("2026-03-02", "Fertilizing", 600.0, 2)]
+
+
+def test_rollup_without_on_conflict_support(test_db, test_farm, monkeypatch):
+    # Databases other than PostgreSQL and SQLite take the UPDATE-then-INSERT path
+    monkeypatch.setattr(upsert, "_DIALECT_INSERTS", {})
+    day = datetime(2026, 3, 1, 8, tzinfo=timezone.utc)
+    activity = {"farm_id": test_farm.id, "activity_type": "Planting", "date": day, "carbon_footprint_kg": 1.5}
+    add_to_rollup(test_db, [activity])
+    add_to_rollup(test_db, [activity, {**activity, "activity_type": "Tillage"}])
+    test_db.commit()
+
+    assert _rollup(test_db, test_farm) == [("2026-03-01", "Planting", 3.0, 2), ("2026-03-01", "Tillage", 1.5, 1)]
+
+
+def test_rebuild_rollup_matches_the_activity_table(test_db, test_farm, test_user):
+    _log(test_db, test_farm, test_user, "Planting", datetime(2026, 3, 1, 8, tzinfo=timezone.utc), 1.5)
+    _log(test_db, test_farm, test_user, "Planting", datetime(2026, 3, 1, 20, tzinfo=timezone.utc), 2.5)
+    _log(test_db, test_farm, test_user, "Tillage", datetime(2026, 3, 3, 8, tzinfo=timezone.utc), None)
+    test_db.commit()
+
+    assert rebuild_rollup(test_db) == 2
+    assert _rollup(test_db, test_farm) == [("2026-03-01", "Planting", 4.0, 2), ("2026-03-03", "Tillage", 0.0, 1)]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from openai import AsyncOpenAI
+
+from app import ai_client
+from app.chat_cache import chat_answer_cache
+from app.main import app
+
+FAKE_LLM_DELAY = 0.5
+
+
+def build_fake_openai_app(delay: float = FAKE_LLM_DELAY) -> FastAPI:
+    """A local stand-in for the OpenAI chat completions API."""
+    fake = FastAPI()
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        await asyncio.sleep(delay)
+        return {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "Use mulch to keep moisture in."},
+            }],
+        }
+
+    return fake
+
+
+def fake_openai_client(fake_app: FastAPI) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key="test-key",
+        base_url="http://fake-openai/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app)),
+    )
+
+
+def test_unrelated_requests_keep_their_latency_while_ai_calls_are_in_flight():
+    async def run():
+        chat_answer_cache.clear()
+        ai_client.set_openai_client(fake_openai_client(build_fake_openai_app()))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ai_calls = [
+                asyncio.create_task(client.post("/api/chatbot/ask", json={"prompt": "How do I keep soil moist?"}))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.05)  # let the AI calls reach the fake server
+
+            latencies = []
+            for _ in range(10):
+                started = time.perf_counter()
+                response = await client.get("/")
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+            in_flight = sum(not task.done() for task in ai_calls)
+            ai_responses = await asyncio.gather(*ai_calls)
+        return latencies, in_flight, ai_responses
+
+    try:
+        latencies, in_flight, ai_responses = asyncio.run(run())
+    finally:
+        ai_client.set_openai_client(None)
+
+    # The AI calls were still running while every unrelated request completed quickly
+    assert in_flight == 4
+    assert max(latencies) < FAKE_LLM_DELAY / 2
+    for response in ai_responses:
+        assert response.status_code == 200
+        assert response.json()["reply"] == "Use mulch to keep moisture in."
@@ -1,5 +1,9 @@
 import pytest
 from fastapi import status
+from sqlalchemy import event
+
+from app.principal_cache import principal_cache
+from app.security import create_access_token
 
 
 @pytest.fixture
@@ -158,3 +162,48 @@ def test_change_user_password(client, test_user, auth_headers):
         }
     )
     assert old_login_response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def user_queries(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return lambda: [s for s in statements if 'FROM "user"' in s or "FROM user" in s]
+
+
+def test_authenticated_requests_are_served_from_the_principal_cache(client, test_db, auth_headers):
+    queries = user_queries(test_db)
+    test_db.expunge_all()  # so a lookup can't be served from the identity map
+    client.get("/api/users/me", headers=auth_headers)
+    test_db.expunge_all()
+    before = principal_cache.stats()["hits"]
+
+    response = client.get("/api/users/me", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["full_name"] == "Test User"
+    assert len(queries()) == 1
+    assert principal_cache.stats()["hits"] == before + 1
+
+
+def test_profile_update_invalidates_the_cached_principal(client, auth_headers):
+    client.get("/api/users/me", headers=auth_headers)
+    client.put("/api/users/me", json={"full_name": "Renamed Farmer"}, headers=auth_headers)
+    assert client.get("/api/users/me", headers=auth_headers).json()["full_name"] == "Renamed Farmer"
+
+
+def test_password_change_revokes_older_tokens(client, auth_headers):
+    client.get("/api/users/me", headers=auth_headers)
+    response = client.post("/api/users/me/change-password", headers=auth_headers,
+                           json={"old_password": "test123", "new_password": "newpass123"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    assert client.get("/api/users/me", headers=auth_headers).status_code == status.HTTP_401_UNAUTHORIZED
+    fresh = {"Authorization": f"Bearer {response.headers['X-Access-Token']}"}
+    assert client.get("/api/users/me", headers=fresh).status_code == status.HTTP_200_OK
+
+
+def test_tokens_without_uid_claim_still_work(client, test_user):
+    legacy = {"Authorization": f"Bearer {create_access_token({'sub': test_user.email})}"}
+    response = client.get("/api/users/me", headers=legacy)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["email"] == test_user.email
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.chat_cache import ChatAnswerCache, chat_answer_cache, normalize_prompt
+from app.routers import chatbot
+
+
+def test_case_punctuation_and_spacing_share_a_key():
+    assert normalize_prompt("How do I control fall armyworm?") == normalize_prompt("how do i  control FALL ARMYWORM")
+    assert normalize_prompt("What are the best crops for red soil") == "what are the best crops for red soil"
+    assert normalize_prompt("?!") == ""
+
+
+def test_different_questions_about_the_same_topic_miss_each_other():
+    cache = ChatAnswerCache()  # fuzzy matching on, default threshold
+    cache.set("when to plant beans", "At the start of the long rains.")
+    assert cache.get("how to plant beans") is None
+    assert cache.get("Why plant beans?") is None
+    assert cache.get("When to plant beans?") == "At the start of the long rains."
+
+
+def test_prompts_without_words_are_never_cached():
+    cache = ChatAnswerCache()
+    cache.set("???", "Please ask a question.")
+    assert cache.stats()["entries"] == 0
+    assert cache.get("!!!") is None
+
+
+def test_fuzzy_match_finds_near_duplicates():
+    cache = ChatAnswerCache(fuzzy=True, fuzzy_threshold=0.6)
+    cache.set("How do I control fall armyworm in maize?", "Scout early and use push-pull.")
+    assert cache.get("how do I control fall armyworms in maize") == "Scout early and use push-pull."
+    assert cache.get("How do I plant avocado seedlings?") is None
+    assert cache.stats()["fuzzy_hits"] == 1
+
+
+def test_ttl_and_lru_eviction():
+    now = [0.0]
+    cache = ChatAnswerCache(ttl=10, max_entries=2, fuzzy=False, clock=lambda: now[0])
+    cache.set("best crops for red soil", "Maize and beans.")
+    cache.set("when to plant beans", "At the start of the long rains.")
+    cache.get("best crops for red soil")  # refreshes its LRU position
+    cache.set("how to make compost", "Layer green and brown material.")
+
+    assert cache.get("when to plant beans") is None
+    assert cache.get("best crops for red soil") == "Maize and beans."
+    now[0] = 11
+    assert cache.get("best crops for red soil") is None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.fixture
+def fake_completion(monkeypatch):
+    calls = []
+
+    async def create_chat_completion(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Use push-pull."))])
+
+    chat_answer_cache.clear()
+    monkeypatch.setattr(chatbot, "create_chat_completion", create_chat_completion)
+    yield calls
+    chat_answer_cache.clear()
+
+
+def test_repeated_questions_are_answered_from_cache(client, fake_completion):
+    first = client.post("/api/chatbot/ask", json={"prompt": "How do I control fall armyworm?"})
+    second = client.post("/api/chatbot/ask", json={"prompt": "how do I control FALL ARMYWORM"})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json() == {"reply": "Use push-pull."}
+    assert len(fake_completion) == 1
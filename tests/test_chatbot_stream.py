@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+from app import ai_client
+from app.chat_cache import chat_answer_cache
+from app.main import app
+
+TOKENS = ["Mulch ", "your ", "beds ", "to ", "keep ", "moisture ", "in."]
+TOKEN_DELAY = 0.1
+
+
+class FakeStreamingModel(httpx.AsyncBaseTransport):
+    """Local stand-in for OpenAI that streams one chat.completion.chunk per token."""
+
+    def __init__(self, tokens=TOKENS, delay=TOKEN_DELAY):
+        self.tokens = tokens
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=_FakeStream(self))
+
+
+class _FakeStream(httpx.AsyncByteStream):
+    def __init__(self, model: FakeStreamingModel):
+        self._gen = self._chunks(model)
+
+    async def _chunks(self, model):
+        try:
+            for token in model.tokens:
+                await asyncio.sleep(model.delay)
+                model.sent += 1
+                chunk = {
+                    "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o-mini",
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+        finally:
+            model.closed = True
+
+    async def __aiter__(self):
+        async for part in self._gen:
+            yield part
+
+    async def aclose(self):
+        await self._gen.aclose()
+
+
+async def call_stream_endpoint(disconnect_after_tokens=None):
+    """Drives the ASGI app directly so we can timestamp every body chunk."""
+    disconnected = asyncio.Event()
+    request_sent = False
+    chunks = []
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            body = json.dumps({"prompt": "How do I keep my soil moist?"}).encode()
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append((time.perf_counter() - started, message["body"].decode()))
+            tokens_seen = sum("token" in body for _, body in chunks)
+            if disconnect_after_tokens and tokens_seen >= disconnect_after_tokens:
+                disconnected.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/chatbot/ask/stream", "raw_path": b"/api/chatbot/ask/stream",
+        "root_path": "", "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return chunks, time.perf_counter() - started
+
+
+def use_fake_model(model: FakeStreamingModel):
+    chat_answer_cache.clear()
+    ai_client.set_openai_client(AsyncOpenAI(
+        api_key="test-key",
+        base_url="http://fake-openai/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=model),
+    ))
+
+
+def test_tokens_are_streamed_as_they_are_produced():
+    model = FakeStreamingModel()
+    use_fake_model(model)
+    try:
+        chunks, total = asyncio.run(call_stream_endpoint())
+    finally:
+        ai_client.set_openai_client(None)
+
+    # The first token reaches the client while the rest are still being generated
+    first_token_at = chunks[0][0]
+    last_token_at = chunks[-2][0]
+    assert last_token_at - first_token_at >= TOKEN_DELAY * (len(TOKENS) - 2)
+    assert first_token_at < total / 2
+
+    events = "".join(body for _, body in chunks).strip().split("\n\n")
+    tokens = [json.loads(e[len("data: "):])["token"] for e in events if e.startswith("data: ")]
+    assert "".join(tokens) == "".join(TOKENS)
+    assert events[-1].startswith("event: done")
+
+
+def test_client_disconnect_cancels_the_upstream_completion():
+    model = FakeStreamingModel()
+    use_fake_model(model)
+    try:
+        chunks, _ = asyncio.run(call_stream_endpoint(disconnect_after_tokens=2))
+    finally:
+        ai_client.set_openai_client(None)
+
+    assert model.closed
+    assert model.sent < len(TOKENS)
+    assert not any("event: done" in body for _, body in chunks)
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import status
+
+from app.models import Farm, FarmActivity, NotificationCounter, SoilReport, User
+from app.routers import dashboard
+from app.security import get_password_hash
+
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    response = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def dashboard_data(test_db, test_user):
+    farm = Farm(name="Shamba", location_text="Nakuru", owner_id=test_user.id)
+    other = User(email="other@example.com", hashed_password=get_password_hash("other123"))
+    test_db.add(farm)
+    test_db.add(other)
+    test_db.commit()
+    test_db.add(Farm(name="Not mine", location_text="Eldoret", owner_id=other.id))
+    test_db.add(FarmActivity(activity_type="Planting", farm_id=farm.id, user_id=test_user.id,
+                             date=datetime.now(timezone.utc), carbon_footprint_kg=12.5))
+    test_db.add(SoilReport(farm_id=farm.id, ph=6.4, suggested_crops=["Maize", "Beans"]))
+    test_db.add(NotificationCounter(user_id=test_user.id, unread_count=3))
+    test_db.commit()
+    return farm
+
+
+def test_dashboard_returns_every_section(client, auth_headers, dashboard_data):
+    response = client.get("/api/dashboard/", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+
+    assert data["errors"] == {}
+    assert [farm["name"] for farm in data["farms"]] == ["Shamba"]
+    assert [activity["activity_type"] for activity in data["recent_activities"]] == ["Planting"]
+    assert data["weekly_emissions"]["total_emissions_kg"] == 12.5
+    assert data["weekly_emissions"]["daily_emissions"][-1] == 12.5
+    assert data["badge_count"] == 0
+    assert data["unread_notifications"] == 3
+    assert data["crop_suggestions"] == {"unique_suggestion_count": 2, "recent_suggestions": ["Maize", "Beans"]}
+
+
+def test_a_failing_section_degrades_alone(client, auth_headers, dashboard_data, monkeypatch):
+    def broken(db, user_id):
+        raise RuntimeError("badge table is locked")
+
+    monkeypatch.setattr(dashboard, "count_user_badges", broken)
+    data = client.get("/api/dashboard/", headers=auth_headers).json()
+
+    assert data["errors"] == {"badge_count": "unavailable"}
+    assert data["badge_count"] is None
+    assert data["unread_notifications"] == 3
+    assert len(data["farms"]) == 1
+
+
+def test_farm_sections_degrade_without_farms(client, auth_headers, dashboard_data, monkeypatch):
+    def broken(db, user_id):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(dashboard, "_read_farms", broken)
+    data = client.get("/api/dashboard/", headers=auth_headers).json()
+
+    assert data["errors"] == {
+        "farms": "unavailable",
+        "recent_activities": "farms unavailable",
+        "weekly_emissions": "farms unavailable",
+        "crop_suggestions": "farms unavailable",
+    }
+    assert data["unread_notifications"] == 3
+
+
+def test_sections_share_a_bounded_number_of_connections(client, auth_headers, dashboard_data, monkeypatch):
+    open_sessions, peak = [0], [0]
+
+    class CountingSession(dashboard.AsyncSession):
+        async def __aenter__(self):
+            open_sessions[0] += 1
+            peak[0] = max(peak[0], open_sessions[0])
+            return await super().__aenter__()
+
+        async def __aexit__(self, *exc_info):
+            open_sessions[0] -= 1
+            return await super().__aexit__(*exc_info)
+
+    monkeypatch.setattr(dashboard, "AsyncSession", CountingSession)
+    monkeypatch.setattr(dashboard, "DASHBOARD_MAX_CONNECTIONS", 2)
+    data = client.get("/api/dashboard/", headers=auth_headers).json()
+
+    assert data["errors"] == {}
+    assert peak[0] == 2
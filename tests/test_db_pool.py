@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import exc as sa_exc, text
+
+from app.db_pool import build_engine, pool_stats
+
+
+@pytest.fixture
+def small_engine(tmp_path):
+    engine = build_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", name="test-pool",
+        pool_size=1, max_overflow=1, pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_engine_uses_pool_settings_and_does_not_echo(small_engine):
+    assert small_engine.echo is False
+    assert small_engine.pool.size() == 1
+    assert small_engine.pool._pre_ping is True
+
+
+def test_pool_stats_report_occupancy_and_timeouts(small_engine):
+    first = small_engine.connect()
+    second = small_engine.connect()
+    second.execute(text("SELECT 1"))
+
+    stats = pool_stats()["test-pool"]
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+
+    # Pool and overflow are both in use, so the next checkout waits and times out
+    with pytest.raises(sa_exc.TimeoutError):
+        small_engine.connect()
+
+    first.close()
+    second.close()
+    stats = pool_stats()["test-pool"]
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+    buckets = stats["wait_ms_buckets"]
+    assert buckets["+Inf"] == 3
+    assert buckets["25"] == 2
+
+
+def test_metrics_endpoint_lists_the_primary_engine(client, metrics_headers):
+    response = client.get("/api/metrics/db-pool", headers=metrics_headers)
+    assert response.status_code == 200
+    assert "primary" in response.json()
+
+
+def test_metrics_endpoints_require_the_metrics_token(client, metrics_headers, monkeypatch):
+    assert client.get("/api/metrics/db-pool").status_code == 403
+    assert client.get("/api/metrics/db-pool", headers={"X-Metrics-Token": "guess"}).status_code == 403
+
+    from app.routers import metrics
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    assert client.get("/api/metrics/caches", headers=metrics_headers).status_code == 404
+
+
+def test_in_memory_engines_are_reported_too():
+    engine = build_engine("sqlite://", name="test-memory")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    stats = pool_stats()["test-memory"]
+    assert stats["checkouts"] == 1
+    assert "checked_out" not in stats
+    engine.dispose()
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import carbon_model
+from app.emission_factors import estimate_from_table
+
+
+def test_table_resolves_aliases_and_unit_conversions():
+    assert estimate_from_table("Planting", 10, "litres") == 26.8
+    assert estimate_from_table("ploughing", 1, "hectare") == estimate_from_table("Tilling", 2.471, "acres")
+    assert estimate_from_table("Fertilizing", 1, "bag") == 200.0
+    assert estimate_from_table("Fertilizing", 500, "g") == 2.0
+
+
+def test_table_leaves_unknown_combinations_unresolved():
+    assert estimate_from_table("Spraying", 3, "litres") is None
+    assert estimate_from_table("Planting", None, "litres") is None
+
+
+@pytest.fixture
+def fake_completion(monkeypatch):
+    calls = []
+
+    async def create_chat_completion(**kwargs):
+        calls.append(kwargs)
+        content = json.dumps({"carbon_kg_per_unit": 1.5})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(carbon_model, "get_openai_client", lambda: object())
+    monkeypatch.setattr(carbon_model, "create_chat_completion", create_chat_completion)
+    carbon_model._ai_factor_memo.clear()
+    yield calls
+    carbon_model._ai_factor_memo.clear()
+
+
+def test_known_activities_never_call_the_model(fake_completion):
+    estimate = asyncio.run(carbon_model.estimate_carbon_with_ai("Harvesting", 4, "L", None))
+    assert estimate == 10.72
+    assert fake_completion == []
+
+
+def test_model_factors_are_memoized_per_activity_and_unit(fake_completion):
+    first = asyncio.run(carbon_model.estimate_carbon_with_ai("Spraying", 2, "litres", "Pesticide"))
+    second = asyncio.run(carbon_model.estimate_carbon_with_ai("spraying", 4, "L", None))
+    assert (first, second) == (3.0, 6.0)
+    assert len(fake_completion) == 1
+
+
+def test_model_is_asked_for_the_canonical_unit(fake_completion):
+    # 1.5 kg CO2e per litre and per kg, whatever alias the farmer used
+    assert asyncio.run(carbon_model.estimate_carbon_with_ai("Spraying", 500, "ml", None)) == 0.75
+    assert asyncio.run(carbon_model.estimate_carbon_with_ai("Liming", 2, "bags", None)) == 150.0
+    assert asyncio.run(carbon_model.estimate_carbon_with_ai("Spraying", 2, "L", None)) == 3.0
+    prompts = [call["messages"][0]["content"] for call in fake_completion]
+    assert len(prompts) == 2
+    assert "Measured in: litre" in prompts[0] and "ml" not in prompts[0]
+    assert "Measured in: kg" in prompts[1] and "bag" not in prompts[1]
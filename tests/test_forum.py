@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.models import ForumPost, ForumThread, User
+from app.security import get_password_hash
+
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    response = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def forum_data(test_db, test_user):
+    """Three threads with 0, 2 and 5 replies from a second user."""
+    replier = User(email="replier@example.com", full_name="Replier", hashed_password=get_password_hash("pw123456"))
+    test_db.add(replier)
+    test_db.commit()
+
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    threads = []
+    for i, reply_count in enumerate([0, 2, 5]):
+        thread = ForumThread(
+            title=f"Thread {i}", content="Some question about maize.",
+            owner_id=test_user.id, created_at=base + timedelta(days=i),
+        )
+        test_db.add(thread)
+        test_db.commit()
+        for j in range(reply_count):
+            test_db.add(ForumPost(
+                content=f"Reply {j}", thread_id=thread.id,
+                owner_id=replier.id if j == reply_count - 1 else test_user.id,
+                created_at=base + timedelta(days=i, hours=j + 1),
+            ))
+        test_db.commit()
+        threads.append(thread)
+    return threads, replier
+
+
+def count_statements(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_thread_listing_includes_reply_stats(client, forum_data):
+    _, replier = forum_data
+    response = client.get("/api/forum/threads")
+    assert response.status_code == status.HTTP_200_OK
+    threads = response.json()["items"]
+
+    assert [t["title"] for t in threads] == ["Thread 2", "Thread 1", "Thread 0"]
+    assert [t["post_count"] for t in threads] == [5, 2, 0]
+    assert threads[0]["last_replier"]["id"] == replier.id
+    assert threads[0]["last_reply_at"].startswith("2026-01-03T05:00:00")
+    assert threads[2]["last_replier"] is None
+    assert threads[0]["owner"]["full_name"] == "Test User"
+    assert "posts" not in threads[0]
+
+
+def test_thread_listing_uses_a_constant_number_of_statements(client, test_db, forum_data):
+    statements = count_statements(test_db)
+    client.get("/api/forum/threads")
+    few_replies = len(statements)
+
+    thread = forum_data[0][2]
+    for j in range(20):
+        test_db.add(ForumPost(content=f"More {j}", thread_id=thread.id, owner_id=thread.owner_id))
+    test_db.commit()
+    test_db.expire_all()
+
+    statements.clear()
+    client.get("/api/forum/threads")
+    assert len(statements) == few_replies == 1
+
+
+def test_thread_listing_pages_with_a_cursor(client, test_db, test_user):
+    # Same created_at for every thread: the id breaks the tie
+    created_at = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        test_db.add(ForumThread(title=f"Topic {i}", content="Same-second question.", owner_id=test_user.id, created_at=created_at))
+    test_db.commit()
+
+    titles, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/forum/threads", params=params).json()
+        titles += [t["title"] for t in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert titles == [f"Topic {i}" for i in range(4, -1, -1)]
+
+
+def test_thread_listing_rejects_a_malformed_cursor(client):
+    response = client.get("/api/forum/threads", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_search_finds_threads_and_replies_as_they_are_created(client, auth_headers):
+    thread = client.post("/api/forum/threads", headers=auth_headers, json={
+        "title": "Fall armyworm in maize",
+        "content": "Larvae are eating the whorls of my young plants.",
+    }).json()
+    client.post("/api/forum/threads", headers=auth_headers, json={
+        "title": "Coffee leaf rust", "content": "Orange powder under the leaves.",
+    })
+    client.post("/api/forum/posts", headers=auth_headers, json={
+        "thread_id": thread["id"], "content": "Spray neem early; armyworms hide in the whorl.",
+    })
+
+    response = client.get("/api/forum/search", params={"q": "armyworm"})
+    assert response.status_code == status.HTTP_200_OK
+    hits = response.json()
+
+    # Title match outranks the reply; stemming matches "armyworms"
+    assert [(h["kind"], h["thread_id"]) for h in hits] == [("thread", thread["id"]), ("post", thread["id"])]
+    assert "<mark>armyworm</mark>" in hits[0]["title_highlight"]
+    assert "<mark>armyworms</mark>" in hits[1]["snippet"]
+    assert hits[1]["thread_title"] == "Fall armyworm in maize"
+
+
+def test_search_treats_query_syntax_as_plain_text(client, auth_headers):
+    client.post("/api/forum/threads", headers=auth_headers, json={
+        "title": "Drip irrigation cost", "content": "How much does a drip kit cost?",
+    })
+    response = client.get("/api/forum/search", params={"q": '"drip" cost*('})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+def test_search_highlights_escape_user_html(client, auth_headers):
+    thread = client.post("/api/forum/threads", headers=auth_headers, json={
+        "title": "<b>Aphids</b> on kale", "content": "Seen aphids again.",
+    }).json()
+    client.post("/api/forum/posts", headers=auth_headers, json={
+        "thread_id": thread["id"], "content": "<script>alert('aphids')</script> try soapy water",
+    })
+
+    hits = client.get("/api/forum/search", params={"q": "aphids"}).json()
+    title_highlight = next(h["title_highlight"] for h in hits if h["kind"] == "thread")
+    snippet = next(h["snippet"] for h in hits if h["kind"] == "post")
+    assert title_highlight == "&lt;b&gt;<mark>Aphids</mark>&lt;/b&gt; on kale"
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;alert(&#x27;<mark>aphids</mark>&#x27;)&lt;/script&gt;" in snippet
@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlmodel import select
+
+from app.http_clients import GEOCODING_CLIENT, set_http_client, close_http_clients
+from app.models import GeocodeCache
+from app.utils import (
+    clear_geocode_memory_cache, get_coords_from_location, normalize_location_text
+)
+
+
+@pytest.fixture
+def nominatim_calls():
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request.url.params["q"])
+        if "nowhere" in request.url.params["q"].lower():
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json=[{"lat": "-0.3031", "lon": "36.0800"}])
+
+    clear_geocode_memory_cache()
+    set_http_client(
+        GEOCODING_CLIENT,
+        httpx.AsyncClient(base_url="https://nominatim.test", transport=httpx.MockTransport(handler)),
+    )
+    yield calls
+    asyncio.run(close_http_clients())
+    clear_geocode_memory_cache()
+
+
+def test_normalize_location_text():
+    assert normalize_location_text(" Nakuru,  KENYA ") == "nakuru"
+    assert normalize_location_text("NAKURU.") == "nakuru"
+    assert normalize_location_text("Kenya") == "kenya"
+
+
+def test_repeated_locations_skip_nominatim(test_db, nominatim_calls):
+    first = asyncio.run(get_coords_from_location("Nakuru", test_db))
+    assert first == {"latitude": -0.3031, "longitude": 36.08}
+
+    # Served from the in-memory LRU
+    assert asyncio.run(get_coords_from_location("nakuru, Kenya", test_db)) == first
+
+    # Served from the database table once the LRU is cold
+    clear_geocode_memory_cache()
+    assert asyncio.run(get_coords_from_location("NAKURU", test_db)) == first
+
+    assert nominatim_calls == ["Nakuru"]
+    entry = test_db.exec(select(GeocodeCache).where(GeocodeCache.query == "nakuru")).one()
+    assert entry.hit_count == 1
+
+
+def test_no_match_results_are_cached(test_db, nominatim_calls):
+    assert asyncio.run(get_coords_from_location("Nowhere Town", test_db)) is None
+    clear_geocode_memory_cache()
+    assert asyncio.run(get_coords_from_location("nowhere town", test_db)) is None
+    assert nominatim_calls == ["Nowhere Town"]
+
+
+def test_cache_never_commits_the_callers_session(test_db, nominatim_calls):
+    from app.models import Farm
+
+    # Pending work of the caller's unit, e.g. update_farm midway
+    test_db.add(Farm(name="Uncommitted", location_text="Nakuru", owner_id=1))
+    assert asyncio.run(get_coords_from_location("Nakuru", test_db)) is not None
+    test_db.rollback()
+
+    assert test_db.exec(select(Farm)).all() == []
+    assert test_db.exec(select(GeocodeCache)).one().query == "nakuru"
+
+
+def test_memory_hits_reach_the_hit_counter(test_db, nominatim_calls, monkeypatch):
+    import app.utils
+
+    monkeypatch.setattr(app.utils, "GEOCODE_HIT_FLUSH_EVERY", 2)
+    for _ in range(5):
+        asyncio.run(get_coords_from_location("Nakuru", test_db))
+
+    # One Nominatim call, then four memory hits written in two batches
+    entry = test_db.exec(select(GeocodeCache).where(GeocodeCache.query == "nakuru")).one()
+    assert entry.hit_count == 4
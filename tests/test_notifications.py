@@ -0,0 +1,250 @@
+import asyncio
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, insert
+from sqlmodel import func, select
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.models import ForumThread, Notification, User
+from app.notification_broker import get_notification_broker, publish_notification
+from app import upsert
+from app.notification_counter import get_unread_count, increment_unread, reconcile_unread_counters
+from app.security import create_access_token, get_password_hash
+
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    response = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def add_notifications(db, user_id, count, start=datetime(2026, 4, 1, tzinfo=timezone.utc)):
+    db.execute(insert(Notification), [
+        {"user_id": user_id, "message": f"Reply {i}", "is_read": False, "created_at": start + timedelta(minutes=i)}
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def unread_count(db, user_id):
+    return db.exec(
+        select(func.count(Notification.id))
+        .where(Notification.user_id == user_id, Notification.is_read == False)
+    ).one()
+
+
+def test_mark_all_read_is_a_single_update(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 2000)
+    other = User(email="someone@example.com", hashed_password=get_password_hash("pw123456"))
+    test_db.add(other)
+    test_db.commit()
+    add_notifications(test_db, other.id, 3)
+
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    response = client.post("/api/notifications/mark-all-read", headers=auth_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    notification_statements = [s for s in statements if re.search(r"\bnotification\b", s.lower())]
+    assert len(notification_statements) == 1
+    assert notification_statements[0].lstrip().upper().startswith("UPDATE")
+    assert unread_count(test_db, test_user.id) == 0
+    assert unread_count(test_db, other.id) == 3
+
+
+def test_mark_read_by_ids_ignores_other_users_rows(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 5)
+    other = User(email="someone@example.com", hashed_password=get_password_hash("pw123456"))
+    test_db.add(other)
+    test_db.commit()
+    add_notifications(test_db, other.id, 1)
+    mine = test_db.exec(select(Notification.id).where(Notification.user_id == test_user.id)).all()
+    theirs = test_db.exec(select(Notification.id).where(Notification.user_id == other.id)).one()
+
+    response = client.post("/api/notifications/mark-read", headers=auth_headers,
+                           json={"ids": [mine[0], mine[1], theirs]})
+    assert response.json() == {"updated": 2}
+    assert unread_count(test_db, test_user.id) == 3
+    assert unread_count(test_db, other.id) == 1
+
+
+def test_mark_read_up_to_cursor_covers_the_pages_loaded(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 10)
+    first_page = client.get("/api/notifications/", params={"limit": 4}, headers=auth_headers).json()
+
+    response = client.post("/api/notifications/mark-read", headers=auth_headers,
+                           json={"up_to_cursor": first_page["next_cursor"], "head_cursor": first_page["head_cursor"]})
+    assert response.json() == {"updated": 4}
+
+    remaining = client.get("/api/notifications/", headers=auth_headers).json()["items"]
+    assert [n["message"] for n in remaining] == [f"Reply {i}" for i in range(5, -1, -1)]
+
+
+def test_mark_read_up_to_tail_cursor_covers_the_last_page(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 3)
+    only_page = client.get("/api/notifications/", headers=auth_headers).json()
+    assert only_page["next_cursor"] is None
+
+    response = client.post("/api/notifications/mark-read", headers=auth_headers,
+                           json={"up_to_cursor": only_page["tail_cursor"], "head_cursor": only_page["head_cursor"]})
+    assert response.json() == {"updated": 3}
+    assert unread_count(test_db, test_user.id) == 0
+
+
+def test_mark_read_up_to_cursor_leaves_newer_notifications_unread(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 10)
+    first_page = client.get("/api/notifications/", params={"limit": 4}, headers=auth_headers).json()
+    # Arrives after the client loaded its page
+    test_db.add(Notification(user_id=test_user.id, message="Unseen reply", created_at=datetime(2026, 5, 1)))
+    test_db.commit()
+
+    response = client.post("/api/notifications/mark-read", headers=auth_headers,
+                           json={"up_to_cursor": first_page["next_cursor"], "head_cursor": first_page["head_cursor"]})
+    assert response.json() == {"updated": 4}
+
+    remaining = client.get("/api/notifications/", headers=auth_headers).json()["items"]
+    assert remaining[0]["message"] == "Unseen reply"
+    assert len(remaining) == 7
+
+
+def test_mark_read_up_to_cursor_requires_the_head_cursor(client, test_db, auth_headers, test_user):
+    add_notifications(test_db, test_user.id, 10)
+    first_page = client.get("/api/notifications/", params={"limit": 4}, headers=auth_headers).json()
+
+    response = client.post("/api/notifications/mark-read", headers=auth_headers,
+                           json={"up_to_cursor": first_page["next_cursor"]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_mark_read_requires_exactly_one_selector(client, auth_headers):
+    response = client.post("/api/notifications/mark-read", headers=auth_headers, json={})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+
+@pytest.fixture
+def owned_thread(test_db, test_user):
+    thread = ForumThread(title="Drying beans", content="How long should beans dry?", owner_id=test_user.id)
+    test_db.add(thread)
+    test_db.commit()
+    test_db.refresh(thread)
+    return thread
+
+
+@pytest.fixture
+def replier_headers(client, test_db):
+    replier = User(email="replier@example.com", full_name="Wanjiku", hashed_password=get_password_hash("pw123456"))
+    test_db.add(replier)
+    test_db.commit()
+    response = client.post("/api/auth/token", data={"username": replier.email, "password": "pw123456"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_websocket_pushes_reply_notifications(client, test_user, owned_thread, replier_headers):
+    token = create_access_token({"sub": test_user.email})
+
+    with client.websocket_connect(f"/api/notifications/ws?token={token}") as websocket:
+        client.post("/api/forum/posts", headers=replier_headers,
+                    json={"thread_id": owned_thread.id, "content": "About two weeks in the sun."})
+        message = websocket.receive_json()
+
+    assert message["type"] == "notification"
+    assert message["notification"]["message"] == "Wanjiku replied to your thread 'Drying beans'."
+    assert message["notification"]["is_read"] is False
+    assert message["unread_count"] == 1
+
+
+def test_websocket_rejects_a_bad_token(client):
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/api/notifications/ws?token=not-a-jwt"):
+            pass
+    assert exc_info.value.code == status.WS_1008_POLICY_VIOLATION
+
+
+def test_sse_stream_delivers_published_events(test_db, test_user):
+    token = create_access_token({"sub": test_user.email})
+    user_id = test_user.id
+
+    async def run():
+        disconnected = asyncio.Event()
+        chunks = asyncio.Queue()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                await chunks.put(message["body"].decode())
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/notifications/stream", "raw_path": b"/api/notifications/stream",
+            "query_string": f"token={token}".encode(), "headers": [], "client": ("test", 1), "server": ("test", 80),
+        }
+        app_task = asyncio.create_task(app(scope, receive, send))
+        ready = await asyncio.wait_for(chunks.get(), 5)
+        await publish_notification(user_id, {"id": 1, "message": "New reply"})
+        pushed = await asyncio.wait_for(chunks.get(), 5)
+        disconnected.set()
+        await asyncio.wait_for(app_task, 5)
+        return ready, pushed
+
+    ready, pushed = asyncio.run(run())
+    assert ready.startswith("event: ready")
+    assert pushed.startswith("event: notification")
+    assert json.loads(pushed.split("data: ", 1)[1])["notification"]["message"] == "New reply"
+    assert get_notification_broker().stats()["connections"] == 0
+
+
+def test_unread_counter_tracks_replies_and_mark_read(client, test_db, auth_headers, owned_thread, replier_headers):
+    for i in range(3):
+        client.post("/api/forum/posts", headers=replier_headers,
+                    json={"thread_id": owned_thread.id, "content": f"Reply number {i}"})
+
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"unread_count": 3}
+    assert not [s for s in statements if "count(" in s.lower()]
+
+    newest = client.get("/api/notifications/", headers=auth_headers).json()["items"][0]
+    client.post(f"/api/notifications/{newest['id']}/mark-read", headers=auth_headers)
+    assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"unread_count": 2}
+
+    client.post("/api/notifications/mark-all-read", headers=auth_headers)
+    assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"unread_count": 0}
+
+
+def test_reconcile_repairs_counter_drift(client, test_db, auth_headers, test_user):
+    # Rows inserted behind the counter's back
+    add_notifications(test_db, test_user.id, 4)
+    assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"unread_count": 0}
+
+    assert reconcile_unread_counters(test_db) == {test_user.id: -4}
+    assert client.get("/api/notifications/unread-count", headers=auth_headers).json() == {"unread_count": 4}
+    assert reconcile_unread_counters(test_db) == {}
+
+
+def test_counter_without_on_conflict_support(test_db, test_user, monkeypatch):
+    # Databases other than PostgreSQL and SQLite take the UPDATE-then-INSERT path
+    monkeypatch.setattr(upsert, "_DIALECT_INSERTS", {})
+    increment_unread(test_db, test_user.id)
+    increment_unread(test_db, test_user.id, 2)
+    test_db.commit()
+    assert get_unread_count(test_db, test_user.id) == 3
+
+    add_notifications(test_db, test_user.id, 1)
+    assert reconcile_unread_counters(test_db) == {test_user.id: 2}
+    assert get_unread_count(test_db, test_user.id) == 1
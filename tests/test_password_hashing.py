@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import status
+
+from app import security
+from app.main import app
+from app.password_hashing import PasswordHasherPool, PasswordHashingBusy
+
+
+def test_pool_sheds_work_beyond_workers_plus_queue():
+    pool = PasswordHasherPool(workers=1, max_queue=1)
+    release = threading.Event()
+    running = pool._submit(release.wait)
+    queued = pool._submit(release.wait)
+
+    with pytest.raises(PasswordHashingBusy):
+        pool.run_sync(lambda: None)
+
+    release.set()
+    assert running.result(timeout=5) and queued.result(timeout=5)
+    assert pool.run_sync(lambda: "ok") == "ok"
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_login_returns_503_with_retry_after_when_pool_is_full(client, test_user, monkeypatch):
+    pool = PasswordHasherPool(workers=1, max_queue=0)
+    monkeypatch.setattr(security, "password_hasher", pool)
+    release = threading.Event()
+    blocker = pool._submit(release.wait)
+    try:
+        response = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == str(security.PASSWORD_HASH_RETRY_AFTER_SECONDS)
+        # Routes that don't hash passwords are unaffected
+        assert client.get("/").status_code == status.HTTP_200_OK
+    finally:
+        release.set()
+        blocker.result(timeout=5)
+        pool.shutdown()
+
+
+def test_login_rehashes_when_work_factor_changes(client, test_db, test_user, monkeypatch):
+    assert test_user.hashed_password.split("$")[2] == "12"
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", 4)
+
+    response = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"})
+    assert response.status_code == status.HTTP_200_OK
+    test_db.refresh(test_user)
+    assert test_user.hashed_password.split("$")[2] == "04"
+    assert security.verify_password("test123", test_user.hashed_password)
+
+
+def test_login_burst_stays_bounded_and_api_stays_responsive(test_db, test_user, monkeypatch):
+    pool = PasswordHasherPool(workers=2, max_queue=2)
+    monkeypatch.setattr(security, "password_hasher", pool)
+    email = test_user.email
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            logins = [
+                asyncio.create_task(ac.post("/api/auth/token", data={"username": email, "password": "test123"}))
+                for _ in range(12)
+            ]
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            root = await ac.get("/")
+            root_latency = time.perf_counter() - started
+            return await asyncio.gather(*logins), root, root_latency
+
+    try:
+        responses, root, root_latency = asyncio.run(burst())
+    finally:
+        pool.shutdown()
+
+    codes = [r.status_code for r in responses]
+    # At most workers + queue are admitted at once; the rest are shed immediately
+    assert codes.count(status.HTTP_200_OK) >= 4
+    assert codes.count(status.HTTP_503_SERVICE_UNAVAILABLE) >= 1
+    assert codes.count(status.HTTP_200_OK) + codes.count(status.HTTP_503_SERVICE_UNAVAILABLE) == 12
+    assert all("Retry-After" in r.headers for r in responses if r.status_code == 503)
+    assert root.status_code == status.HTTP_200_OK and root_latency < 0.5
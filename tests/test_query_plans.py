@@ -0,0 +1,34 @@
+from sqlmodel import create_engine
+
+from benchmarks.query_plans import drop_hot_query_indexes, run, seed
+
+# Tables whose hot queries must be served from an index rather than a full scan
+HOT_TABLES = ("farm", "farmactivity", "farmdailyemission", "soilreport", "forumpost", "notification")
+
+
+def _full_scans(plan):
+    return [line for line in plan if line.startswith("SCAN") and "USING" not in line
+            and line.split()[1] in HOT_TABLES]
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    seed(engine, users=20, farms_per_user=2, activities_per_farm=200)
+
+    results = run(engine, repeat=1)
+
+    assert {name: _full_scans(r["plan"]) for name, r in results.items() if _full_scans(r["plan"])} == {}
+    assert any("ix_farmactivity_farm_id_date_id" in line
+               for line in results["GET /activities/emissions/weekly"]["plan"])
+    assert any("ix_forumpost_thread_id_created_at" in line
+               for line in results["GET /forum/threads/{id}"]["plan"])
+
+
+def test_baseline_without_indexes_scans(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    seed(engine, users=5, farms_per_user=1, activities_per_farm=20)
+    drop_hot_query_indexes(engine)
+
+    results = run(engine, repeat=1)
+
+    assert _full_scans(results["GET /farms"]["plan"]) == ["SCAN farm"]
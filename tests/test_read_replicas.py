@@ -0,0 +1,95 @@
+from collections import OrderedDict
+
+import pytest
+from fastapi import status
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.database import get_read_db, read_router
+from app.main import app
+from app.models import ForumThread, User
+from app.read_replicas import ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_router_round_robins_and_skips_replicas_that_are_down():
+    primary, first, second = object(), object(), object()
+    clock = FakeClock()
+    router = ReplicaRouter(primary, [first, second], retry_seconds=30, pin_seconds=5, clock=clock)
+
+    assert router.candidates() == [first, second, primary]
+    assert router.candidates() == [second, first, primary]
+
+    router.mark_down(first, Exception("connection refused"))
+    assert router.candidates() == [second, primary]
+    clock.now += 30
+    assert first in router.candidates()
+    assert router.stats()["failovers"] == 1
+
+
+def test_router_pins_recent_writers_to_the_primary():
+    primary, replica = object(), object()
+    clock = FakeClock()
+    router = ReplicaRouter(primary, [replica], pin_seconds=5, clock=clock)
+
+    router.record_write(7)
+    assert router.candidates(7) == [primary]
+    assert router.candidates(8) == [replica, primary]
+    clock.now += 5
+    assert router.candidates(7) == [replica, primary]
+
+
+@pytest.fixture
+def replica_setup(client, test_db, tmp_path, monkeypatch):
+    """A reachable replica holding different data, an unreachable one, and the test DB as primary."""
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    SQLModel.metadata.create_all(replica)
+    with Session(replica) as session:
+        owner = User(email="replica@example.com", hashed_password="x")
+        session.add(owner)
+        session.commit()
+        session.add(ForumThread(title="Only on the replica", content="Replicated content here.", owner_id=owner.id))
+        session.commit()
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+    monkeypatch.setattr(read_router, "primary", test_db.get_bind())
+    monkeypatch.setattr(read_router, "replicas", [unreachable, replica])
+    monkeypatch.setattr(read_router, "_down_since", {})
+    monkeypatch.setattr(read_router, "_recent_writers", OrderedDict())
+    monkeypatch.setattr(read_router, "_next", 0)
+    app.dependency_overrides.pop(get_read_db)
+    yield
+    replica.dispose()
+
+
+def thread_titles(client, headers=None):
+    response = client.get("/api/forum/threads", headers=headers or {})
+    assert response.status_code == status.HTTP_200_OK
+    return [t["title"] for t in response.json()["items"]]
+
+
+def test_reads_fail_over_to_a_healthy_replica(client, replica_setup):
+    assert thread_titles(client) == ["Only on the replica"]
+    assert read_router.stats()["replicas_down"] == 1
+
+
+def test_reads_after_a_write_go_to_the_primary(client, test_user, replica_setup):
+    token = client.post("/api/auth/token", data={"username": test_user.email, "password": "test123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(
+        "/api/forum/threads",
+        json={"title": "Just written to the primary", "content": "Fresh content on primary."},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert thread_titles(client, headers) == ["Just written to the primary"]
+    # Other readers keep using the replica
+    assert thread_titles(client) == ["Only on the replica"]
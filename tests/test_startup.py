@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import schema_version
+from app.models import Badge
+from app.schema_version import SchemaOutOfDate, alembic_heads, check_schema_version, current_revision
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_deploy_migrations(database_path):
+    """The Dockerfile's migration steps, as separate processes."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"}
+    for command in (
+        [sys.executable, "-m", "app.schema_version"],
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+    ):
+        result = subprocess.run(command, capture_output=True, text=True, timeout=120, cwd=PROJECT_ROOT, env=env)
+        assert result.returncode == 0, result.stderr
+
+
+def test_head_is_read_from_the_revision_files():
+    assert alembic_heads() == {"c8d1f4a7b239"}
+
+
+def test_empty_database_is_bootstrapped_and_stamped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    check_schema_version(engine)
+
+    assert current_revision(engine) == "c8d1f4a7b239"
+    with Session(engine) as session:
+        assert len(session.exec(select(Badge)).all()) == 4
+    # A second start is just the version check
+    check_schema_version(engine)
+    engine.dispose()
+
+
+def test_deploy_migrations_on_an_empty_database(tmp_path):
+    database_path = tmp_path / "fresh.db"
+    run_deploy_migrations(database_path)
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    assert current_revision(engine) == "c8d1f4a7b239"
+    with Session(engine) as session:
+        assert len(session.exec(select(Badge)).all()) == 4
+    engine.dispose()
+    # Redeploying is a no-op
+    run_deploy_migrations(database_path)
+
+
+def test_deploy_migrations_on_an_unversioned_create_all_database(tmp_path):
+    database_path = tmp_path / "legacy.db"
+    engine = create_engine(f"sqlite:///{database_path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    run_deploy_migrations(database_path)
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    assert current_revision(engine) == "c8d1f4a7b239"
+    with Session(engine) as session:
+        assert len(session.exec(select(Badge)).all()) == 4
+    engine.dispose()
+
+
+def test_strict_mode_refuses_an_outdated_schema(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    check_schema_version(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE alembic_version SET version_num = '7f1a5c3e8d92'")
+
+    monkeypatch.setattr(schema_version, "SCHEMA_CHECK", "strict")
+    with pytest.raises(SchemaOutOfDate):
+        check_schema_version(engine)
+    engine.dispose()
+
+
+def test_importing_the_app_does_not_import_openai_or_alembic():
+    code = "import sys, app.main; print('openai' in sys.modules, 'alembic' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, timeout=60,
+        cwd=PROJECT_ROOT,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False False"
+
+
+def test_startup_metrics(client, metrics_headers, monkeypatch):
+    from app.startup_timing import startup_timer
+
+    # Earlier tests already sent this process its first request
+    monkeypatch.setattr(startup_timer, "first_request", None)
+    client.get("/")
+    stats = client.get("/api/metrics/startup", headers=metrics_headers).json()
+    assert 0 < stats["import_seconds"] <= stats["ready_seconds"] <= stats["first_request_seconds"]
@@ -56,3 +56,93 @@ def test_badges_flow(client, test_db, test_user, auth_headers):
     count_resp = client.get("/api/badges/me/count", headers=auth_headers)
     assert count_resp.status_code == status.HTTP_200_OK
     assert count_resp.json().get("count") >= 1
+
+
+@pytest.fixture
+def seeded_badges(test_db):
+    from app.models import Badge
+
+    for name in ["First Farm", "Soil Analyst", "Community Member", "Climate Watcher"]:
+        test_db.add(Badge(name=name, description=name))
+    test_db.commit()
+
+
+def test_first_thread_awards_community_member_after_the_response(client, test_db, seeded_badges, auth_headers):
+    from sqlalchemy import event
+
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    for i in range(2):
+        response = client.post(
+            "/api/forum/threads",
+            json={"title": f"Which cover crop for clay soil {i}?", "content": "Looking for advice on cover crops."},
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    # The only badge statements are the background evaluation's
+    assert sum("FROM badge" in s for s in statements) == 1
+    badges = client.get("/api/badges/me", headers=auth_headers).json()
+    assert [b["badge"]["name"] for b in badges] == ["Community Member"]
+
+
+def test_evaluate_badges_is_idempotent(test_db, test_user, seeded_badges):
+    from app.badge_service import BadgeEvent, evaluate_badges
+
+    bind = test_db.get_bind()
+    assert evaluate_badges(bind, test_user.id, BadgeEvent.FARM_CREATED) == ["First Farm"]
+    assert evaluate_badges(bind, test_user.id, BadgeEvent.FARM_CREATED) == []
+
+
+def test_unknown_badge_does_not_fail_the_request(client, test_db, auth_headers):
+    # No badges seeded: evaluation logs and moves on
+    response = client.post(
+        "/api/forum/threads",
+        json={"title": "Which cover crop for clay soil?", "content": "Looking for advice on cover crops."},
+        headers=auth_headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert client.get("/api/badges/me/count", headers=auth_headers).json()["count"] == 0
+
+
+def test_unknown_badge_is_not_reloaded_on_every_event(test_db, test_user):
+    from sqlalchemy import event
+    from app.badge_service import BadgeEvent, evaluate_badges
+
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    bind = test_db.get_bind()
+    for _ in range(3):
+        assert evaluate_badges(bind, test_user.id, BadgeEvent.FARM_CREATED) == []
+
+    assert sum("FROM badge" in s for s in statements) == 1
+
+
+def test_a_colliding_award_does_not_drop_the_others(test_db, test_user, seeded_badges, monkeypatch):
+    from sqlmodel import Session, create_engine, select
+    from app import badge_service
+    from app.badge_service import BadgeEvent, BadgeRule, evaluate_badges
+    from app.models import Badge, UserBadge
+
+    other_engine = create_engine(test_db.get_bind().url)
+    first_farm = test_db.exec(select(Badge.id).where(Badge.name == "First Farm")).one()
+
+    def award_first_farm_elsewhere(db, user_id):
+        # Another worker's evaluation commits the same award meanwhile
+        with Session(other_engine) as other:
+            other.add(UserBadge(user_id=user_id, badge_id=first_farm))
+            other.commit()
+        return 2
+
+    monkeypatch.setitem(badge_service.RULES_BY_EVENT, BadgeEvent.FARM_CREATED, [
+        BadgeRule("Soil Analyst", BadgeEvent.FARM_CREATED, threshold=2, counter=award_first_farm_elsewhere),
+        BadgeRule("First Farm", BadgeEvent.FARM_CREATED),
+    ])
+    assert evaluate_badges(test_db.get_bind(), test_user.id, BadgeEvent.FARM_CREATED) == ["Soil Analyst"]
+
+    test_db.expire_all()
+    assert len(test_db.exec(select(UserBadge).where(UserBadge.user_id == test_user.id)).all()) == 2
+    other_engine.dispose()
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.weather import ForecastCache, forecast_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_neighbouring_farms_share_a_cache_key():
+    """Coordinates in the same grid cell and reordered params map to one key."""
+    a = forecast_cache_key(-1.2921, 36.8219, "precipitation_sum,temperature_2m_max")
+    b = forecast_cache_key(-1.2989, 36.8191, "temperature_2m_max, precipitation_sum")
+    assert a == b
+
+
+def test_concurrent_misses_trigger_a_single_upstream_fetch():
+    calls = []
+
+    async def fetcher(lat, lon, params):
+        calls.append((lat, lon, params))
+        await asyncio.sleep(0.05)
+        return {"daily": {"precipitation_sum": [1.0]}}
+
+    cache = ForecastCache(fetcher, ttl=60, stale_ttl=600)
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get(-1.29, 36.82, "precipitation_sum") for _ in range(50))
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    assert cache.stats()["misses"] == 50
+
+
+def test_stale_forecast_is_served_when_upstream_fails():
+    clock = FakeClock()
+    state = {"fail": False, "calls": 0}
+
+    async def fetcher(lat, lon, params):
+        state["calls"] += 1
+        if state["fail"]:
+            raise HTTPException(status_code=503, detail="down")
+        return {"daily": {"value": state["calls"]}}
+
+    cache = ForecastCache(fetcher, ttl=10, stale_ttl=100, clock=clock)
+
+    async def run():
+        first = await cache.get(0.0, 0.0, "p")
+        state["fail"] = True
+        clock.now = 50  # past the TTL but inside the stale window
+        stale = await cache.get(0.0, 0.0, "p")
+        await asyncio.sleep(0)  # let the background revalidation run
+        return first, stale
+
+    first, stale = asyncio.run(run())
+    assert stale == first
+    assert cache.stats()["upstream_errors"] == 1
+
+    # Beyond the stale window the error surfaces again
+    clock.now = 500
+    with pytest.raises(HTTPException):
+        asyncio.run(cache.get(0.0, 0.0, "p"))